@@ -14,73 +14,2312 @@
 import json
 import time
 import re
+import math
+import random
 import argparse
 import hashlib
+import shutil
+import sqlite3
+import bisect
+import heapq
+import base64
+import asyncio
+import fnmatch
+import gzip
+import zlib
+import threading
+import contextlib
+import uuid
 import requests
+import urllib3
+import urllib3.connection
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pathlib import Path
-from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+from email.utils import parsedate_to_datetime
+import soupsieve
+from bs4 import BeautifulSoup, NavigableString, CData
 from collections import deque, defaultdict
+import multiprocessing
+from array import array
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, as_completed, FIRST_COMPLETED
 
 # Optional: Playwright for JavaScript-heavy sites
 try:
-    from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
+    from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
     PLAYWRIGHT_AVAILABLE = True
 except ImportError:
     PLAYWRIGHT_AVAILABLE = False
-    sync_playwright = None
+    async_playwright = None
     PlaywrightTimeout = Exception
 
+# Optional: brotli lets urllib3 decode 'br' responses
+try:
+    import brotli  # noqa: F401
+    BROTLI_AVAILABLE = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        BROTLI_AVAILABLE = True
+    except ImportError:
+        BROTLI_AVAILABLE = False
+
+# Optional: faster HTML parser backends
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxParser
+        SELECTOLAX_AVAILABLE = True
+    except ImportError:
+        SELECTOLAX_AVAILABLE = False
+        SelectolaxParser = None
+
+# Optional: C Aho-Corasick automaton for URL patterns
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+    ahocorasick = None
+
+# Optional: NumPy for clustering pages into inferred categories
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+PARSER_BACKENDS = ('html.parser', 'lxml', 'selectolax')
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+PATTERN_MARKERS = ['example:', 'pattern:', 'usage:', 'typical use']
+# String types Tag.get_text() collects (no comments, script or style text)
+TEXT_STRING_TYPES = (NavigableString, CData)
+
+BYTES_PER_TOKEN = 4  # rough size of a token in English markdown, for reference shards
+EXTRACTOR_VERSION = 1  # bump when extraction output changes, so stored pages get re-parsed
+USER_AGENT = 'Mozilla/5.0 (Documentation Scraper)'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+BACKOFF_STATUSES = (429, 503)
+
+
+class UrlFrontier:
+    """FIFO queue of URLs to scrape with constant-time membership checks
+
+    Keeps BFS order in a deque and mirrors it in a set, so checking whether
+    a link is already queued no longer scans the queue. Queued duplicates
+    are ignored. Iterates in queue order, so list(frontier) serializes it.
+    """
+
+    def __init__(self, urls=()):
+        self._queue = deque()
+        self._queued = set()
+        for url in urls:
+            self.append(url)
+
+    def append(self, url, parent=None):
+        """Queue url unless already queued. Returns True if added."""
+        if url in self._queued:
+            return False
+        self._queue.append(url)
+        self._queued.add(url)
+        return True
+
+    def popleft(self):
+        url = self._queue.popleft()
+        self._queued.discard(url)
+        return url
+
+    def __contains__(self, url):
+        return url in self._queued
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __iter__(self):
+        return iter(self._queue)
+
+
+class PriorityFrontier:
+    """Queue of URLs to scrape, most valuable first
+
+    Same interface as UrlFrontier (popleft() pops the best URL), so the
+    crawl loops and checkpoints work with either. A URL's score is
+
+        sum of matching url_weights + category_weight if the URL contains a
+        category keyword - depth_weight * link depth
+        + inlink_weight * log2(1 + pages linking to it)
+
+    Scores only go up (more inlinks, a shorter path), so changes are lazy
+    re-pushes: the heap gets a new entry and the old one is skipped when
+    popped. The heap is rebuilt when stale entries outnumber live ones.
+    Equal scores pop in the order the URLs reached them.
+    """
+
+    def __init__(self, urls=(), url_weights=None, categories=None, category_weight=2.0,
+                 depth_weight=1.0, inlink_weight=1.0, state=None):
+        by_weight = defaultdict(list)
+        for pattern, weight in (url_weights or {}).items():
+            by_weight[weight].append(pattern)
+        self._weights = [(weight, UrlPatternSet(patterns)) for weight, patterns in by_weight.items()]
+        keywords = [kw.lower() for kws in (categories or {}).values() for kw in kws]
+        self._category_keywords = SubstringMatcher(keywords)
+        self.category_weight = category_weight
+        self.depth_weight = depth_weight
+        self.inlink_weight = inlink_weight
+
+        self._heap = []
+        self._latest = {}  # queued url -> seq of its live heap entry
+        self._seq = 0
+        self._base = {}  # queued url -> pattern/category part of the score
+        self._depth = {}  # every url seen -> link depth (kept after popping, for its links)
+        self._inlinks = defaultdict(int)
+        if state:
+            self._depth.update(state.get('depth', {}))
+            self._inlinks.update(state.get('inlinks', {}))
+        for url in urls:
+            self.append(url)
+
+    @classmethod
+    def from_config(cls, config, urls=(), state=None):
+        priority = config.get('priority', {})
+        return cls(urls, url_weights=priority.get('url_weights', {}), categories=config.get('categories', {}),
+                   category_weight=priority.get('category_weight', 2.0),
+                   depth_weight=priority.get('depth_weight', 1.0),
+                   inlink_weight=priority.get('inlink_weight', 1.0), state=state)
+
+    def _url_score(self, url):
+        score = sum(weight for weight, patterns in self._weights if patterns.matches(url))
+        if self._category_keywords.search(url.lower()):
+            score += self.category_weight
+        return score
+
+    def score(self, url):
+        return (self._base[url] - self.depth_weight * self._depth.get(url, 0)
+                + self.inlink_weight * math.log2(1 + self._inlinks[url]))
+
+    def _push(self, url):
+        self._seq += 1
+        self._latest[url] = self._seq
+        heapq.heappush(self._heap, (-self.score(url), self._seq, url))
+        if len(self._heap) > 2 * len(self._latest) + 1024:
+            self._heap = [entry for entry in self._heap if self._latest.get(entry[2]) == entry[1]]
+            heapq.heapify(self._heap)
+
+    def append(self, url, parent=None):
+        """Queue url, or count one more inlink if already queued. Returns True if added."""
+        if parent in self._depth:
+            depth = self._depth[parent] + 1
+        else:
+            depth = self._depth.get(url, 0)  # a seed, or restored from a checkpoint
+        if url in self._latest:
+            if parent is None:
+                return False
+            self._inlinks[url] += 1
+            self._depth[url] = min(self._depth[url], depth)
+            self._push(url)
+            return False
+        if parent is not None:
+            self._inlinks[url] += 1
+        self._depth[url] = min(self._depth.get(url, depth), depth)
+        self._base[url] = self._url_score(url)
+        self._push(url)
+        return True
+
+    def popleft(self):
+        """Remove and return the highest-scoring URL"""
+        while True:
+            _, seq, url = heapq.heappop(self._heap)
+            if self._latest.get(url) == seq:
+                del self._latest[url]
+                del self._base[url]
+                self._inlinks.pop(url, None)
+                return url
+
+    def depth(self, url):
+        return self._depth.get(url, 0)
+
+    def state(self, urls):
+        """Depth and inlink counts of urls, for checkpoints"""
+        return {'depth': {url: self._depth.get(url, 0) for url in urls},
+                'inlinks': {url: self._inlinks[url] for url in urls if self._inlinks.get(url)}}
+
+    def __contains__(self, url):
+        return url in self._latest
+
+    def __len__(self):
+        return len(self._latest)
+
+    def __iter__(self):
+        """Queued URLs, best first (stable, so list(frontier) serializes the order)"""
+        return iter(sorted(self._latest, key=lambda url: (-self.score(url), self._latest[url])))
+
+
+class SubstringMatcher:
+    """Aho-Corasick automaton over a list of substring patterns
+
+    search() answers "does text contain any pattern?" and find_all() gives
+    the indices of every pattern that occurs, both in one pass over the
+    text regardless of how many patterns there are. Uses pyahocorasick
+    when installed, else a pure-Python automaton. Without pyahocorasick,
+    sets of up to SMALL_SET patterns are plain `in` checks: stepping the
+    automaton one character at a time in Python only wins above that.
+    Like `'' in text`, an empty pattern matches every text.
+    """
+
+    SMALL_SET = 200
+
+    def __init__(self, patterns):
+        indexed = [(i, p) for i, p in enumerate(patterns) if p]
+        # The automaton cannot match '', so empty patterns are answered up front
+        self._always = frozenset(i for i, p in enumerate(patterns) if not p)
+        self._empty = not indexed
+        self._automaton = None
+        self._patterns = None
+        if self._empty:
+            return
+
+        if not AHOCORASICK_AVAILABLE and len(indexed) <= self.SMALL_SET:
+            self._patterns = indexed
+            return
+
+        if AHOCORASICK_AVAILABLE:
+            ids = defaultdict(list)
+            for i, pattern in indexed:
+                ids[pattern].append(i)
+            self._automaton = ahocorasick.Automaton()
+            for pattern, pattern_ids in ids.items():
+                self._automaton.add_word(pattern, tuple(pattern_ids))
+            self._automaton.make_automaton()
+            return
+
+        # Trie: goto[state] maps char -> state; out[state] lists pattern indices ending there
+        goto = [{}]
+        out = [()]
+        for i, pattern in indexed:
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto.append({})
+                    out.append(())
+                    goto[state][ch] = nxt
+                state = nxt
+            out[state] += (i,)
+
+        # Failure links, breadth first
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                out[nxt] += out[fail[nxt]]
+                queue.append(nxt)
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def search(self, text):
+        """True if any pattern occurs in text"""
+        if self._always:
+            return True
+        if self._empty:
+            return False
+        if self._patterns is not None:
+            return any(pattern in text for _, pattern in self._patterns)
+        if self._automaton is not None:
+            return next(self._automaton.iter(text), None) is not None
+
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                return True
+        return False
+
+    def find_all(self, text):
+        """Set of indices of the patterns that occur in text"""
+        found = set(self._always)
+        if self._empty:
+            return found
+        if self._patterns is not None:
+            found.update(i for i, pattern in self._patterns if pattern in text)
+            return found
+        if self._automaton is not None:
+            for _, pattern_ids in self._automaton.iter(text):
+                found.update(pattern_ids)
+            return found
+
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class CategoryMatcher:
+    """categorize_page() for many pages, with every keyword in one matcher
+
+    All keywords of all categories go into one SubstringMatcher. Each page
+    is scanned once per field (url, title, first 500 chars of content), and
+    only the keywords that matched are scored. The result is the same as
+    categorize_page(): the first category scoring >= 2, else 'other'.
+
+    Without pyahocorasick, up to LOOP_KEYWORDS keywords are checked with
+    categorize_page()'s per-keyword loop instead. It stops at the first
+    matching category, which beats the pure-Python automaton at that size.
+    """
+
+    FIELD_WEIGHTS = (3, 2, 1)  # url, title, content
+    LOOP_KEYWORDS = 300
+
+    def __init__(self, category_defs):
+        self.categories = list(category_defs)
+        self._loop = None
+        if not AHOCORASICK_AVAILABLE and sum(map(len, category_defs.values())) <= self.LOOP_KEYWORDS:
+            self._loop = [(category, [keyword.lower() for keyword in keywords])
+                          for category, keywords in category_defs.items()]
+            return
+
+        keyword_ids = {}
+        self._keyword_categories = []  # keyword id -> category indices, once per listing
+        for cat_index, keywords in enumerate(category_defs.values()):
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword not in keyword_ids:
+                    keyword_ids[keyword] = len(keyword_ids)
+                    self._keyword_categories.append([])
+                self._keyword_categories[keyword_ids[keyword]].append(cat_index)
+
+        keywords = list(keyword_ids)
+        self._matcher = SubstringMatcher(keywords)
+
+    def categorize(self, page):
+        url = page['url'].lower()
+        title = page['title'].lower()
+        content = page.get('content', '').lower()[:500]  # Check first 500 chars
+
+        if self._loop is not None:
+            for category, keywords in self._loop:
+                score = 0
+                for keyword in keywords:
+                    score += (keyword in url) * 3 + (keyword in title) * 2 + (keyword in content)
+                if score >= 2:
+                    return category
+            return 'other'
+
+        weights = defaultdict(int)
+        for text, weight in zip((url, title, content), self.FIELD_WEIGHTS):
+            for keyword_id in self._matcher.find_all(text):
+                weights[keyword_id] += weight
+
+        scores = defaultdict(int)
+        for keyword_id, weight in weights.items():
+            for cat_index in self._keyword_categories[keyword_id]:
+                scores[cat_index] += weight
+
+        matched = [cat_index for cat_index, score in scores.items() if score >= 2]
+        return self.categories[min(matched)] if matched else 'other'
+
+
+class PageClusterer:
+    """Categories inferred by clustering page titles and headings
+
+    Each page becomes a hashed TF-IDF vector: title and heading words are
+    hashed into `features` slots, so there is no vocabulary to grow. Pages
+    are grouped with mini-batch k-means and each cluster is named after
+    the terms that most set its centroid apart from the others.
+
+    Pages are streamed in batches, so memory depends on `features`,
+    `clusters` and `batch_size`, not on the number of pages. fit() takes a
+    callable returning a fresh page iterator and reads it 1 + `epochs`
+    times: once for document frequencies, then once per training epoch.
+    categorize() has the same interface as CategoryMatcher.
+    """
+
+    STOP_WORDS = frozenset(
+        'the and for with from this that your you are can how what when use using '
+        'into not all its more about our new via'.split())
+    TERM_RE = re.compile(r'[a-z][a-z0-9]{2,}')
+    MAX_HEADINGS = 20
+    TITLE_WEIGHT = 2.0
+    SLOT_CACHE_SIZE = 2**16  # term -> slot memo, bounded to keep memory flat
+
+    def __init__(self, clusters=8, features=2**15, batch_size=1000, epochs=2, seed=0):
+        self.clusters = clusters
+        self.features = features
+        self.batch_size = batch_size
+        self.epochs = epochs
+        self.seed = seed
+        self.categories = []
+        self.pages_clustered = 0
+        self._idf = None
+        self._centroids = None
+        self._squared_norms = None
+        self._labels = []  # centroid row -> category name
+        self._slot_cache = {}
+
+    @classmethod
+    def from_config(cls, config):
+        clustering = config.get('clustering', {})
+        return cls(clusters=clustering.get('clusters', 8),
+                   features=clustering.get('features', 2**15),
+                   batch_size=clustering.get('batch_size', 1000),
+                   epochs=clustering.get('epochs', 2),
+                   seed=clustering.get('seed', 0))
+
+    def _terms(self, page):
+        """{term: weighted count} for a page's title and headings"""
+        terms = defaultdict(float)
+        for term in self.TERM_RE.findall(page.get('title', '').lower()):
+            terms[term] += self.TITLE_WEIGHT
+        headings = ' '.join(h.get('text', '') for h in page.get('headings', [])[:self.MAX_HEADINGS])
+        for term in self.TERM_RE.findall(headings.lower()):
+            terms[term] += 1.0
+        for term in self.STOP_WORDS.intersection(terms):
+            del terms[term]
+        return terms
+
+    def _hashed(self, terms, slot_terms=None):
+        """{slot: weighted count}; optionally remember a term for each slot"""
+        slots = defaultdict(float)
+        cache = self._slot_cache
+        for term, count in terms.items():
+            slot = cache.get(term)
+            if slot is None:
+                slot = zlib.crc32(term.encode('utf-8')) % self.features
+                if len(cache) < self.SLOT_CACHE_SIZE:
+                    cache[term] = slot
+            slots[slot] += count
+            if slot_terms is not None and slot_terms[slot] is None:
+                slot_terms[slot] = term
+        return slots
+
+    def _vectors(self, docs):
+        """Sparse rows (indices, data, indptr) of L2-normalized TF-IDF vectors"""
+        lengths = np.array([len(doc) for doc in docs])
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        indices = np.fromiter((slot for doc in docs for slot in doc), np.int64, indptr[-1])
+        counts = np.fromiter((count for doc in docs for count in doc.values()), np.float32, indptr[-1])
+        data = (1 + np.log(counts)) * self._idf[indices]
+        norms = np.sqrt(np.add.reduceat(data * data, indptr[:-1]))
+        data /= np.repeat(norms, lengths)
+        return indices, data, indptr
+
+    def _nearest(self, centroids, indices, data, indptr):
+        """Nearest centroid row and squared distance for each sparse row"""
+        dots = np.add.reduceat(centroids[:, indices] * data, indptr[:-1], axis=1)
+        distances = (centroids * centroids).sum(axis=1)[:, None] - 2 * dots + 1
+        rows = distances.argmin(axis=0)
+        return rows, np.maximum(distances[rows, np.arange(len(rows))], 0)
+
+    def _batches(self, pages):
+        batch = []
+        for page in pages():
+            doc = self._hashed(self._terms(page))
+            if doc:
+                batch.append(doc)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _init_centroids(self, sample, rng):
+        """Greedy k-means++ seeding from a sample of pages
+
+        Each step draws a few candidates in proportion to their distance
+        from the chosen centroids and keeps the one that lowers the total
+        distance most.
+        """
+        indices, data, indptr = self._vectors(sample)
+
+        def row_vector(row):
+            vector = np.zeros((1, self.features), np.float32)
+            vector[0, indices[indptr[row]:indptr[row + 1]]] = data[indptr[row]:indptr[row + 1]]
+            return vector
+
+        trials = 2 + int(math.log(self.clusters))
+        centroids = row_vector(rng.integers(len(sample)))
+        distances = self._nearest(centroids, indices, data, indptr)[1]
+        while len(centroids) < self.clusters and distances.sum() > 1e-9:
+            best = None
+            for row in rng.choice(len(sample), size=trials, p=distances / distances.sum()):
+                candidate = row_vector(row)
+                trial = np.minimum(distances, self._nearest(candidate, indices, data, indptr)[1])
+                if best is None or trial.sum() < best[1].sum():
+                    best = (candidate, trial)
+            centroids = np.vstack((centroids, best[0]))
+            distances = best[1]
+        return centroids
+
+    def fit(self, pages):
+        """Cluster the pages returned by pages(); returns self"""
+        rng = np.random.default_rng(self.seed)
+        sample_rng = random.Random(self.seed)
+
+        # Pass 1: document frequencies, a readable term per slot and a
+        # reservoir sample to seed the centroids from
+        df = np.zeros(self.features, np.int64)
+        slot_terms = [None] * self.features
+        sample = []
+        count = 0
+        for page in pages():
+            doc = self._hashed(self._terms(page), slot_terms)
+            if not doc:
+                continue
+            df[list(doc)] += 1
+            count += 1
+            if len(sample) < self.batch_size:
+                sample.append(doc)
+            else:
+                j = sample_rng.randrange(count)
+                if j < self.batch_size:
+                    sample[j] = doc
+        self.pages_clustered = count
+        if not count:
+            return self
+        self._idf = (np.log((1 + count) / (1 + df)) + 1).astype(np.float32)
+
+        # Mini-batch k-means (per-centroid learning rate 1 / pages seen)
+        centroids = self._init_centroids(sample, rng)
+        seen = np.zeros(len(centroids))
+        for _ in range(self.epochs):
+            assigned = np.zeros(len(centroids))  # pages per centroid this epoch
+            for batch in self._batches(pages):
+                indices, data, indptr = self._vectors(batch)
+                rows, _ = self._nearest(centroids, indices, data, indptr)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, (np.repeat(rows, np.diff(indptr)), indices), data)
+                batch_counts = np.bincount(rows, minlength=len(centroids))
+                seen += batch_counts
+                assigned += batch_counts
+                hit = batch_counts > 0
+                centroids[hit] += (sums[hit] - batch_counts[hit, None] * centroids[hit]) / seen[hit, None]
+
+        # Centroids no page chose in the last epoch would be empty categories
+        centroids = centroids[assigned > 0]
+        self._centroids = centroids
+        self._squared_norms = (centroids * centroids).sum(axis=1)
+        self._labels = self._name_clusters(centroids, slot_terms)
+        self.categories = list(self._labels)
+        return self
+
+    def _name_clusters(self, centroids, slot_terms, terms_per_name=2):
+        """Name each centroid after its most distinctive terms"""
+        if len(centroids) > 1:
+            others = (centroids.sum(axis=0) - centroids) / (len(centroids) - 1)
+            distinct = centroids - others
+        else:
+            distinct = centroids
+        names = []
+        for row in range(len(centroids)):
+            terms = [slot_terms[slot] for slot in np.argsort(-distinct[row])[:terms_per_name * 4]
+                     if slot_terms[slot] and distinct[row, slot] > 0][:terms_per_name]
+            name = '_'.join(terms) or f"cluster_{row + 1}"
+            unique, n = name, 2
+            while unique in names or unique == 'other':
+                unique, n = f"{name}_{n}", n + 1
+            names.append(unique)
+        return names
+
+    def categorize(self, page):
+        """Name of the page's cluster, or 'other' if it has no title/heading words"""
+        if self._centroids is None:
+            return 'other'
+        doc = self._hashed(self._terms(page))
+        if not doc:
+            return 'other'
+        slots = np.fromiter(doc.keys(), np.int64, len(doc))
+        data = (1 + np.log(np.fromiter(doc.values(), np.float32, len(doc)))) * self._idf[slots]
+        distances = self._squared_norms - 2 * (self._centroids[:, slots] @ data) / np.sqrt(data @ data)
+        return self._labels[distances.argmin()]
+
+
+class UrlPatternSet:
+    """Compiled url_patterns list: substrings, 're:' regexes and 'glob:' globs
+
+    Plain entries keep their old meaning (substring anywhere in the URL).
+    're:' patterns are searched anywhere, 'glob:' patterns must match the
+    whole URL.
+    """
+
+    def __init__(self, patterns):
+        substrings, regexes, globs = [], [], []
+        for pattern in patterns:
+            if pattern.startswith('re:'):
+                regexes.append(f"(?:{pattern[3:]})")
+            elif pattern.startswith('glob:'):
+                globs.append(fnmatch.translate(pattern[5:]))
+            else:
+                substrings.append(pattern)
+
+        self._substrings = SubstringMatcher(substrings)
+        self._regex = re.compile('|'.join(regexes)) if regexes else None
+        self._glob = re.compile('|'.join(globs)) if globs else None
+
+    def matches(self, url):
+        if self._substrings.search(url):
+            return True
+        if self._regex is not None and self._regex.search(url):
+            return True
+        if self._glob is not None and self._glob.match(url):
+            return True
+        return False
+
+
+class UrlFilter:
+    """URL normalization and include/exclude filtering, compiled once
+
+    normalize() lowercases scheme and host, drops default ports and
+    fragments, and optionally the query string and trailing slash, so
+    duplicate spellings of a URL collapse before reaching the frontier.
+    allows() expects an already normalized URL.
+    """
+
+    def __init__(self, base_url, include=(), exclude=(), strip_query=False,
+                 strip_trailing_slash=False):
+        self.strip_query = strip_query
+        self.strip_trailing_slash = strip_trailing_slash
+        # The base URL keeps its trailing slash so it stays a directory prefix
+        self.base_url = self._normalize(base_url, strip_slash=False)
+        self._include = UrlPatternSet(include) if include else None
+        self._exclude = UrlPatternSet(exclude)
+
+    @classmethod
+    def from_config(cls, config):
+        patterns = config.get('url_patterns', {})
+        normalization = config.get('url_normalization', {})
+        return cls(config['base_url'],
+                   include=patterns.get('include', []),
+                   exclude=patterns.get('exclude', []),
+                   strip_query=normalization.get('strip_query', False),
+                   strip_trailing_slash=normalization.get('strip_trailing_slash', False))
+
+    def normalize(self, url):
+        return self._normalize(url, self.strip_trailing_slash)
+
+    def _normalize(self, url, strip_slash):
+        try:
+            parts = urlsplit(url)
+            port = parts.port
+        except ValueError:
+            return url.split('#')[0]
+
+        scheme = parts.scheme.lower()
+        netloc = parts.netloc
+        if parts.hostname:
+            host = parts.hostname
+            if ':' in host:
+                host = f"[{host}]"
+            if port is not None and DEFAULT_PORTS.get(scheme) != port:
+                host = f"{host}:{port}"
+            userinfo = netloc.rpartition('@')[0]
+            netloc = f"{userinfo}@{host}" if userinfo else host
+
+        path = parts.path
+        if netloc and not path:
+            path = '/'
+        if strip_slash and len(path) > 1 and path.endswith('/'):
+            path = path.rstrip('/') or '/'
+
+        query = '' if self.strip_query else parts.query
+        return urlunsplit((scheme, netloc, path, query, ''))
+
+    def allows(self, url):
+        if not url.startswith(self.base_url) and url + '/' != self.base_url:
+            return False
+        if self._include is not None and not self._include.matches(url):
+            return False
+        if self._exclude.matches(url):
+            return False
+        return True
+
+
+class FetchSlots:
+    """Limits on requests in flight: per host, and optionally in total
+
+    Each converter normally has its own. Batch mode shares one between all
+    sites, so sites on the same host share that host's budget and `total`
+    caps requests in flight across every crawl. host_limits overrides
+    per_host for specific hosts.
+    """
+
+    def __init__(self, per_host=4, total=None, host_limits=None):
+        self.per_host = per_host
+        self.host_limits = dict(host_limits or {})
+        self.total = threading.BoundedSemaphore(total) if total else contextlib.nullcontext()
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def host(self, host):
+        """Semaphore limiting in-flight requests to host (politeness budget)"""
+        with self._lock:
+            slot = self._hosts.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.host_limits.get(host, self.per_host))
+                self._hosts[host] = slot
+        return slot
+
+
+class HostRateLimiter:
+    """Adaptive token bucket per host
+
+    Each origin (scheme://host) starts at initial_rate requests/sec. Fast
+    responses (latency <= target_latency) add `increase` to the rate, up to
+    max_rate (default: initial_rate, so it only recovers from backoffs);
+    slow ones shrink it a little. 429/503 responses, including
+    ones urllib3 retried, multiply it by `backoff`, and Retry-After pauses
+    the host. A robots.txt Crawl-delay caps the rate.
+
+    Thread-safe: acquire() is called from fetch workers. Batch mode shares
+    one limiter between the sites on a host.
+    """
+
+    def __init__(self, initial_rate, min_rate=0.2, max_rate=None, burst=1,
+                 target_latency=0.5, increase=0.5, backoff=0.5, adaptive=True,
+                 crawl_delay=None, respect_robots=True):
+        self.initial_rate = initial_rate
+        self.min_rate = min(min_rate, initial_rate)
+        self.max_rate = max(max_rate or initial_rate, initial_rate)
+        self.burst = burst
+        self.target_latency = target_latency
+        self.increase = increase
+        self.backoff = backoff
+        self.adaptive = adaptive
+        self.respect_robots = respect_robots
+        self._crawl_delay = crawl_delay if respect_robots else None
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, crawl_delay=None):
+        """Build from the 'rate_limiter' block; None if rate_limit is 0
+
+        rate_limit stays the ceiling unless 'max_rate' is set higher.
+        """
+        rate_limit = config.get('rate_limit', 0.5)
+        if not rate_limit:
+            return None
+        limiter_config = config.get('rate_limiter', {})
+        return cls(
+            initial_rate=limiter_config.get('initial_rate', 1.0 / rate_limit),
+            min_rate=limiter_config.get('min_rate', 0.2),
+            max_rate=limiter_config.get('max_rate', 1.0 / rate_limit),
+            burst=limiter_config.get('burst', 1),
+            target_latency=limiter_config.get('target_latency', 0.5),
+            increase=limiter_config.get('increase', 0.5),
+            backoff=limiter_config.get('backoff', 0.5),
+            adaptive=limiter_config.get('adaptive', True),
+            crawl_delay=crawl_delay,
+            respect_robots=limiter_config.get('respect_robots', True)
+        )
+
+    def use_crawl_delay(self, crawl_delay):
+        """Look up Crawl-delay with crawl_delay(origin), unless one is set or robots.txt is ignored"""
+        if self.respect_robots and self._crawl_delay is None:
+            self._crawl_delay = crawl_delay
+
+    def _bucket(self, origin):
+        with self._lock:
+            bucket = self._hosts.get(origin)
+        if bucket is not None:
+            return bucket
+
+        # Outside the lock: looking up Crawl-delay may fetch robots.txt
+        delay = self._crawl_delay(origin) if self._crawl_delay else None
+        max_rate = self.max_rate
+        rate = self.initial_rate
+        if delay:
+            max_rate = min(max_rate, 1.0 / delay)
+            rate = min(rate, max_rate)
+        with self._lock:
+            return self._hosts.setdefault(origin, {
+                'rate': rate,
+                'max_rate': max_rate,
+                'tokens': float(self.burst),
+                'updated': time.monotonic(),
+                'not_before': 0.0,
+                'crawl_delay': delay,
+                'backoffs': 0,
+                'requests': 0
+            })
+
+    def acquire(self, origin):
+        """Block until origin may be sent another request"""
+        bucket = self._bucket(origin)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                bucket['tokens'] = min(self.burst, bucket['tokens'] + (now - bucket['updated']) * bucket['rate'])
+                bucket['updated'] = now
+                if now >= bucket['not_before'] and bucket['tokens'] >= 1:
+                    bucket['tokens'] -= 1
+                    bucket['requests'] += 1
+                    return
+                wait_time = max(bucket['not_before'] - now, (1 - bucket['tokens']) / bucket['rate'])
+            time.sleep(wait_time)
+
+    def record(self, origin, status=None, latency=None, retry_after=None, retried_statuses=()):
+        """Adjust origin's rate after a response (status None = no response)"""
+        bucket = self._bucket(origin)
+        with self._lock:
+            if retry_after:
+                bucket['not_before'] = max(bucket['not_before'], time.monotonic() + retry_after)
+            if not self.adaptive:
+                return
+
+            throttled = status is None or status in BACKOFF_STATUSES or any(
+                s in BACKOFF_STATUSES for s in retried_statuses)
+            if throttled:
+                bucket['rate'] = max(self.min_rate, bucket['rate'] * self.backoff)
+                bucket['backoffs'] += 1
+            elif status < 400 and latency is not None:
+                if latency <= self.target_latency:
+                    bucket['rate'] = min(bucket['max_rate'], bucket['rate'] + self.increase)
+                else:
+                    bucket['rate'] = max(self.min_rate, bucket['rate'] * 0.9)
+
+    def record_response(self, origin, response):
+        """record() from a requests Response, including urllib3 retries"""
+        retries = getattr(response.raw, 'retries', None)
+        history = retries.history if retries is not None else ()
+        self.record(origin, status=response.status_code,
+                    latency=response.elapsed.total_seconds(),
+                    retry_after=parse_retry_after(response.headers.get('Retry-After')),
+                    retried_statuses=[h.status for h in history if h.status])
+
+    def total_rate(self):
+        with self._lock:
+            return sum(bucket['rate'] for bucket in self._hosts.values())
+
+    def stats(self):
+        """Current rate and backoff count per origin"""
+        with self._lock:
+            return {origin: {'rate': round(bucket['rate'], 2),
+                             'crawl_delay': bucket['crawl_delay'],
+                             'backoffs': bucket['backoffs'],
+                             'requests': bucket['requests']}
+                    for origin, bucket in self._hosts.items()}
+
+
+def parse_lastmod(value):
+    """Sitemap <lastmod> (W3C datetime) as an aware datetime, or None"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Histogram:
+    """Log-bucketed histogram with fixed memory
+
+    Bucket i holds values up to low * factor**i (the last one everything
+    above), so quantiles are accurate to within one bucket (~20%).
+    """
+
+    def __init__(self, low, high, factor=1.2):
+        self.bounds = []
+        bound = low
+        while bound < high:
+            self.bounds.append(bound)
+            bound *= factor
+        self.bounds.append(bound)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (0 if empty)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self, scale=1.0, digits=1):
+        """Summary plus non-empty buckets, values multiplied by scale"""
+        def r(value):
+            return round(value * scale, digits)
+        return {
+            'count': self.count,
+            'total': r(self.total),
+            'mean': r(self.total / self.count) if self.count else 0,
+            'p50': r(self.quantile(0.5)),
+            'p95': r(self.quantile(0.95)),
+            'p99': r(self.quantile(0.99)),
+            'max': r(self.max),
+            'buckets': [[r(self.bounds[i]) if i < len(self.bounds) else None, n]
+                        for i, n in enumerate(self.counts) if n]
+        }
+
+
+class CrawlStats:
+    """Per-stage latency histograms, bytes per page and rolling throughput
+
+    Stages (seconds):
+      host_wait   waiting for a per-host slot
+      rate_limit  waiting for a rate limiter token
+      connect     DNS lookup + TCP connect, new connections only
+      tls         TLS handshake, new HTTPS connections only
+      server      request sent -> response headers (minus connect/tls)
+      download    reading the response body
+      render      browser rendering
+      archive     compressing + appending raw HTML to the archive
+      parse       parse_html()
+      save        storing the page (dedup + page store)
+      checkpoint  periodic checkpoint/cache/dedup saves
+    plus `page`, the whole fetch -> stored time of each page.
+
+    Histograms are fixed-size and guarded by one lock, so workers can
+    record from any thread. report() returns a progress line every
+    `interval` seconds with pages/sec and page-time p50/p95 over the last
+    `window` seconds.
+    """
+
+    STAGES = ('host_wait', 'rate_limit', 'connect', 'tls', 'server', 'download',
+              'render', 'archive', 'parse', 'save', 'checkpoint', 'page')
+
+    def __init__(self, interval=5.0, window=30.0):
+        self.interval = interval
+        self.window = window
+        self.started = time.time()
+        self.stages = {stage: Histogram(1e-4, 600) for stage in self.STAGES}
+        self.page_bytes = Histogram(256, 2**30, factor=1.5)
+        self.bytes_total = 0
+        self.pages = 0
+        self._recent = deque()  # (finished at, page seconds) within window
+        self._page_started = {}
+        self._started_monotonic = self._last_report = time.monotonic()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self.stages[stage].observe(seconds)
+
+    @contextlib.contextmanager
+    def timed(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe_connection(self, stage, seconds):
+        """connect/tls time; also charged to this thread's current request"""
+        self.observe(stage, seconds)
+        self._local.setup = getattr(self._local, 'setup', 0.0) + seconds
+
+    def take_setup(self):
+        """Connection setup seconds on this thread since the last call"""
+        setup = getattr(self._local, 'setup', 0.0)
+        self._local.setup = 0.0
+        return setup
+
+    def add_bytes(self, n):
+        """Count response bytes toward this thread's current page"""
+        self._local.bytes = getattr(self._local, 'bytes', 0) + n
+
+    def take_bytes(self):
+        n = getattr(self._local, 'bytes', 0)
+        self._local.bytes = 0
+        return n
+
+    def observe_bytes(self, n):
+        with self._lock:
+            self.page_bytes.observe(n)
+            self.bytes_total += n
+
+    def page_started(self, url):
+        with self._lock:
+            self._page_started[url] = time.monotonic()
+
+    def page_finished(self, url):
+        now = time.monotonic()
+        with self._lock:
+            started = self._page_started.pop(url, None)
+            self.pages += 1
+            if started is not None:
+                self.stages['page'].observe(now - started)
+                self._recent.append((now, now - started))
+            while self._recent and self._recent[0][0] < now - self.window:
+                self._recent.popleft()
+
+    def rolling(self):
+        """(pages/sec, p50, p95 page seconds) over the last window"""
+        now = time.monotonic()
+        with self._lock:
+            times = sorted(seconds for finished, seconds in self._recent if finished >= now - self.window)
+        if not times:
+            return 0.0, 0.0, 0.0
+        span = min(self.window, max(now - self._started_monotonic, 1e-9))
+        return len(times) / span, times[len(times) // 2], times[min(len(times) - 1, int(len(times) * 0.95))]
+
+    def report(self, force=False):
+        """Progress line if interval has passed since the last one, else None"""
+        now = time.monotonic()
+        if not force and now - self._last_report < self.interval:
+            return None
+        self._last_report = now
+        rate, p50, p95 = self.rolling()
+        return f"{self.pages} pages, {rate:.1f} pages/s, p50 {p50 * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms"
+
+    def to_dict(self):
+        elapsed = time.time() - self.started
+        with self._lock:
+            return {
+                'started': datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+                'elapsed_seconds': round(elapsed, 2),
+                'pages': self.pages,
+                'pages_per_second': round(self.pages / elapsed, 2) if elapsed else 0,
+                'bytes_total': self.bytes_total,
+                'bytes_per_page': self.page_bytes.to_dict(digits=0),
+                'stages_ms': {stage: hist.to_dict(scale=1000) for stage, hist in self.stages.items() if hist.count}
+            }
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def timed_connection_classes(stats):
+    """urllib3 HTTP/HTTPS connection pools that report connect/tls times to stats"""
+
+    class TimedConnection:
+        _tcp_seconds = 0.0
+
+        def _new_conn(self):
+            start = time.perf_counter()
+            sock = super()._new_conn()
+            self._tcp_seconds = time.perf_counter() - start
+            stats.observe_connection('connect', self._tcp_seconds)
+            return sock
+
+    class TimedHTTPSConnection(TimedConnection, urllib3.connection.HTTPSConnection):
+        def connect(self):
+            start = time.perf_counter()
+            super().connect()
+            stats.observe_connection('tls', max(0.0, time.perf_counter() - start - self._tcp_seconds))
+
+    class TimedHTTPConnection(TimedConnection, urllib3.connection.HTTPConnection):
+        pass
+
+    return {
+        'http': type('TimedHTTPConnectionPool', (urllib3.HTTPConnectionPool,),
+                     {'ConnectionCls': TimedHTTPConnection}),
+        'https': type('TimedHTTPSConnectionPool', (urllib3.HTTPSConnectionPool,),
+                      {'ConnectionCls': TimedHTTPSConnection}),
+    }
+
+
+class BrowserPool:
+    """Pool of Playwright pages rendering concurrently
+
+    Playwright's async API runs on a private event loop thread; render()
+    can be called from any number of fetch threads and blocks until a page
+    is free. Images, fonts and media are not downloaded. Instead of a fixed
+    sleep, rendering waits for ready_selector (typically the main content
+    selector). Each context is closed and replaced after recycle_after
+    pages to keep Chromium's memory bounded.
+    """
+
+    def __init__(self, size=4, ready_selector=None, wait_until='domcontentloaded',
+                 timeout=30000, ready_timeout=10000, recycle_after=50,
+                 block_resources=('image', 'font', 'media'), user_agent=USER_AGENT):
+        self.size = size
+        self.ready_selector = ready_selector
+        self.wait_until = wait_until
+        self.timeout = timeout
+        self.ready_timeout = ready_timeout
+        self.recycle_after = recycle_after
+        self.block_resources = frozenset(block_resources)
+        self.user_agent = user_agent
+        self.pages_rendered = 0
+        self.contexts_recycled = 0
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browser = None
+        self._slots = None
+
+    @classmethod
+    def from_config(cls, config, size):
+        browser_config = config.get('browser', {})
+        return cls(
+            size=size,
+            recycle_after=browser_config.get('recycle_after', 50),
+            block_resources=browser_config.get('block_resources', ['image', 'font', 'media']),
+            **cls.render_options(config)
+        )
+
+    @staticmethod
+    def render_options(config):
+        """A site's render() settings, so one pool can render for several sites"""
+        browser_config = config.get('browser', {})
+        return {
+            'ready_selector': browser_config.get(
+                'ready_selector', config.get('selectors', {}).get('main_content', 'div[role="main"]')),
+            'wait_until': browser_config.get('wait_until', 'domcontentloaded'),
+            'timeout': browser_config.get('timeout', 30000),
+            'ready_timeout': browser_config.get('ready_timeout', 10000)
+        }
+
+    def start(self):
+        """Launch Chromium and open the pages (raises on failure)"""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='browser-pool', daemon=True)
+        self._thread.start()
+        try:
+            self._call(self._start())
+        except Exception:
+            self.close()
+            raise
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _start(self):
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True)
+        self._slots = asyncio.Queue()
+        for _ in range(self.size):
+            self._slots.put_nowait(await self._new_slot())
+
+    async def _new_slot(self):
+        context = await self._browser.new_context(user_agent=self.user_agent)
+        if self.block_resources:
+            await context.route('**/*', self._route)
+        page = await context.new_page()
+        return {'context': context, 'page': page, 'uses': 0}
+
+    async def _route(self, route):
+        if route.request.resource_type in self.block_resources:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def render(self, url, **options):
+        """Rendered HTML of url, or None
+
+        options (see render_options()) override the pool's settings.
+        """
+        return self._call(self._render(url, options))
+
+    async def _render(self, url, options):
+        ready_selector = options.get('ready_selector', self.ready_selector)
+        slot = await self._slots.get()
+        try:
+            if slot['uses'] >= self.recycle_after:
+                await slot['context'].close()
+                slot = await self._new_slot()
+                self.contexts_recycled += 1
+            slot['uses'] += 1
+
+            page = slot['page']
+            try:
+                await page.goto(url, wait_until=options.get('wait_until', self.wait_until),
+                                timeout=options.get('timeout', self.timeout))
+                if ready_selector:
+                    await page.wait_for_selector(ready_selector,
+                                                 timeout=options.get('ready_timeout', self.ready_timeout))
+            except PlaywrightTimeout:
+                print(f"  ⚠️  Timeout waiting for page load")
+                # Try to get content anyway
+
+            self.pages_rendered += 1
+            return await page.content()
+        except Exception:
+            # Page may be unusable - replace its context on next use
+            slot['uses'] = self.recycle_after
+            raise
+        finally:
+            self._slots.put_nowait(slot)
+
+    async def _close(self):
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+
+    def close(self):
+        if self._loop is None:
+            return
+        try:
+            self._call(self._close())
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+
+class ContentDeduper:
+    """Exact and near-duplicate detection for scraped pages
+
+    Each page is fingerprinted by a SHA-1 of its normalized text and a
+    MinHash signature of its 3-word shingles. The signature uses one
+    permutation hashing: each shingle is hashed once into one of
+    PERMUTATIONS bins, and each bin keeps its minimum. Empty bins borrow from
+    the next filled bin ("densification"). Near-duplicates are pages whose
+    estimated Jaccard similarity is at least `similarity`. They are found
+    with LSH: signatures are cut into bands, and only pages sharing a band
+    are compared.
+
+    The first URL seen with some content is canonical; later URLs with the
+    same content become aliases of it. If a canonical page's content
+    changes, its aliases are dropped and listed in take_released(), since
+    their content is no longer stored anywhere.
+
+    Near-duplicate matching is off by default: templated pages (one per API
+    endpoint, say) can be similar without being the same page.
+    """
+
+    PERMUTATIONS = 64
+    BANDS = 16
+
+    def __init__(self, similarity=0.9, min_words=50, near_duplicates=False):
+        self.similarity = similarity
+        self.min_words = min_words
+        self.near_duplicates = near_duplicates
+        self.rows = self.PERMUTATIONS // self.BANDS
+        self.aliases = {}  # duplicate url -> canonical url
+        self._alias_sets = defaultdict(set)  # canonical url -> its aliases
+        self._released = []
+        self._fingerprints = {}  # url -> (exact, signature)
+        self._exact = {}
+        self._buckets = [defaultdict(set) for _ in range(self.BANDS)]
+
+    def fingerprint(self, page):
+        """(exact_hash, minhash_signature) of page content, or None if too short to judge"""
+        text = page.get('content', '') + ' ' + ' '.join(
+            sample.get('code', '') for sample in page.get('code_samples', []))
+        words = re.findall(r'\w+', text.lower())
+        if len(words) < self.min_words:
+            return None
+
+        exact = hashlib.sha1(' '.join(words).encode('utf-8')).hexdigest()
+        bins = [None] * self.PERMUTATIONS
+        for shingle in {' '.join(words[i:i + 3]) for i in range(len(words) - 2)}:
+            h = int.from_bytes(hashlib.md5(shingle.encode('utf-8')).digest()[:6], 'big')
+            b = h % self.PERMUTATIONS
+            v = h // self.PERMUTATIONS
+            if bins[b] is None or v < bins[b]:
+                bins[b] = v
+
+        # Densify: an empty bin takes the next filled bin's value, offset by the distance
+        if None in bins:
+            n = self.PERMUTATIONS
+            filled = list(bins)
+            for b in range(n):
+                if filled[b] is None:
+                    distance = 1
+                    while filled[(b + distance) % n] is None:
+                        distance += 1
+                    bins[b] = filled[(b + distance) % n] ^ (distance * 0x9E3779B1)
+        # Low 32 bits are plenty to compare and keep the index small
+        signature = tuple(v & 0xFFFFFFFF for v in bins)
+        return exact, signature
+
+    def _band_keys(self, signature):
+        return [signature[band * self.rows:(band + 1) * self.rows] for band in range(self.BANDS)]
+
+    def _near(self, signature):
+        checked = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            for url in self._buckets[band].get(key, ()):
+                if url in checked:
+                    continue
+                checked.add(url)
+                other = self._fingerprints[url][1]
+                matches = sum(a == b for a, b in zip(signature, other))
+                if matches >= self.similarity * self.PERMUTATIONS:
+                    return url
+        return None
+
+    def _index(self, url, exact, signature):
+        self._fingerprints[url] = (exact, signature)
+        self._exact.setdefault(exact, url)
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band][key].add(url)
+
+    def _alias(self, url, canonical):
+        self.aliases[url] = canonical
+        self._alias_sets[canonical].add(url)
+
+    def _forget(self, url):
+        canonical = self.aliases.pop(url, None)
+        if canonical is not None:
+            self._alias_sets[canonical].discard(url)
+        fingerprint = self._fingerprints.pop(url, None)
+        if fingerprint is None:
+            return
+        exact, signature = fingerprint
+        if self._exact.get(exact) == url:
+            del self._exact[exact]
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band][key].discard(url)
+
+    def add(self, url, page):
+        """Register page; returns the canonical URL if it duplicates another page"""
+        previous = self._fingerprints.get(url)
+        self._forget(url)
+        fingerprint = self.fingerprint(page)
+        if previous is not None and (fingerprint is None or fingerprint[0] != previous[0]):
+            # Canonical content changed: its aliases no longer match what is stored
+            for alias in self._alias_sets.pop(url, ()):
+                del self.aliases[alias]
+                self._released.append(alias)
+        if fingerprint is None:
+            return None
+
+        exact, signature = fingerprint
+        canonical = self._exact.get(exact)
+        if canonical is None and self.near_duplicates:
+            canonical = self._near(signature)
+        if canonical is not None:
+            self._alias(url, canonical)
+            return canonical
+
+        self._index(url, exact, signature)
+        return None
+
+    def take_released(self):
+        """Aliases dropped since the last call because their canonical page changed"""
+        released, self._released = self._released, []
+        return released
+
+    def to_dict(self):
+        return {
+            'fingerprints': {url: [exact, base64.b64encode(array('I', signature).tobytes()).decode('ascii')]
+                             for url, (exact, signature) in self._fingerprints.items()},
+            'aliases': self.aliases
+        }
+
+    def load(self, data):
+        for url, (exact, packed) in data.get('fingerprints', {}).items():
+            signature = array('I')
+            signature.frombytes(base64.b64decode(packed))
+            if len(signature) == self.PERMUTATIONS:
+                self._index(url, exact, tuple(signature))
+        for url, canonical in data.get('aliases', {}).items():
+            self._alias(url, canonical)
+
+
+class PageStore:
+    """Append-only page storage: JSONL segments plus a URL-hash index
+
+    Each page is one JSON line appended to the current segment
+    (pages-00000.jsonl, ...). index.jsonl gets one line per write,
+    [url_hash, segment, offset, length, url]; the last line for a URL wins.
+    Index lines are written after the record, so a crash can only lose
+    the last page. compact() drops records superseded by later writes.
+
+    Writes happen on the crawl thread only; get() may be called from
+    worker threads.
+    """
+
+    INDEX_FILE = 'index.jsonl'
+
+    def __init__(self, path, segment_bytes=64 * 1024 * 1024):
+        self.path = Path(path)
+        self.segment_bytes = segment_bytes
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._index = {}
+        self._stale_bytes = 0
+        self._segment = 0
+        self._writer = None
+        self._index_writer = None
+        self._load_index()
+
+    @staticmethod
+    def key(url):
+        return hashlib.md5(url.encode()).hexdigest()
+
+    def _segment_path(self, segment):
+        return self.path / f"pages-{segment:05d}.jsonl"
+
+    def _load_index(self):
+        index_path = self.path / self.INDEX_FILE
+        if not index_path.exists():
+            return
+
+        sizes = {}
+        with open(index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    key, segment, offset, length, url = json.loads(line)
+                except ValueError:
+                    continue  # torn final line
+                if segment not in sizes:
+                    seg_path = self._segment_path(segment)
+                    sizes[segment] = seg_path.stat().st_size if seg_path.exists() else 0
+                if offset + length > sizes[segment]:
+                    continue  # record never made it to disk
+                if key in self._index:
+                    self._stale_bytes += self._index[key][2]
+                self._index[key] = (segment, offset, length, url)
+                self._segment = max(self._segment, segment)
+
+    def put(self, page):
+        """Append a page; returns its key"""
+        if self._writer is None:
+            self._open_writers()
+
+        record = (json.dumps(page, ensure_ascii=False) + '\n').encode('utf-8')
+        offset = self._writer.tell()
+        if offset and offset + len(record) > self.segment_bytes:
+            self._writer.close()
+            self._segment += 1
+            self._writer = open(self._segment_path(self._segment), 'ab')
+            self._writer.seek(0, os.SEEK_END)
+            offset = self._writer.tell()
+
+        self._writer.write(record)
+        self._writer.flush()
+
+        key = self.key(page['url'])
+        if key in self._index:
+            self._stale_bytes += self._index[key][2]
+        self._index_writer.write(json.dumps([key, self._segment, offset, len(record), page['url']]) + '\n')
+        self._index_writer.flush()
+        self._index[key] = (self._segment, offset, len(record), page['url'])
+        return key
+
+    def _open_writers(self):
+        self._writer = open(self._segment_path(self._segment), 'ab')
+        self._writer.seek(0, os.SEEK_END)
+        self._index_writer = open(self.path / self.INDEX_FILE, 'a', encoding='utf-8')
+
+    def get(self, url):
+        """Latest stored page for url, or None"""
+        location = self._index.get(self.key(url))
+        if location is None:
+            return None
+        segment, offset, length, _ = location
+        with open(self._segment_path(segment), 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def __contains__(self, url):
+        return self.key(url) in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def urls(self):
+        """Stored URLs, without reading any pages"""
+        return [location[3] for location in self._index.values()]
+
+    def __iter__(self):
+        """Stream pages in insertion order, reading each segment sequentially"""
+        handles = {}
+        try:
+            for segment, offset, length, _ in list(self._index.values()):
+                f = handles.get(segment)
+                if f is None:
+                    f = handles[segment] = open(self._segment_path(segment), 'rb')
+                f.seek(offset)
+                yield json.loads(f.read(length))
+        finally:
+            for f in handles.values():
+                f.close()
+
+    def close(self):
+        for f in (self._writer, self._index_writer):
+            if f:
+                f.close()
+        self._writer = None
+        self._index_writer = None
+
+    def compact(self, min_stale_ratio=0.5):
+        """Rewrite live records if at least min_stale_ratio of the store is stale"""
+        live_bytes = sum(location[2] for location in self._index.values())
+        total = live_bytes + self._stale_bytes
+        if not total or self._stale_bytes / total < min_stale_ratio:
+            return False
+
+        self.close()
+        tmp = self.path.with_name(self.path.name + '.compact')
+        shutil.rmtree(tmp, ignore_errors=True)
+        compacted = PageStore(tmp, self.segment_bytes)
+        for page in self:
+            compacted.put(page)
+        compacted.close()
+
+        old = self.path.with_name(self.path.name + '.old')
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(self.path, old)
+        os.replace(tmp, self.path)
+        shutil.rmtree(old, ignore_errors=True)
+
+        self._index = {}
+        self._stale_bytes = 0
+        self._segment = 0
+        self._load_index()
+        return True
+
+
+class RawArchive:
+    """Content-addressed archive of raw HTML, for re-extraction without re-crawling
+
+    Each distinct body (by SHA-256) is stored once, as a gzip member
+    appended to the current segment (raw-00000.warc.gz, ...). A member is
+    a WARC/1.1 'resource' record, so segments also open with WARC tools.
+    index.jsonl gets one line per archived fetch, [url, sha256, segment,
+    offset, length]; the last line for a URL wins. A body already archived
+    (another URL, or an earlier crawl) only adds an index line.
+
+    put() may be called from fetch threads: compression happens outside
+    the lock, only the append is serialized.
+    """
+
+    INDEX_FILE = 'index.jsonl'
+    RENDERED_TYPE = 'text/html; charset=utf-8'  # browser output, archived from str
+
+    def __init__(self, path, segment_bytes=256 * 1024 * 1024, level=6):
+        self.path = Path(path)
+        self.segment_bytes = segment_bytes
+        self.level = level
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._urls = {}  # url -> sha256
+        self._blobs = {}  # sha256 -> (segment, offset, length)
+        self._segment = 0
+        self._writer = None
+        self._index_writer = None
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _segment_path(self, segment):
+        return self.path / f"raw-{segment:05d}.warc.gz"
+
+    def _load_index(self):
+        index_path = self.path / self.INDEX_FILE
+        if not index_path.exists():
+            return
+
+        sizes = {}
+        with open(index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    url, digest, segment, offset, length = json.loads(line)
+                except ValueError:
+                    continue  # torn final line
+                if segment not in sizes:
+                    seg_path = self._segment_path(segment)
+                    sizes[segment] = seg_path.stat().st_size if seg_path.exists() else 0
+                if offset + length > sizes[segment]:
+                    continue  # record never made it to disk
+                self._urls[url] = digest
+                self._blobs.setdefault(digest, (segment, offset, length))
+                self._segment = max(self._segment, segment)
+
+    def _record(self, url, body, digest, content_type):
+        """One gzip-compressed WARC resource record"""
+        header = (f"WARC/1.1\r\n"
+                  f"WARC-Type: resource\r\n"
+                  f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+                  f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+                  f"WARC-Target-URI: {url}\r\n"
+                  f"WARC-Payload-Digest: sha256:{digest}\r\n"
+                  f"Content-Type: {content_type}\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode('utf-8')
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)  # wbits 31: gzip framing
+        return compressor.compress(header + body + b'\r\n\r\n') + compressor.flush()
+
+    def put(self, url, html, digest=None):
+        """Archive the HTML fetched for url; returns its SHA-256"""
+        rendered = isinstance(html, str)
+        body = html.encode('utf-8') if rendered else html
+        digest = digest or hashlib.sha256(body).hexdigest()
+        if self._urls.get(url) == digest:
+            return digest
+
+        record = None
+        if digest not in self._blobs:
+            record = self._record(url, body, digest, self.RENDERED_TYPE if rendered else 'text/html')
+
+        with self._lock:
+            if self._writer is None:
+                self._open_writers()
+            location = self._blobs.get(digest)
+            if location is None:
+                offset = self._writer.tell()
+                if offset and offset + len(record) > self.segment_bytes:
+                    self._writer.close()
+                    self._segment += 1
+                    self._writer = open(self._segment_path(self._segment), 'ab')
+                    self._writer.seek(0, os.SEEK_END)
+                    offset = self._writer.tell()
+                self._writer.write(record)
+                self._writer.flush()
+                location = self._blobs[digest] = (self._segment, offset, len(record))
+            self._index_writer.write(json.dumps([url, digest, *location]) + '\n')
+            self._index_writer.flush()
+            self._urls[url] = digest
+        return digest
+
+    def _open_writers(self):
+        self._writer = open(self._segment_path(self._segment), 'ab')
+        self._writer.seek(0, os.SEEK_END)
+        self._index_writer = open(self.path / self.INDEX_FILE, 'a', encoding='utf-8')
+
+    def digest(self, url):
+        """SHA-256 of the latest HTML archived for url, or None"""
+        return self._urls.get(url)
+
+    def location(self, url):
+        """(segment file, offset, length) of url's record, for read_record()"""
+        digest = self._urls.get(url)
+        if digest is None:
+            return None
+        segment, offset, length = self._blobs[digest]
+        return str(self._segment_path(segment)), offset, length
+
+    def get(self, url):
+        """Latest archived HTML for url (bytes, or str if browser-rendered), or None"""
+        location = self.location(url)
+        return self.read_record(*location) if location else None
+
+    @classmethod
+    def read_record(cls, path, offset, length):
+        """Decompress one record; needs no archive instance (used by parser processes)"""
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = zlib.decompress(f.read(length), 31)
+        split = data.index(b'\r\n\r\n')
+        body = data[split + 4:-4]
+        if f"Content-Type: {cls.RENDERED_TYPE}".encode('utf-8') in data[:split]:
+            return body.decode('utf-8')
+        return body
+
+    def urls(self):
+        """Archived URLs, in the order they were first archived"""
+        return list(self._urls)
+
+    def __contains__(self, url):
+        return url in self._urls
+
+    def __len__(self):
+        return len(self._urls)
+
+    def close(self):
+        with self._lock:
+            for f in (self._writer, self._index_writer):
+                if f:
+                    f.close()
+            self._writer = None
+            self._index_writer = None
+
+
+class ReferenceWriter:
+    """Incrementally writes one category's reference markdown, in shards
+
+    Page sections are buffered up to flush_bytes and appended to the
+    current shard's body file (<category>.<n>.part). A new shard starts
+    when the next page would take the current one past max_bytes (0 means
+    no limit). Headers need final page counts, so close() writes each
+    shard's header and then copies its body after it.
+
+    The first shard is always <category>.md, so links to it keep working;
+    further shards are <category>-2.md, <category>-3.md, ... Each page's
+    position is spooled to <category>.toc.part so index.md can list it
+    without keeping it in memory; iter_toc() reads it back with final line
+    and byte offsets.
+    """
+
+    def __init__(self, path, max_bytes=0, flush_bytes=256 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.flush_bytes = flush_bytes
+        self.pages = 0
+        self.shards = []  # per shard: body pages/bytes/lines, then file and header size
+        self.toc_path = self.path.with_name(self.path.stem + '.toc.part')
+        self._buffer = []
+        self._toc_buffer = []
+        self._buffered = 0
+        self._toc_started = False
+        self._new_shard()
+
+    @property
+    def files(self):
+        """Final file name of each shard"""
+        return [self.path.name] + [f"{self.path.stem}-{i}{self.path.suffix}"
+                                   for i in range(2, len(self.shards) + 1)]
+
+    def _part_path(self, index):
+        return self.path.with_name(f"{self.path.stem}.{index}.part")
+
+    def _new_shard(self):
+        self.shards.append({'pages': 0, 'bytes': 0, 'lines': 0, 'started': False})
+
+    def add(self, lines, title=''):
+        """Append one page's lines; returns its position for locate()"""
+        chunk = '\n' + '\n'.join(lines)
+        size = len(chunk.encode('utf-8'))
+        shard = self.shards[-1]
+        if self.max_bytes and shard['pages'] and shard['bytes'] + size > self.max_bytes:
+            self.flush()
+            self._new_shard()
+            shard = self.shards[-1]
+
+        position = (len(self.shards) - 1, shard['bytes'], size, shard['lines'], chunk.count('\n'))
+        title = ' '.join(title.split())
+        self._toc_buffer.append('\t'.join(map(str, position)) + f"\t{title}\n")
+        self._buffer.append(chunk)
+        self._buffered += size
+        shard['pages'] += 1
+        shard['bytes'] += size
+        shard['lines'] += position[4]
+        self.pages += 1
+        if self._buffered >= self.flush_bytes:
+            self.flush()
+        return position
+
+    def flush(self):
+        # Open per flush so hundreds of categories don't hold hundreds of files open.
+        # The first write to each file truncates leftovers from an interrupted build.
+        if self._buffer:
+            shard = self.shards[-1]
+            with open(self._part_path(len(self.shards) - 1), 'a' if shard['started'] else 'w', encoding='utf-8') as f:
+                f.write(''.join(self._buffer))
+            shard['started'] = True
+            self._buffer = []
+            self._buffered = 0
+        if self._toc_buffer:
+            with open(self.toc_path, 'a' if self._toc_started else 'w', encoding='utf-8') as f:
+                f.write(''.join(self._toc_buffer))
+            self._toc_started = True
+            self._toc_buffer = []
+
+    def close(self, make_header):
+        """Write the final files: each shard's header, then its body
+
+        make_header(part, parts, pages) returns a shard's header lines.
+        """
+        self.flush()
+        files = self.files
+        for index, (shard, name) in enumerate(zip(self.shards, files)):
+            header = '\n'.join(make_header(index + 1, len(files), shard['pages']))
+            shard['file'] = name
+            shard['header_bytes'] = len(header.encode('utf-8'))
+            shard['header_lines'] = header.count('\n')
+            part_path = self._part_path(index)
+            with open(self.path.with_name(name), 'w', encoding='utf-8') as out:
+                out.write(header)
+                if part_path.exists():
+                    with open(part_path, 'r', encoding='utf-8') as body:
+                        shutil.copyfileobj(body, out)
+                    part_path.unlink()
+
+        # Files from an earlier build: more shards, or the old <category>-1.md first shard
+        first = self.path.with_name(f"{self.path.stem}-1{self.path.suffix}")
+        if first.exists():
+            first.unlink()
+        n = len(files) + 1
+        while self.path.with_name(f"{self.path.stem}-{n}{self.path.suffix}").exists():
+            self.path.with_name(f"{self.path.stem}-{n}{self.path.suffix}").unlink()
+            n += 1
+
+    def locate(self, position):
+        """(file, first line, last line, start byte, end byte) of a page
+
+        `position` is what add() returned. Lines are 1-based and inclusive;
+        the byte range is end-exclusive and starts at the page's '## '
+        heading. Only valid after close().
+        """
+        index, offset, size, lines_before, newlines = position
+        shard = self.shards[index]
+        start = shard['header_bytes'] + offset + 1  # skip the separating newline
+        first = shard['header_lines'] + lines_before + 2
+        return shard['file'], first, first + newlines - 2, start, start + size - 1
+
+    def iter_toc(self):
+        """(file, title, first line, last line, start byte, end byte) per page
+
+        Call after close(); the spooled entries are removed once read.
+        """
+        if not self.toc_path.exists():
+            return
+        try:
+            with open(self.toc_path, 'r', encoding='utf-8') as f:
+                for entry in f:
+                    fields = entry.rstrip('\n').split('\t', 5)
+                    name, first, last, start, end = self.locate(tuple(map(int, fields[:5])))
+                    yield name, fields[5], first, last, start, end
+        finally:
+            self.remove_toc()
+
+    def remove_toc(self):
+        if self.toc_path.exists():
+            self.toc_path.unlink()
+
+
+SEARCH_SCRIPT = """#!/usr/bin/env python3
+\"\"\"
+Search this skill's reference files (generated by doc_scraper.py)
+
+Usage:
+    python3 scripts/search.py "state hook"
+    python3 scripts/search.py "effect cleanup" -k 10 --json
+
+Prints the best-matching sections as references/<file>:<first>-<last> line
+ranges, so only those lines need to be viewed.
+\"\"\"
+
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+
+INDEX = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'references', 'search.db')
+FIELDS = ('file', 'first_line', 'last_line', 'start_byte', 'end_byte', 'title', 'url', 'rank')
+
+
+def _rare_terms(db, terms):
+    \"\"\"Terms in at most half the sections
+
+    BM25 gives words in over half the sections no weight, and ranking every
+    section they match is slow, so OR queries leave them out.
+    \"\"\"
+    half = (db.execute("SELECT max(id) FROM sections").fetchone()[0] or 0) // 2
+    return [term for term in terms if db.execute(
+        "SELECT count(*) FROM (SELECT 1 FROM pages WHERE pages MATCH ? LIMIT ?)",
+        (term, half + 1)).fetchone()[0] <= half]
+
+
+def search(query, k=5, raw=False, index=INDEX):
+    \"\"\"Top-k sections for query, best first
+
+    Sections containing all the query's words come first; if there are
+    fewer than k, sections with any of them fill the rest. Ranked with
+    BM25, title and headings weighing most. With raw=True the query is
+    passed to FTS5 as is.
+    \"\"\"
+    terms = [f'"{term}"' for term in re.findall(r'\\w+', query)]
+    if not raw and not terms:
+        return []
+    db = sqlite3.connect(f"file:{index}?mode=ro", uri=True)
+    try:
+        if raw:
+            queries = [query]
+        elif len(terms) == 1:
+            queries = terms
+        else:
+            queries = [' AND '.join(terms), ' OR '.join(_rare_terms(db, terms) or terms)]
+        rows, seen = [], set()
+        for fts_query in queries:
+            for row in db.execute(
+                    "SELECT s.id, s.file, s.first_line, s.last_line, s.start_byte, s.end_byte, s.title, "
+                    "s.url, m.rank FROM (SELECT rowid, rank FROM pages WHERE pages MATCH ? "
+                    "ORDER BY rank LIMIT ?) AS m JOIN sections s ON s.id = m.rowid ORDER BY m.rank",
+                    (fts_query, k)):
+                if row[0] not in seen and len(rows) < k:
+                    seen.add(row[0])
+                    rows.append(row[1:])
+            if len(rows) >= k:
+                break
+    finally:
+        db.close()
+    return [dict(zip(FIELDS, row)) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Search the reference files of this skill')
+    parser.add_argument('query', nargs='+', help='Words to search for')
+    parser.add_argument('-k', type=int, default=5, help='Number of sections to return (default: 5)')
+    parser.add_argument('--raw', action='store_true', help='Pass the query to SQLite FTS5 unchanged')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    if not os.path.exists(INDEX):
+        print(f"No search index at {INDEX}", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    try:
+        results = search(' '.join(args.query), args.k, args.raw)
+    except sqlite3.OperationalError as e:
+        print(f"Invalid query: {e}", file=sys.stderr)
+        sys.exit(2)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if args.json:
+        print(json.dumps({'results': results, 'ms': round(elapsed_ms, 2)}, indent=2))
+        return
+    for r in results:
+        print(f"references/{r['file']}:{r['first_line']}-{r['last_line']}  {r['title']}")
+        print(f"    {r['url']}")
+    print(f"{len(results)} results in {elapsed_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
+"""
+
+
+class SearchIndexWriter:
+    """SQLite FTS5 index of a skill's reference sections
+
+    One row per page: title, headings, content and code, with the same
+    limits as the reference file. The FTS table is contentless because the
+    text is already in the reference files. It uses the default
+    detail=full because bm25() returns 0 for every row under detail=column.
+    A `sections` table maps each row to its file, line range and byte
+    range. Rows are added while pages stream by, with their ReferenceWriter
+    position, and get their final file and offsets in close(), once shard
+    headers are written.
+
+    Built in <path>.part and renamed into place, so a failed build leaves
+    the previous index intact.
+    """
+
+    def __init__(self, path, batch_size=1000):
+        self.path = Path(path)
+        self.part_path = self.path.with_name(self.path.name + '.part')
+        self.batch_size = batch_size
+        self.rows = 0
+        self._pages = []
+        self._sections = []
+        if self.part_path.exists():
+            self.part_path.unlink()
+        self._db = sqlite3.connect(self.part_path)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("CREATE VIRTUAL TABLE pages USING fts5("
+                         "title, headings, content, code, content='', tokenize='porter unicode61')")
+        self._db.execute("CREATE TABLE sections (id INTEGER PRIMARY KEY, category TEXT, shard INTEGER, "
+                         "file TEXT, first_line INTEGER, last_line INTEGER, start_byte INTEGER, "
+                         "end_byte INTEGER, title TEXT, url TEXT)")
+
+    @staticmethod
+    def fts5_available():
+        try:
+            sqlite3.connect(':memory:').execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def add(self, category, position, page):
+        """Index one page written to `category` at ReferenceWriter `position`"""
+        self.rows += 1
+        code = '\n'.join(sample.get('code', sample if isinstance(sample, str) else '')[:600]
+                         for sample in page.get('code_samples', [])[:4])
+        self._pages.append((self.rows, page['title'],
+                            '\n'.join(h['text'] for h in page.get('headings', [])[:10]),
+                            page.get('content', '')[:2500], code))
+        self._sections.append((self.rows, category, *position, page['title'], page['url']))
+        if len(self._pages) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Raw positions go in the offset columns until close() locates them
+        self._db.executemany("INSERT INTO pages(rowid, title, headings, content, code) VALUES (?, ?, ?, ?, ?)",
+                             self._pages)
+        self._db.executemany("INSERT INTO sections (id, category, shard, start_byte, end_byte, first_line, "
+                             "last_line, title, url) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self._sections)
+        self._pages = []
+        self._sections = []
+
+    def close(self, writers):
+        """Fill in final offsets from the closed {category: ReferenceWriter}"""
+        self.flush()
+        last_id = 0
+        while True:
+            rows = self._db.execute("SELECT id, category, shard, start_byte, end_byte, first_line, last_line "
+                                    "FROM sections WHERE id > ? ORDER BY id LIMIT ?",
+                                    (last_id, self.batch_size)).fetchall()
+            if not rows:
+                break
+            self._db.executemany("UPDATE sections SET file = ?, first_line = ?, last_line = ?, "
+                                 "start_byte = ?, end_byte = ? WHERE id = ?",
+                                 [(*writers[row[1]].locate(row[2:]), row[0]) for row in rows])
+            last_id = rows[-1][0]
+        # Default ORDER BY rank: BM25 with title and headings weighted up
+        self._db.execute("INSERT INTO pages(pages, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0, 2.0)')")
+        self._db.execute("INSERT INTO pages(pages) VALUES ('optimize')")
+        self._db.commit()
+        self._db.execute("VACUUM")
+        self._db.close()
+        os.replace(self.part_path, self.path)
+
+    def discard(self):
+        self._db.close()
+        self.part_path.unlink()
+
 
 class DocToSkillConverter:
-    def __init__(self, config, dry_run=False, resume=False):
+    def __init__(self, config, dry_run=False, resume=False, incremental=False,
+                 fetch_slots=None, browser_pool=None, rate_limiter=None):
         self.config = config
         self.name = config['name']
         self.base_url = config['base_url']
+        self.url_filter = UrlFilter.from_config(config)
         self.dry_run = dry_run
         self.resume = resume
+        self.incremental = incremental
 
         # Paths
         self.data_dir = f"output/{self.name}_data"
         self.skill_dir = f"output/{self.name}"
         self.checkpoint_file = f"{self.data_dir}/checkpoint.json"
+        self.journal_file = f"{self.data_dir}/checkpoint.journal"
+        self.http_cache_file = f"{self.data_dir}/http_cache.json"
+        self.dedup_file = f"{self.data_dir}/dedup.json"
+        self.store_dir = f"{self.data_dir}/store"
+        self.archive_dir = f"{self.data_dir}/raw"
 
         # Checkpoint config
         checkpoint_config = config.get('checkpoint', {})
         self.checkpoint_enabled = checkpoint_config.get('enabled', False)
         self.checkpoint_interval = checkpoint_config.get('interval', 1000)
+        self.checkpoint_fsync = checkpoint_config.get('fsync', False)
+        self._journal = None
+        self._journal_seq = 0
 
-        # JavaScript rendering config
+        # JavaScript rendering config: use_browser is true, false or "auto"
         self.use_browser = config.get('use_browser', False)
-        self.playwright = None
-        self.browser = None
-        self.page_context = None
+        self.fetch_mode = 'auto' if self.use_browser == 'auto' else ('browser' if self.use_browser else 'static')
+        self.browser_pool = browser_pool  # passed in: shared with other sites, not closed here
+        self._shared_browser = browser_pool is not None
+        self.render_options = BrowserPool.render_options(config)
+        self._browser_lock = threading.Lock()
+        browser_config = config.get('browser', {})
+        self.min_main_text = browser_config.get('min_text', 200)
+        self.prefix_depth = browser_config.get('prefix_depth', 2)
+        self._prefix_modes = {}  # auto mode: URL prefix -> 'static' / 'browser'
+        self.fetch_counts = {'static': 0, 'browser': 0}
+
+        # HTML parser backend
+        self.parser_backend = self._resolve_parser_backend(config.get('parser', 'html.parser'))
+        self.extractor_key = self._extractor_key()
+        # Compiled once: extract_content() tests it against every element of every page
+        self._code_blocks = None
+        if self.parser_backend != 'selectolax':
+            self._code_blocks = soupsieve.compile(config.get('selectors', {}).get('code_blocks', 'pre code'))
+
+        # Concurrency config (browser mode defaults to one worker per pool page)
+        self.browser_pages = browser_pages = max(1, int(browser_config.get('pages', 4)))
+        default_concurrency = browser_pages if self.use_browser else 1
+        self.concurrency = max(1, int(config.get('concurrency', default_concurrency)))
+        self.per_host_concurrency = max(1, int(config.get('per_host_concurrency', min(self.concurrency, 4))))
+        self.parser_workers = max(0, int(config.get('parser_workers', 0)))
+        self.parse_queue_size = max(1, int(config.get('parse_queue_size', 2 * max(1, self.parser_workers))))
+        self.fetch_slots = fetch_slots if fetch_slots is not None else FetchSlots(self.per_host_concurrency)
+        self._in_flight = set()
+
+        # Crawl telemetry: stage histograms, progress line, crawl_stats.json
+        telemetry_config = config.get('telemetry', {})
+        self.crawl_stats = CrawlStats(interval=telemetry_config.get('interval', 5),
+                                      window=telemetry_config.get('window', 30))
+        self.crawl_stats_file = f"{self.data_dir}/crawl_stats.json"
+
+        # HTTP transport config
+        http_config = config.get('http', {})
+        self.request_timeout = http_config.get('timeout', 30)
+        self.session = self._create_session(http_config)
+
+        # Per-host adaptive rate limiting ("rate_limit": 0 disables it)
+        self._robots = {}
+        self._robots_lock = threading.Lock()
+        if rate_limiter is not None:
+            # Passed in: shared with other sites on the same host
+            self.rate_limiter = rate_limiter
+            rate_limiter.use_crawl_delay(self._crawl_delay)
+        else:
+            self.rate_limiter = HostRateLimiter.from_config(config, crawl_delay=self._crawl_delay)
+
+        # Sitemap discovery
+        sitemap_config = config.get('sitemap', {})
+        self.sitemap_enabled = sitemap_config.get('enabled', False)
+        self.sitemap_urls = sitemap_config.get('urls', [])
+        self.sitemap_max_files = sitemap_config.get('max_files', 1000)
+        self._sitemap_lastmod = {}
 
         # State
         self.visited_urls = set()
-        # Support multiple starting URLs
+        # Support multiple starting URLs; with priority enabled the best-scored URL is fetched next
+        self.prioritize = config.get('priority', {}).get('enabled', False)
         start_urls = config.get('start_urls', [self.base_url])
-        self.pending_urls = deque(start_urls)
-        self.pages = []
+        self.pending_urls = self._new_frontier(self.url_filter.normalize(url) for url in start_urls)
+        self.pages = []  # {'title', 'url'} per scraped page, for the summary
         self.pages_scraped = 0
+        self.pages_unchanged = 0
+        self.pages_duplicate = 0
+
+        # Page storage
+        storage_config = config.get('storage', {})
+        self.store = None
+        if not dry_run:
+            self.store = PageStore(self.store_dir, storage_config.get('segment_mb', 64) * 1024 * 1024)
+
+        # Raw HTML archive (opt-in), for --reparse without touching the network
+        archive_config = config.get('archive', {})
+        self.raw_archive = None
+        if archive_config.get('enabled', False) and not dry_run:
+            self.raw_archive = RawArchive(self.archive_dir,
+                                          segment_bytes=archive_config.get('segment_mb', 256) * 1024 * 1024,
+                                          level=archive_config.get('compression_level', 6))
+
+        # Per-URL validators (ETag, Last-Modified, content hash) for incremental refresh
+        self.http_cache = {}
+        if not dry_run:
+            self.load_http_cache()
+
+        # Content fingerprints: pages with the same content are stored once
+        dedup_config = config.get('dedup', {})
+        self.deduper = None
+        if dedup_config.get('enabled', True):
+            self.deduper = ContentDeduper(similarity=dedup_config.get('similarity', 0.9),
+                                          min_words=dedup_config.get('min_words', 50),
+                                          near_duplicates=dedup_config.get('near_duplicates', False))
+            if not dry_run:
+                self.load_dedup_index()
+
+        # Reference shards: a category's pages are split into files of about max_tokens
+        self.reference_max_tokens = config.get('references', {}).get('max_tokens', 20000)
+
+        # Full-text search index (references/search.db + scripts/search.py)
+        self.search_index_enabled = config.get('search_index', {}).get('enabled', True)
+
+        # Without configured categories: cluster titles/headings instead of URL segments
+        self.cluster_categories = config.get('clustering', {}).get('enabled', False)
 
         # Create directories (unless dry-run)
         if not dry_run:
-            os.makedirs(f"{self.data_dir}/pages", exist_ok=True)
+            os.makedirs(self.data_dir, exist_ok=True)
             os.makedirs(f"{self.skill_dir}/references", exist_ok=True)
             os.makedirs(f"{self.skill_dir}/scripts", exist_ok=True)
             os.makedirs(f"{self.skill_dir}/assets", exist_ok=True)
 
-        # Initialize browser if needed
-        if self.use_browser and not dry_run:
-            self._init_browser()
+        # Initialize browser if needed (auto mode starts it on first use)
+        if self.fetch_mode == 'browser' and not dry_run and self.browser_pool is None:
+            self._init_browser(browser_pages)
 
         # Load checkpoint if resuming
         if resume and not dry_run:
             self.load_checkpoint()
 
-    def _init_browser(self):
-        """Initialize Playwright browser for JavaScript-heavy sites"""
+    def _extractor_key(self):
+        """Hash of the settings parse_html() output depends on
+
+        A stored page is only reused for the same raw HTML (content_hash)
+        and the same extractor key.
+        """
+        settings = {
+            'version': EXTRACTOR_VERSION,
+            'parser': self.parser_backend,
+            'selectors': self.config.get('selectors', {}),
+            'base_url': self.base_url,
+            'url_patterns': self.config.get('url_patterns', {}),
+            'url_normalization': self.config.get('url_normalization', {})
+        }
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    def _new_frontier(self, urls=(), state=None):
+        """BFS UrlFrontier, or a PriorityFrontier when priority is enabled"""
+        if self.prioritize:
+            return PriorityFrontier.from_config(self.config, urls, state=state)
+        return UrlFrontier(urls)
+
+    def _resolve_parser_backend(self, backend):
+        """Pick the configured parser backend, falling back to html.parser"""
+        if backend == 'lxml' and not LXML_AVAILABLE:
+            print("⚠️  lxml not installed (pip install lxml), using html.parser")
+            return 'html.parser'
+        if backend == 'selectolax' and not SELECTOLAX_AVAILABLE:
+            print("⚠️  selectolax not installed (pip install selectolax), using html.parser")
+            return 'html.parser'
+        return backend
+
+    def _create_session(self, http_config):
+        """Create a pooled keep-alive session shared by all fetches"""
+        pool_size = http_config.get('pool_size', max(10, self.concurrency))
+        retry = Retry(
+            total=http_config.get('retries', 3),
+            backoff_factor=http_config.get('backoff_factor', 0.5),
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=retry, pool_block=True)
+        # Connections that report DNS/TCP connect and TLS handshake times
+        adapter.poolmanager.pool_classes_by_scheme = timed_connection_classes(self.crawl_stats)
+
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate'
+        })
+        return session
+
+    def _init_browser(self, pages):
+        """Start a pool of Playwright pages for JavaScript-heavy sites"""
         if not PLAYWRIGHT_AVAILABLE:
             print("⚠️  Playwright not installed. Install with: pip install playwright && playwright install chromium")
             print("   Falling back to requests (JavaScript content may not load)")
@@ -88,109 +2327,279 @@ def _init_browser(self):
             return
 
         try:
-            self.playwright = sync_playwright().start()
-            self.browser = self.playwright.chromium.launch(headless=True)
-            self.page_context = self.browser.new_page()
-            print("✅ Browser initialized for JavaScript rendering")
+            self.browser_pool = BrowserPool.from_config(self.config, pages)
+            self.browser_pool.start()
+            print(f"✅ Browser initialized for JavaScript rendering ({pages} pages)")
         except Exception as e:
             print(f"⚠️  Failed to initialize browser: {e}")
             print("   Falling back to requests")
             self.use_browser = False
-            if self.playwright:
-                try:
-                    self.playwright.stop()
-                except:
-                    pass
+            self.browser_pool = None
 
     def _cleanup_browser(self):
         """Clean up browser resources"""
-        if self.page_context:
-            try:
-                self.page_context.close()
-            except:
-                pass
-        if self.browser:
-            try:
-                self.browser.close()
-            except:
-                pass
-        if self.playwright:
-            try:
-                self.playwright.stop()
-            except:
-                pass
+        if self._shared_browser:
+            return  # closed by its owner
+        if self.browser_pool:
+            print(f"  🌐 Rendered {self.browser_pool.pages_rendered} pages in the browser "
+                  f"({self.browser_pool.contexts_recycled} contexts recycled)")
+            self.browser_pool.close()
+            self.browser_pool = None
 
     def is_valid_url(self, url):
-        """Check if URL should be scraped"""
-        if not url.startswith(self.base_url):
-            return False
+        """Check if a normalized URL should be scraped"""
+        return self.url_filter.allows(url)
 
-        # Include patterns
-        includes = self.config.get('url_patterns', {}).get('include', [])
-        if includes and not any(pattern in url for pattern in includes):
-            return False
+    def load_http_cache(self):
+        """Load per-URL validators saved by the previous crawl"""
+        if not os.path.exists(self.http_cache_file):
+            return
 
-        # Exclude patterns
-        excludes = self.config.get('url_patterns', {}).get('exclude', [])
-        if any(pattern in url for pattern in excludes):
-            return False
+        try:
+            with open(self.http_cache_file, 'r', encoding='utf-8') as f:
+                self.http_cache = json.load(f)
+        except Exception as e:
+            print(f"⚠️  Failed to load HTTP cache: {e}")
+            self.http_cache = {}
 
-        return True
+    def save_http_cache(self):
+        """Save per-URL validators (atomic replace)"""
+        if self.dry_run:
+            return
+
+        tmp_file = f"{self.http_cache_file}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.http_cache, f)
+            os.replace(tmp_file, self.http_cache_file)
+        except Exception as e:
+            print(f"  ⚠️  Failed to save HTTP cache: {e}")
+
+    def load_dedup_index(self):
+        """Load content fingerprints and aliases from earlier crawls"""
+        if not os.path.exists(self.dedup_file):
+            return
+        try:
+            with open(self.dedup_file, 'r', encoding='utf-8') as f:
+                self.deduper.load(json.load(f))
+        except Exception as e:
+            print(f"⚠️  Failed to load dedup index: {e}")
+
+    def save_dedup_index(self):
+        """Save content fingerprints and aliases (atomic replace)"""
+        if self.dry_run or not self.deduper:
+            return
+
+        tmp_file = f"{self.dedup_file}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.deduper.to_dict(), f)
+            os.replace(tmp_file, self.dedup_file)
+        except Exception as e:
+            print(f"  ⚠️  Failed to save dedup index: {e}")
+
+    @property
+    def aliases(self):
+        """Duplicate URL -> canonical URL"""
+        return self.deduper.aliases if self.deduper else {}
+
+    def _cached_entry(self, url):
+        """Cache entry for url if incremental and the page (or its canonical page) is still stored"""
+        if not self.incremental:
+            return None
+        entry = self.http_cache.get(url)
+        if entry and self.aliases.get(url, url) in self.store:
+            return entry
+        return None
+
+    def _load_cached_page(self, url):
+        """Load the stored page for url
+
+        A duplicate gets its canonical page under its own URL, with the
+        links kept in its cache entry.
+        """
+        canonical = self.aliases.get(url, url)
+        try:
+            page = self.store.get(canonical)
+        except Exception:
+            return None
+        if page is not None and canonical != url:
+            page = dict(page, url=url, links=self.http_cache.get(url, {}).get('links', page['links']))
+        return page
+
+    def _journal_event(self, event, url, depth=None):
+        """Append a crawl event to the checkpoint journal.
+
+        Events are 'q' (URL enqueued) and 'd' (URL done). Each carries a
+        sequence number so replay can skip events already folded into the
+        snapshot. With a priority frontier, 'q' events also carry the URL's
+        link depth.
+        """
+        if not self.checkpoint_enabled or self.dry_run:
+            return
+        if self._journal is None:
+            self._journal = open(self.journal_file, 'a', encoding='utf-8')
+        self._journal_seq += 1
+        record = {'n': self._journal_seq, 'e': event, 'u': url}
+        if depth is not None:
+            record['depth'] = depth
+        self._journal.write(json.dumps(record) + '\n')
+
+    def _flush_journal(self):
+        """Make journaled events durable (once per page)"""
+        if self._journal is None:
+            return
+        self._journal.flush()
+        if self.checkpoint_fsync:
+            os.fsync(self._journal.fileno())
+
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
 
     def save_checkpoint(self):
-        """Save progress checkpoint"""
+        """Compact the journal into a full checkpoint snapshot.
+
+        The snapshot is written to a temp file and renamed into place, so an
+        interrupted write never leaves a corrupt checkpoint. The journal is
+        truncated afterwards; if that step is lost, replay skips the events
+        the snapshot already covers.
+        """
         if not self.checkpoint_enabled or self.dry_run:
             return
 
+        # URLs still being fetched are not done yet - resume them as pending
+        in_flight = list(self._in_flight)
         checkpoint_data = {
             "config": self.config,
-            "visited_urls": list(self.visited_urls),
-            "pending_urls": list(self.pending_urls),
+            "visited_urls": list(self.visited_urls - self._in_flight),
+            "pending_urls": in_flight + list(self.pending_urls),
+            "frontier": self.pending_urls.state(in_flight + list(self.pending_urls)) if self.prioritize else None,
             "pages_scraped": self.pages_scraped,
+            "journal_seq": self._journal_seq,
             "last_updated": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
             "checkpoint_interval": self.checkpoint_interval
         }
 
         try:
-            with open(self.checkpoint_file, 'w') as f:
-                json.dump(checkpoint_data, f, indent=2)
+            tmp_file = f"{self.checkpoint_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(checkpoint_data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.checkpoint_file)
+
+            self._close_journal()
+            open(self.journal_file, 'w').close()
             print(f"  💾 Checkpoint saved ({self.pages_scraped} pages)")
         except Exception as e:
             print(f"  ⚠️  Failed to save checkpoint: {e}")
 
     def load_checkpoint(self):
-        """Load progress from checkpoint"""
-        if not os.path.exists(self.checkpoint_file):
+        """Load progress from the checkpoint snapshot and replay the journal"""
+        has_snapshot = os.path.exists(self.checkpoint_file)
+        if not has_snapshot and not os.path.exists(self.journal_file):
             print("ℹ️  No checkpoint found, starting fresh")
             return
 
         try:
-            with open(self.checkpoint_file, 'r') as f:
-                checkpoint_data = json.load(f)
+            snapshot_seq = 0
+            last_updated = 'never (journal only)'
+            visited = set(self.visited_urls)
+            pending = list(self.pending_urls)
+            frontier_state = {'depth': {}, 'inlinks': {}}
+            pages_scraped = self.pages_scraped
+
+            if has_snapshot:
+                with open(self.checkpoint_file, 'r') as f:
+                    checkpoint_data = json.load(f)
+                visited = set(checkpoint_data["visited_urls"])
+                pending = list(checkpoint_data["pending_urls"])
+                frontier_state = checkpoint_data.get("frontier") or frontier_state
+                pages_scraped = checkpoint_data["pages_scraped"]
+                snapshot_seq = checkpoint_data.get("journal_seq", 0)
+                last_updated = checkpoint_data['last_updated']
 
-            self.visited_urls = set(checkpoint_data["visited_urls"])
-            self.pending_urls = deque(checkpoint_data["pending_urls"])
-            self.pages_scraped = checkpoint_data["pages_scraped"]
+            seq, replayed = self._replay_journal(snapshot_seq, visited, pending, frontier_state['depth'])
+
+            self.visited_urls = visited
+            self.pending_urls = self._new_frontier((url for url in pending if url not in visited),
+                                                   state=frontier_state)
+            if self.prioritize:
+                self._replay_inlinks(replayed)
+            replayed = len(replayed)
+            self.pages_scraped = pages_scraped + replayed
+            self._journal_seq = seq
 
             print(f"✅ Resumed from checkpoint")
             print(f"   Pages already scraped: {self.pages_scraped}")
             print(f"   URLs visited: {len(self.visited_urls)}")
             print(f"   URLs pending: {len(self.pending_urls)}")
-            print(f"   Last updated: {checkpoint_data['last_updated']}")
+            print(f"   Last updated: {last_updated}")
+            if replayed:
+                print(f"   Replayed from journal: {replayed} pages")
             print("")
 
         except Exception as e:
             print(f"⚠️  Failed to load checkpoint: {e}")
             print("   Starting fresh")
 
+    def _replay_journal(self, snapshot_seq, visited, pending, depths=None):
+        """Apply journal events newer than the snapshot.
+
+        Updates visited/pending (and depths, if given) in place and returns
+        (last_seq, URLs done since the snapshot).
+        """
+        seq = snapshot_seq
+        done = []
+        if not os.path.exists(self.journal_file):
+            return seq, done
+
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    break  # Torn write at the tail - everything before it is good
+                if event['n'] <= snapshot_seq:
+                    continue
+                seq = event['n']
+                if event['e'] == 'q':
+                    pending.append(event['u'])
+                    if depths is not None and 'depth' in event:
+                        depths[event['u']] = event['depth']
+                elif event['e'] == 'd':
+                    visited.add(event['u'])
+                    done.append(event['u'])
+        return seq, done
+
+    def _replay_inlinks(self, done_urls):
+        """Count the links of pages done since the snapshot as inlinks again
+
+        The journal records which URLs were queued, not every link seen, so
+        the priority frontier's inlink counts are rebuilt from the stored
+        pages (duplicates use the links kept in their cache entry).
+        """
+        for url in done_urls:
+            page = self._load_cached_page(url)
+            for link in (page or {}).get('links', []):
+                if link in self.pending_urls:
+                    self.pending_urls.append(link, parent=url)
+
     def clear_checkpoint(self):
-        """Remove checkpoint file"""
-        if os.path.exists(self.checkpoint_file):
-            try:
-                os.remove(self.checkpoint_file)
-                print(f"✅ Checkpoint cleared")
-            except Exception as e:
-                print(f"⚠️  Failed to clear checkpoint: {e}")
+        """Remove checkpoint snapshot and journal"""
+        self._close_journal()
+        cleared = False
+        for path in (self.checkpoint_file, self.journal_file):
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                    cleared = True
+                except Exception as e:
+                    print(f"⚠️  Failed to clear checkpoint: {e}")
+        if cleared:
+            print(f"✅ Checkpoint cleared")
 
     def extract_content(self, soup, url):
         """Extract content with improved code and pattern detection"""
@@ -219,8 +2628,11 @@ def extract_content(self, soup, url):
             print(f"⚠ No content: {url}")
             return page
         
+        # Collect everything else in a single pass over the document
+        walk = self._walk_document(soup, main, self._code_blocks)
+
         # Extract headings with better structure
-        for h in main.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
+        for h in walk['headings']:
             text = self.clean_text(h.get_text())
             if text:
                 page['headings'].append({
@@ -230,8 +2642,7 @@ def extract_content(self, soup, url):
                 })
         
         # Extract code with language detection
-        code_selector = selectors.get('code_blocks', 'pre code')
-        for code_elem in main.select(code_selector):
+        for code_elem in walk['code']:
             code = code_elem.get_text()
             if len(code.strip()) > 10:
                 # Try to detect language
@@ -242,11 +2653,11 @@ def extract_content(self, soup, url):
                 })
         
         # Extract patterns (NEW: common code patterns)
-        page['patterns'] = self.extract_patterns(main, page['code_samples'])
+        page['patterns'] = self.extract_patterns(walk)
         
         # Extract paragraphs
         paragraphs = []
-        for p in main.find_all('p'):
+        for p in walk['paragraphs']:
             text = self.clean_text(p.get_text())
             if text and len(text) > 20:  # Skip very short paragraphs
                 paragraphs.append(text)
@@ -255,19 +2666,198 @@ def extract_content(self, soup, url):
         
         # Extract links - search entire page, not just main content
         # This allows finding navigation links in sidebars for mdBook-style docs
-        for link in soup.find_all('a', href=True):
-            href = urljoin(url, link['href'])
-            # Strip anchor fragments to avoid treating #anchors as separate pages
-            href = href.split('#')[0]
-            if self.is_valid_url(href) and href not in page['links']:
-                page['links'].append(href)
+        page['links'] = self._page_links(walk['hrefs'], url)
         
         return page
+
+    def _walk_document(self, soup, main, code_matcher):
+        """Depth-first pass over the whole document, in document order
+
+        Inside main: headings, code blocks, paragraphs, <p>/<div> spans
+        (offsets into main's lowercased text) and <pre>/<code> positions.
+        Everywhere: link hrefs.
+        """
+        walk = {
+            'headings': [],
+            'code': [],
+            'paragraphs': [],
+            'blocks': [],      # [elem, text start, text end, position]
+            'code_tags': [],   # (position, elem)
+            'hrefs': [],
+            'text': ''
+        }
+        text = []
+        offset = 0
+        position = 0
+        inside = False
+
+        stack = [(iter(soup.contents), None, None)]
+        while stack:
+            children, tag, block = stack[-1]
+            child = next(children, None)
+
+            if child is None:
+                # Leaving tag
+                stack.pop()
+                if tag is main:
+                    inside = False
+                elif block is not None:
+                    block[2] = offset
+                continue
+
+            if isinstance(child, NavigableString):
+                if inside and type(child) in TEXT_STRING_TYPES:
+                    lowered = child.lower()
+                    text.append(lowered)
+                    offset += len(lowered)
+                continue
+
+            name = child.name
+            if name == 'a' and child.has_attr('href'):
+                walk['hrefs'].append(child['href'])
+
+            block = None
+            if child is main:
+                inside = True
+            elif inside:
+                position += 1
+                if name in HEADING_TAGS:
+                    walk['headings'].append(child)
+                if name == 'p':
+                    walk['paragraphs'].append(child)
+                if name in ('p', 'div'):
+                    block = [child, offset, None, position]
+                    walk['blocks'].append(block)
+                elif name in ('pre', 'code'):
+                    walk['code_tags'].append((position, child))
+                if code_matcher.match(child):
+                    walk['code'].append(child)
+
+            stack.append((iter(child.contents), child, block))
+
+        walk['text'] = ''.join(text)
+        return walk
+
+    def _page_links(self, hrefs, url):
+        """Resolve hrefs against url and keep unique, scrapeable links in order"""
+        links = []
+        seen = set()
+        for href in hrefs:
+            # Normalizing also strips #anchors so they are not separate pages
+            href = self.url_filter.normalize(urljoin(url, href))
+            if href not in seen and self.is_valid_url(href):
+                seen.add(href)
+                links.append(href)
+        return links
+
+    def parse_html(self, html, url):
+        """Parse raw HTML into a page dict with the configured backend"""
+        if self.parser_backend == 'selectolax':
+            return self._extract_content_selectolax(html, url)
+        soup = BeautifulSoup(html, self.parser_backend)
+        return self.extract_content(soup, url)
+
+    def _extract_content_selectolax(self, html, url):
+        """Same extraction as extract_content(), on a selectolax tree"""
+        page = {
+            'url': url,
+            'title': '',
+            'content': '',
+            'headings': [],
+            'code_samples': [],
+            'patterns': [],
+            'links': []
+        }
+
+        selectors = self.config.get('selectors', {})
+        tree = SelectolaxParser(html)
+        # BeautifulSoup's get_text() skips script/style strings
+        tree.strip_tags(['script', 'style'])
+
+        title_elem = tree.css_first(selectors.get('title', 'title'))
+        if title_elem:
+            page['title'] = self.clean_text(title_elem.text(deep=True))
+
+        main_selector = selectors.get('main_content', 'div[role="main"]')
+        main = tree.css_first(main_selector)
+
+        if not main:
+            print(f"⚠ No content: {url}")
+            return page
+
+        def select(selector):
+            # selectolax matches the node itself, BeautifulSoup only descendants
+            return [n for n in main.css(selector) if n.mem_id != main.mem_id]
+
+        for h in select(', '.join(HEADING_TAGS)):
+            text = self.clean_text(h.text(deep=True))
+            if text:
+                page['headings'].append({
+                    'level': h.tag,
+                    'text': text,
+                    'id': h.attributes.get('id') or ''
+                })
+
+        code_selector = selectors.get('code_blocks', 'pre code')
+        for code_elem in select(code_selector):
+            code = code_elem.text(deep=True)
+            if len(code.strip()) > 10:
+                parent = code_elem.parent
+                parent_classes = []
+                if parent is not None and parent.tag == 'pre':
+                    parent_classes = (parent.attributes.get('class') or '').split()
+                lang = self._detect_language(
+                    (code_elem.attributes.get('class') or '').split(), parent_classes, code)
+                page['code_samples'].append({
+                    'code': code.strip(),
+                    'language': lang
+                })
+
+        # Patterns: description element plus the next <pre>/<code> in document order
+        order = {}
+        code_positions = []
+        code_nodes = []
+        for i, node in enumerate(tree.root.traverse()):
+            order[node.mem_id] = i
+            if node.tag in ('pre', 'code'):
+                code_positions.append(i)
+                code_nodes.append(node)
+
+        patterns = []
+        for elem in select('p, div'):
+            text = elem.text(deep=True)
+            lowered = text.lower()
+            if any(word in lowered for word in PATTERN_MARKERS):
+                k = bisect.bisect_right(code_positions, order[elem.mem_id])
+                if k < len(code_nodes):
+                    patterns.append({
+                        'description': self.clean_text(text),
+                        'code': code_nodes[k].text(deep=True).strip()
+                    })
+        page['patterns'] = patterns[:5]
+
+        paragraphs = []
+        for p in select('p'):
+            text = self.clean_text(p.text(deep=True))
+            if text and len(text) > 20:
+                paragraphs.append(text)
+        page['content'] = '\n\n'.join(paragraphs)
+
+        page['links'] = self._page_links((a.attributes.get('href') or '' for a in tree.css('a[href]')), url)
+
+        return page
     
     def detect_language(self, elem, code):
         """Detect programming language from code block"""
+        parent = elem.parent
+        parent_classes = []
+        if parent and parent.name == 'pre':
+            parent_classes = parent.get('class', [])
+        return self._detect_language(elem.get('class', []), parent_classes, code)
+
+    def _detect_language(self, classes, parent_classes, code):
+        """Detect language from code/pre class lists, then by heuristics"""
         # Check class attribute
-        classes = elem.get('class', [])
         for cls in classes:
             if 'language-' in cls:
                 return cls.replace('language-', '')
@@ -275,12 +2865,9 @@ def detect_language(self, elem, code):
                 return cls.replace('lang-', '')
         
         # Check parent pre element
-        parent = elem.parent
-        if parent and parent.name == 'pre':
-            classes = parent.get('class', [])
-            for cls in classes:
-                if 'language-' in cls:
-                    return cls.replace('language-', '')
+        for cls in parent_classes:
+            if 'language-' in cls:
+                return cls.replace('language-', '')
         
         # Heuristic detection
         if 'import ' in code and 'from ' in code:
@@ -296,23 +2883,57 @@ def detect_language(self, elem, code):
         
         return 'unknown'
     
-    def extract_patterns(self, main, code_samples):
-        """Extract common coding patterns (NEW FEATURE)"""
+    def extract_patterns(self, walk):
+        """Extract common coding patterns (NEW FEATURE)
+
+        A <p>/<div> whose text mentions "Example:", "Usage:" etc. is paired
+        with the next <pre>/<code> after it. Marker hits are found once in
+        main's text and matched to element spans by offset, instead of
+        lowercasing every (nested) element's full text.
+        """
+        text = walk['text']
+        hits = {}
+        for word in PATTERN_MARKERS:
+            found = []
+            i = text.find(word)
+            while i != -1:
+                found.append(i)
+                i = text.find(word, i + 1)
+            if found:
+                hits[word] = found
+
+        if not hits:
+            return []
+
+        code_positions = [pos for pos, _ in walk['code_tags']]
         patterns = []
         
         # Look for "Example:" or "Pattern:" sections
-        for elem in main.find_all(['p', 'div']):
-            text = elem.get_text().lower()
-            if any(word in text for word in ['example:', 'pattern:', 'usage:', 'typical use']):
-                # Get the code that follows
+        for elem, start, end, position in walk['blocks']:
+            if not any(self._span_has_hit(found, len(word), start, end) for word, found in hits.items()):
+                continue
+
+            # Get the code that follows
+            k = bisect.bisect_right(code_positions, position)
+            if k < len(code_positions):
+                next_code = walk['code_tags'][k][1]
+            else:
                 next_code = elem.find_next(['pre', 'code'])
-                if next_code:
-                    patterns.append({
-                        'description': self.clean_text(elem.get_text()),
-                        'code': next_code.get_text().strip()
-                    })
+            if next_code:
+                patterns.append({
+                    'description': self.clean_text(elem.get_text()),
+                    'code': next_code.get_text().strip()
+                })
+                if len(patterns) == 5:  # Limit to 5 most relevant patterns
+                    break
         
-        return patterns[:5]  # Limit to 5 most relevant patterns
+        return patterns
+
+    @staticmethod
+    def _span_has_hit(found, length, start, end):
+        """True if a hit (sorted offsets of a word) lies within [start, end)"""
+        i = bisect.bisect_left(found, start)
+        return i < len(found) and found[i] + length <= end
     
     def clean_text(self, text):
         """Clean text content"""
@@ -320,71 +2941,408 @@ def clean_text(self, text):
         return text.strip()
     
     def save_page(self, page):
-        """Save page data"""
-        url_hash = hashlib.md5(page['url'].encode()).hexdigest()[:10]
-        safe_title = re.sub(r'[^\w\s-]', '', page['title'])[:50]
-        safe_title = re.sub(r'[-\s]+', '_', safe_title)
-        
-        filename = f"{safe_title}_{url_hash}.json"
-        filepath = os.path.join(self.data_dir, "pages", filename)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(page, f, indent=2, ensure_ascii=False)
+        """Save page data (appended to the page store)
+
+        Returns the canonical URL if the page duplicates one already stored;
+        the duplicate itself is not stored. If the page was canonical for
+        other URLs and its content changed, those are queued again.
+        """
+        if self.deduper:
+            canonical = self.deduper.add(page['url'], page)
+            for alias in self.deduper.take_released():
+                # Stored only as the old content of this page: fetch it again
+                self.visited_urls.discard(alias)
+                self.enqueue(alias)
+            if canonical:
+                return canonical
+        self.store.put(page)
+        return None
     
     def scrape_page(self, url):
-        """Scrape a single page (with optional JavaScript rendering)"""
+        """Scrape a single page (with optional JavaScript rendering)
+
+        Only fetches and parses, so it is safe to run on worker threads.
+        Returns (page, cache_entry), or (None, None) on failure;
+        record_page() stores the result.
+        """
+        fetched = self.fetch_page(url)
+        if fetched is None:
+            return None, None
+
+        if fetched['page'] is None:
+            try:
+                with self.crawl_stats.timed('parse'):
+                    fetched['page'] = self.parse_html(fetched['html'], url)
+            except Exception as e:
+                print(f"  ✗ Error: {e}")
+                return None, None
+
+        return fetched['page'], fetched['entry']
+
+    def fetch_page(self, url):
+        """Fetch a page without parsing it (safe to run on worker threads)
+
+        Returns {'url', 'html', 'entry', 'page'} or None on failure. 'page'
+        is already set when the cached copy is unchanged; otherwise 'html'
+        still needs parse_html().
+        """
+        stats = self.crawl_stats
+        stats.page_started(url)
+        waiting = time.perf_counter()
+        with self.fetch_slots.host(urlparse(url).netloc):
+            stats.observe('host_wait', time.perf_counter() - waiting)
+            if self.rate_limiter:
+                # Waits for a token inside the host slot to stay polite
+                with stats.timed('rate_limit'):
+                    self.rate_limiter.acquire(self._origin(url))
+            try:
+                print(f"  {url}")
+                with self.fetch_slots.total:
+                    return self._fetch(url)
+
+            except Exception as e:
+                if self.rate_limiter and isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                    # No response at all - treat like an overloaded server
+                    self.rate_limiter.record(self._origin(url))
+                print(f"  ✗ Error: {e}")
+                return None
+            finally:
+                stats.observe_bytes(stats.take_bytes())
+
+    def _fetch(self, url):
+        """Fetch url, reusing the cached page when unchanged"""
+        cached = self._cached_entry(url)
+        headers = {}
+
+        mode = self._fetch_mode_for(url)
+        if mode == 'browser':
+            # Use Playwright for JavaScript-heavy sites
+            html = self._fetch_with_browser(url)
+        else:
+            # Use requests for static sites (faster)
+            response = self._fetch_with_requests(url, cached)
+            # cached is None when a server or proxy answers an unconditional request with 304
+            if cached and response.status_code == 304:
+                if cached.get('extractor') == self.extractor_key:
+                    page = self._load_cached_page(url)
+                    if page is not None:
+                        return {'url': url, 'html': None, 'entry': dict(cached, unchanged=True), 'page': page}
+                elif self.raw_archive is not None and self.raw_archive.digest(url) == cached.get('content_hash'):
+                    # Extraction settings changed: re-parse the archived copy
+                    return {'url': url, 'html': self.raw_archive.get(url), 'entry': dict(cached), 'page': None}
+            if response.status_code == 304:
+                response = self._fetch_with_requests(url)
+            html = response.content
+            headers = response.headers
+
+            if mode == 'probe':
+                mode = 'static'
+                if not self._has_main_text(html) and self._ensure_browser():
+                    # Static HTML lacks the content - try rendering it
+                    rendered = self._fetch_with_browser(url)
+                    if rendered and self._has_main_text(rendered):
+                        html = rendered
+                        mode = 'browser'
+                self._remember_fetch_mode(url, mode)
+
+        with self._browser_lock:
+            self.fetch_counts[mode] += 1
+
+        if not html:
+            print(f"  ⚠️  No content retrieved")
+            return None
+
+        body = html.encode('utf-8') if isinstance(html, str) else html
+        entry = {
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'content_hash': hashlib.sha256(body).hexdigest()
+        }
+        if self.raw_archive is not None:
+            with self.crawl_stats.timed('archive'):
+                self.raw_archive.put(url, html, entry['content_hash'])
+
+        # Same bytes and extraction settings as last crawl (server without validators): skip parsing
+        if (cached and cached.get('content_hash') == entry['content_hash']
+                and cached.get('extractor') == self.extractor_key):
+            page = self._load_cached_page(url)
+            if page is not None:
+                entry['unchanged'] = True
+                return {'url': url, 'html': None, 'entry': entry, 'page': page}
+
+        return {'url': url, 'html': html, 'entry': entry, 'page': None}
+
+    def record_page(self, page, entry=None):
+        """Save a scraped page and queue its links (crawl thread only)"""
+        if entry and entry.get('unchanged'):
+            # Unchanged since last crawl - keep the stored page (or alias)
+            self.pages_unchanged += 1
+            canonical = self.aliases.get(page['url'])
+        else:
+            canonical = self.save_page(page)
+            if canonical is not None:
+                # Same content as a stored page: recorded as an alias, only its links are used
+                self.pages_duplicate += 1
+
+        if entry:
+            self.http_cache[page['url']] = {
+                'etag': entry.get('etag'),
+                'last_modified': entry.get('last_modified'),
+                'content_hash': entry.get('content_hash'),
+                'extractor': self.extractor_key,
+                'lastmod': self._sitemap_lastmod.get(page['url'], entry.get('lastmod'))
+            }
+            if canonical is not None:
+                # Not stored: keep its links so incremental runs can skip it like any other page
+                self.http_cache[page['url']]['links'] = page['links']
+        if canonical is None:
+            self.pages.append({'title': page['title'], 'url': page['url']})
+
+        # Add new URLs (the frontier skips ones already queued, or counts the inlink)
+        for link in page['links']:
+            if link not in self.visited_urls:
+                self.enqueue(link, parent=page['url'])
+
+    def enqueue(self, url, parent=None):
+        """Add a URL to the frontier and journal it if it was new"""
+        if self.pending_urls.append(url, parent):
+            self._journal_event('q', url, self.pending_urls.depth(url) if self.prioritize else None)
+            return True
+        return False
+
+    def _fetch_with_requests(self, url, cached=None):
+        """Fetch page with requests (fast, no JavaScript)
+
+        With a cache entry, sends a conditional request; the caller must
+        handle a 304 Not Modified response.
+        """
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        stats = self.crawl_stats
+        stats.take_setup()
+        start = time.perf_counter()
+        response = self.session.get(url, headers=headers, timeout=self.request_timeout)
+        total = time.perf_counter() - start
+        # elapsed ends when the headers are parsed; the body is read after
+        headers_at = response.elapsed.total_seconds()
+        stats.observe('server', max(0.0, headers_at - stats.take_setup()))
+        stats.observe('download', max(0.0, total - headers_at))
         try:
-            print(f"  {url}")
+            stats.add_bytes(response.raw.tell())  # compressed size on the wire
+        except (AttributeError, TypeError):
+            stats.add_bytes(len(response.content))
 
-            if self.use_browser and self.page_context:
-                # Use Playwright for JavaScript-heavy sites
-                html = self._fetch_with_browser(url)
-            else:
-                # Use requests for static sites (faster)
-                html = self._fetch_with_requests(url)
+        if self.rate_limiter:
+            self.rate_limiter.record_response(self._origin(url), response)
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _origin(url):
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _robots_for(self, origin):
+        """Parsed robots.txt for origin, fetched once (empty if unavailable)"""
+        with self._robots_lock:
+            if origin in self._robots:
+                return self._robots[origin]
+
+        parser = RobotFileParser(f"{origin}/robots.txt")
+        try:
+            response = self.session.get(parser.url, timeout=self.request_timeout)
+            lines = response.text.splitlines() if response.status_code == 200 else []
+        except requests.RequestException:
+            lines = []
+        parser.parse(lines)
+
+        with self._robots_lock:
+            return self._robots.setdefault(origin, parser)
+
+    def _crawl_delay(self, origin):
+        """robots.txt Crawl-delay for our user agent, or None"""
+        return self._robots_for(origin).crawl_delay(USER_AGENT)
+
+    def _url_prefix(self, url):
+        """scheme://host plus the first prefix_depth directories of the path"""
+        parts = urlsplit(url)
+        directories = parts.path.split('/')[1:-1]
+        return f"{parts.scheme}://{parts.netloc}/" + ''.join(d + '/' for d in directories[:self.prefix_depth])
+
+    def _fetch_mode_for(self, url):
+        """'static', 'browser', or 'probe' (auto mode, prefix not seen yet)"""
+        if self.fetch_mode == 'browser' and self.browser_pool:
+            return 'browser'
+        if self.fetch_mode != 'auto':
+            return 'static'
+        mode = self._prefix_modes.get(self._url_prefix(url), 'probe')
+        if mode == 'browser' and not self.browser_pool:
+            return 'static'
+        return mode
+
+    def _remember_fetch_mode(self, url, mode):
+        prefix = self._url_prefix(url)
+        with self._browser_lock:
+            if prefix not in self._prefix_modes:
+                self._prefix_modes[prefix] = mode
+                if mode == 'browser':
+                    print(f"  🌐 {prefix} needs JavaScript - rendering it with the browser")
+
+    def _has_main_text(self, html):
+        """True if the main_content selector matches at least min_text characters"""
+        selector = self.config.get('selectors', {}).get('main_content', 'div[role="main"]')
+        if self.parser_backend == 'selectolax':
+            tree = SelectolaxParser(html)
+            tree.strip_tags(['script', 'style'])
+            main = tree.css_first(selector)
+            text = main.text(strip=True) if main else ''
+        else:
+            main = BeautifulSoup(html, self.parser_backend).select_one(selector)
+            text = main.get_text(strip=True) if main else ''
+        return len(text) >= self.min_main_text
+
+    def _ensure_browser(self):
+        """Start the browser pool on first use in auto mode. Returns it or None."""
+        with self._browser_lock:
+            if self.browser_pool is None and self.fetch_mode == 'auto':
+                self._init_browser(self.browser_pages)
+                if self.browser_pool is None:
+                    # Not available - stop probing, everything is static now
+                    self.fetch_mode = 'static'
+            return self.browser_pool
+
+    def _sitemap_sources(self):
+        """Configured sitemaps, else robots.txt Sitemap lines, else sitemap.xml"""
+        if self.sitemap_urls:
+            return list(self.sitemap_urls)
+        origin = self._origin(self.base_url)
+        sources = self._robots_for(origin).site_maps()
+        if sources:
+            return sources
+        sources = [urljoin(self.base_url, 'sitemap.xml')]
+        if f"{origin}/sitemap.xml" not in sources:
+            sources.append(f"{origin}/sitemap.xml")
+        return sources
+
+    def iter_sitemap_urls(self):
+        """Yield (url, lastmod) from the site's sitemaps, following sitemap indexes"""
+        pending = deque(self._sitemap_sources())
+        seen = set()
+        while pending and len(seen) < self.sitemap_max_files:
+            sitemap_url = pending.popleft()
+            if sitemap_url in seen:
+                continue
+            seen.add(sitemap_url)
+            try:
+                for kind, loc, lastmod in self._parse_sitemap(sitemap_url):
+                    if kind == 'sitemap':
+                        pending.append(loc)
+                    else:
+                        yield loc, lastmod
+            except (requests.RequestException, ET.ParseError, OSError, EOFError) as e:
+                print(f"  ⚠️  Could not read sitemap {sitemap_url}: {e}")
 
-            if not html:
-                print(f"  ⚠️  No content retrieved")
+    def _parse_sitemap(self, sitemap_url):
+        """Stream ('url' | 'sitemap', loc, lastmod) entries from one sitemap file"""
+        response = self.session.get(sitemap_url, timeout=self.request_timeout, stream=True)
+        try:
+            if response.status_code != 200:
                 return
+            response.raw.decode_content = True
+            stream = response.raw
+            # .xml.gz files are gzip data, not gzip transfer encoding
+            content_type = response.headers.get('Content-Type', '')
+            transfer_gzip = 'gzip' in response.headers.get('Content-Encoding', '')
+            if not transfer_gzip and (sitemap_url.endswith('.gz') or 'gzip' in content_type):
+                stream = gzip.GzipFile(fileobj=stream)
+
+            for _, elem in ET.iterparse(stream, events=('end',)):
+                tag = elem.tag.rsplit('}', 1)[-1]
+                if tag not in ('url', 'sitemap'):
+                    continue
+                loc = lastmod = None
+                for child in elem:
+                    name = child.tag.rsplit('}', 1)[-1]
+                    if name == 'loc':
+                        loc = (child.text or '').strip()
+                    elif name == 'lastmod':
+                        lastmod = (child.text or '').strip() or None
+                elem.clear()
+                if loc:
+                    yield tag, loc, lastmod
+        finally:
+            response.close()
 
-            soup = BeautifulSoup(html, 'html.parser')
-            page = self.extract_content(soup, url)
+    def _sitemap_unchanged(self, url, lastmod):
+        """True if the sitemap says url has not changed since it was stored"""
+        cached = self._cached_entry(url)
+        if not cached or not cached.get('lastmod') or cached.get('extractor') != self.extractor_key:
+            return False
+        new, old = parse_lastmod(lastmod), parse_lastmod(cached['lastmod'])
+        return new is not None and old is not None and new <= old
 
-            self.save_page(page)
-            self.pages.append(page)
+    def seed_from_sitemaps(self, max_pages):
+        """Queue sitemap URLs before crawling
 
-            # Add new URLs
-            for link in page['links']:
-                if link not in self.visited_urls and link not in self.pending_urls:
-                    self.pending_urls.append(link)
+        On incremental refreshes, pages whose lastmod is not newer than the
+        stored copy are recorded as unchanged without fetching them, and the
+        rest are queued most recently modified first.
+        """
+        queued = skipped = 0
+        changed = []
+        unchanged = []
+        for loc, lastmod in self.iter_sitemap_urls():
+            url = self.url_filter.normalize(loc)
+            if not self.is_valid_url(url) or url in self.visited_urls:
+                continue
+            if lastmod:
+                self._sitemap_lastmod[url] = lastmod
 
-            # Rate limiting
-            time.sleep(self.config.get('rate_limit', 0.5))
+            if not self.incremental:
+                queued += self.enqueue(url)
+            elif self._sitemap_unchanged(url, lastmod):
+                unchanged.append(url)
+            else:
+                changed.append((url, parse_lastmod(lastmod)))
 
-        except Exception as e:
-            print(f"  ✗ Error: {e}")
+        # Queue changed pages first so links from unchanged ones do not jump ahead
+        oldest = datetime.min.replace(tzinfo=timezone.utc)
+        changed.sort(key=lambda item: item[1] or oldest, reverse=True)
+        for url, _ in changed:
+            queued += self.enqueue(url)
 
-    def _fetch_with_requests(self, url):
-        """Fetch page content with requests (fast, no JavaScript)"""
-        headers = {'User-Agent': 'Mozilla/5.0 (Documentation Scraper)'}
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        return response.content
+        for url in unchanged:
+            if len(self.visited_urls) >= max_pages or url in self.visited_urls:
+                continue
+            page = self._load_cached_page(url)
+            if page is None:
+                queued += self.enqueue(url)
+                continue
+            self.visited_urls.add(url)
+            self._page_done(url, (page, dict(self.http_cache[url], unchanged=True)))
+            skipped += 1
+
+        if self.incremental:
+            print(f"🗺️  Sitemap: {queued} URLs queued, {skipped} unchanged (not fetched)")
+        else:
+            print(f"🗺️  Sitemap: {queued} URLs queued")
+        return queued
 
     def _fetch_with_browser(self, url):
-        """Fetch page content with Playwright (supports JavaScript)"""
+        """Fetch page content with Playwright (supports JavaScript)
+
+        Safe to call from worker threads; blocks until a pool page is free.
+        """
         try:
-            self.page_context.goto(url, wait_until='networkidle', timeout=30000)
-            # Wait a bit for any dynamic content
-            self.page_context.wait_for_timeout(1000)
-            return self.page_context.content()
-        except PlaywrightTimeout:
-            print(f"  ⚠️  Timeout waiting for page load")
-            # Try to get content anyway
-            try:
-                return self.page_context.content()
-            except:
-                return None
+            with self.crawl_stats.timed('render'):
+                html = self.browser_pool.render(url, **self.render_options)
+            self.crawl_stats.add_bytes(len(html.encode('utf-8')) if html else 0)
+            return html
         except Exception as e:
             print(f"  ⚠️  Browser error: {e}")
             return None
@@ -409,47 +3367,33 @@ def scrape_all(self):
         # Dry run: preview first 20 URLs
         preview_limit = 20 if self.dry_run else max_pages
 
-        while self.pending_urls and len(self.visited_urls) < preview_limit:
-            url = self.pending_urls.popleft()
-
-            if url in self.visited_urls:
-                continue
-
-            self.visited_urls.add(url)
-
-            if self.dry_run:
-                # Just show what would be scraped
-                print(f"  [Preview] {url}")
-                # Simulate finding links without actually scraping
-                try:
-                    headers = {'User-Agent': 'Mozilla/5.0 (Documentation Scraper - Dry Run)'}
-                    response = requests.get(url, headers=headers, timeout=10)
-                    soup = BeautifulSoup(response.content, 'html.parser')
-
-                    main_selector = self.config.get('selectors', {}).get('main_content', 'div[role="main"]')
-                    main = soup.select_one(main_selector)
-
-                    if main:
-                        for link in main.find_all('a', href=True):
-                            href = urljoin(url, link['href'])
-                            if self.is_valid_url(href) and href not in self.visited_urls:
-                                self.pending_urls.append(href)
-                except:
-                    pass  # Ignore errors in dry run
-            else:
-                self.scrape_page(url)
-                self.pages_scraped += 1
+        if self.sitemap_enabled and not self.dry_run:
+            self.seed_from_sitemaps(max_pages)
 
-                # Save checkpoint at interval
-                if self.checkpoint_enabled and self.pages_scraped % self.checkpoint_interval == 0:
-                    self.save_checkpoint()
+        if self.dry_run:
+            self._preview_urls(preview_limit)
+        elif self.parser_workers:
+            print(f"Pipeline: {self.concurrency} fetchers → {self.parser_workers} parser processes\n")
+            self._scrape_pipelined(max_pages)
+        elif self.concurrency > 1:
+            print(f"Concurrency: {self.concurrency} workers ({self.per_host_concurrency} per host)\n")
+            self._scrape_concurrently(max_pages)
+        else:
+            self._scrape_serially(max_pages)
 
-            if len(self.visited_urls) % 10 == 0:
-                print(f"  [{len(self.visited_urls)} pages]")
+        if not self.dry_run:
+            self.save_http_cache()
+            self.save_dedup_index()
+            self.store.close()
+            if self.raw_archive is not None:
+                self.raw_archive.close()
+            if self.store.compact():
+                print("  🗜️  Compacted page store")
 
         # Cleanup browser if used
-        if self.use_browser:
+        if self.browser_pool:
             self._cleanup_browser()
+        self.session.close()
 
         if self.dry_run:
             print(f"\n✅ Dry run complete: would scrape ~{len(self.visited_urls)} pages")
@@ -458,14 +3402,207 @@ def scrape_all(self):
             print(f"\n💡 To actually scrape, run without --dry-run")
         else:
             print(f"\n✅ Scraped {len(self.visited_urls)} pages")
+            if self.incremental:
+                print(f"   Unchanged since last crawl: {self.pages_unchanged} (not re-parsed)")
+            if self.pages_duplicate:
+                print(f"   Duplicate content: {self.pages_duplicate} (recorded as aliases, not stored)")
+            if self.config.get('use_browser'):
+                print(f"   Fetched statically: {self.fetch_counts['static']}, "
+                      f"rendered in browser: {self.fetch_counts['browser']}")
+            if self.rate_limiter:
+                for origin, stats in self.rate_limiter.stats().items():
+                    print(f"   Rate {origin}: {stats['rate']} req/s ({stats['backoffs']} backoffs)")
+            self._print_crawl_stats()
             self.save_summary()
+            self.crawl_stats.save(self.crawl_stats_file)
     
+    def _preview_urls(self, preview_limit):
+        """Dry run: show what would be scraped"""
+        while self.pending_urls and len(self.visited_urls) < preview_limit:
+            url = self.pending_urls.popleft()
+
+            if url in self.visited_urls:
+                continue
+
+            self.visited_urls.add(url)
+
+            # Just show what would be scraped
+            print(f"  [Preview] {url}")
+            # Simulate finding links without actually scraping
+            try:
+                headers = {'User-Agent': 'Mozilla/5.0 (Documentation Scraper - Dry Run)'}
+                response = self.session.get(url, headers=headers, timeout=10)
+                soup = BeautifulSoup(response.content, 'html.parser')
+
+                main_selector = self.config.get('selectors', {}).get('main_content', 'div[role="main"]')
+                main = soup.select_one(main_selector)
+
+                if main:
+                    for link in main.find_all('a', href=True):
+                        href = self.url_filter.normalize(urljoin(url, link['href']))
+                        if self.is_valid_url(href) and href not in self.visited_urls:
+                            self.pending_urls.append(href, url)
+            except:
+                pass  # Ignore errors in dry run
+
+            if len(self.visited_urls) % 10 == 0:
+                print(f"  [{len(self.visited_urls)} pages]")
+
+    def _scrape_serially(self, max_pages):
+        """Scrape pages one at a time on the current thread"""
+        while self.pending_urls and len(self.visited_urls) < max_pages:
+            url = self.pending_urls.popleft()
+
+            if url in self.visited_urls:
+                continue
+
+            self.visited_urls.add(url)
+            self._page_done(url, self.scrape_page(url))
+
+    def _scrape_concurrently(self, max_pages):
+        """Scrape pages on a bounded thread pool
+
+        Workers only fetch and parse. visited_urls, pending_urls and the
+        checkpoint are only touched here, on the crawl thread.
+        """
+        futures = {}
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='scraper')
+        try:
+            while self.pending_urls or futures:
+                # Keep the pool full without going over max_pages
+                while (self.pending_urls and len(futures) < self.concurrency
+                       and len(self.visited_urls) < max_pages):
+                    url = self.pending_urls.popleft()
+                    if url in self.visited_urls:
+                        continue
+                    self.visited_urls.add(url)
+                    self._in_flight.add(url)
+                    futures[pool.submit(self.scrape_page, url)] = url
+
+                if not futures:
+                    break
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = futures.pop(future)
+                    self._in_flight.discard(url)
+                    self._page_done(url, future.result())
+        finally:
+            # On interrupt, drop queued work; unfinished URLs stay in _in_flight
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _scrape_pipelined(self, max_pages):
+        """Fetch on a thread pool, parse on a process pool
+
+        Fetchers hand raw HTML to parser processes running parse_html().
+        Parsed pages come back here to be stored and to feed pending_urls.
+        At most parse_queue_size pages wait for a parser and at most
+        parse_queue_size are being parsed; while that backlog is full no new
+        fetches start (backpressure).
+        """
+        fetches = {}
+        parses = {}
+        backlog = deque()
+
+        # spawn: forking a process that is running fetch threads is unsafe
+        worker_config = dict(self.config, use_browser=False, concurrency=1,
+                             parser_workers=0, parser=self.parser_backend)
+        parse_pool = ProcessPoolExecutor(max_workers=self.parser_workers,
+                                         mp_context=multiprocessing.get_context('spawn'),
+                                         initializer=_init_parse_worker, initargs=(worker_config,))
+        fetch_pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='scraper')
+        try:
+            while self.pending_urls or fetches or parses or backlog:
+                # Feed parsers first so fetched HTML does not pile up
+                while backlog and len(parses) < self.parse_queue_size:
+                    fetched = backlog.popleft()
+                    future = parse_pool.submit(_parse_in_worker, fetched['html'], fetched['url'])
+                    parses[future] = fetched
+
+                while (self.pending_urls and len(fetches) < self.concurrency
+                       and len(backlog) < self.parse_queue_size
+                       and len(self.visited_urls) < max_pages):
+                    url = self.pending_urls.popleft()
+                    if url in self.visited_urls:
+                        continue
+                    self.visited_urls.add(url)
+                    self._in_flight.add(url)
+                    fetches[fetch_pool.submit(self.fetch_page, url)] = url
+
+                if not fetches and not parses:
+                    break
+
+                done, _ = wait(list(fetches) + list(parses), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in fetches:
+                        url = fetches.pop(future)
+                        fetched = future.result()
+                        if fetched is None or fetched['page'] is not None:
+                            # Failed, or unchanged since last crawl: nothing to parse
+                            self._in_flight.discard(url)
+                            self._page_done(url, (fetched['page'], fetched['entry']) if fetched else (None, None))
+                        else:
+                            backlog.append(fetched)
+                    else:
+                        fetched = parses.pop(future)
+                        self._in_flight.discard(fetched['url'])
+                        try:
+                            page, seconds = future.result()
+                            self.crawl_stats.observe('parse', seconds)
+                        except Exception as e:
+                            print(f"  ✗ Error: {e}")
+                            page = None
+                        self._page_done(fetched['url'], (page, fetched['entry']) if page else (None, None))
+        finally:
+            # On interrupt, drop queued work; unfinished URLs stay in _in_flight
+            fetch_pool.shutdown(wait=True, cancel_futures=True)
+            parse_pool.shutdown(wait=True, cancel_futures=True)
+
+    def _page_done(self, url, result):
+        """Record a finished page and handle checkpoints/progress"""
+        page, entry = result
+        if page:
+            with self.crawl_stats.timed('save'):
+                self.record_page(page, entry)
+        self.pages_scraped += 1
+        self.crawl_stats.page_finished(url)
+
+        # Journal every page; compact into a snapshot at interval
+        self._journal_event('d', url)
+        self._flush_journal()
+        if self.checkpoint_enabled and self.pages_scraped % self.checkpoint_interval == 0:
+            with self.crawl_stats.timed('checkpoint'):
+                self.save_checkpoint()
+                self.save_http_cache()
+                self.save_dedup_index()
+
+        # Rolling pages/sec and page time p50/p95, every telemetry interval
+        progress = self.crawl_stats.report()
+        if progress:
+            if self.rate_limiter:
+                progress += f", {self.rate_limiter.total_rate():.1f} req/s"
+            print(f"  [{progress}]")
+
+    def _print_crawl_stats(self):
+        stats = self.crawl_stats.to_dict()
+        print(f"   Throughput: {stats['pages_per_second']} pages/s, "
+              f"{stats['bytes_per_page']['mean'] / 1024:,.1f} KB/page")
+        stages = [f"{stage} {hist['p50']:g}/{hist['p95']:g}"
+                  for stage, hist in stats['stages_ms'].items() if stage != 'page']
+        if stages:
+            print(f"   Stage p50/p95 ms: {', '.join(stages)}")
+
     def save_summary(self):
         """Save scraping summary"""
         summary = {
             'name': self.name,
             'total_pages': len(self.pages),
+            'unchanged_pages': self.pages_unchanged,
+            'duplicate_pages': self.pages_duplicate,
             'base_url': self.base_url,
+            'rate_limits': self.rate_limiter.stats() if self.rate_limiter else {},
+            'fetch_modes': dict(self.fetch_counts, browser_prefixes=sorted(
+                prefix for prefix, mode in self._prefix_modes.items() if mode == 'browser')),
             'pages': [{'title': p['title'], 'url': p['url']} for p in self.pages]
         }
         
@@ -474,70 +3611,258 @@ def save_summary(self):
     
     def load_scraped_data(self):
         """Load previously scraped data"""
-        pages = []
+        return list(self.iter_scraped_pages())
+
+    def iter_scraped_pages(self):
+        """Stream scraped pages from the page store, skipping duplicate aliases"""
+        aliases = self.aliases
+        if len(self.store):
+            for page in self.store:
+                if page['url'] not in aliases:
+                    yield page
+            return
+
+        # Data scraped before the page store existed
         pages_dir = Path(self.data_dir) / "pages"
-        
-        if not pages_dir.exists():
-            return []
-        
-        for json_file in pages_dir.glob("*.json"):
+        if pages_dir.exists():
+            print(f"ℹ️  Reading legacy pages/ directory (convert with --migrate-pages)")
+            for json_file in pages_dir.glob("*.json"):
+                try:
+                    with open(json_file, 'r', encoding='utf-8') as f:
+                        page = json.load(f)
+                    if page['url'] not in aliases:
+                        yield page
+                except Exception as e:
+                    print(f"⚠ Error loading {json_file}: {e}")
+
+    def _iter_scraped_urls(self):
+        """Stream scraped URLs (from the store index when possible)"""
+        if len(self.store):
+            aliases = self.aliases
+            for url in self.store.urls():
+                if url not in aliases:
+                    yield url
+        else:
+            for page in self.iter_scraped_pages():
+                yield page['url']
+
+    def migrate_pages(self):
+        """Convert a legacy pages/ directory (one JSON file per page) into the page store"""
+        pages_dir = Path(self.data_dir) / "pages"
+        json_files = sorted(pages_dir.glob("*.json")) if pages_dir.exists() else []
+        if not json_files:
+            print(f"ℹ️  No legacy pages to migrate in {pages_dir}")
+            return 0
+
+        print(f"Migrating {len(json_files)} pages into {self.store_dir}/ ...")
+        migrated = 0
+        for json_file in json_files:
             try:
                 with open(json_file, 'r', encoding='utf-8') as f:
-                    pages.append(json.load(f))
+                    self.store.put(json.load(f))
+                migrated += 1
             except Exception as e:
-                print(f"⚠ Error loading {json_file}: {e}")
-        
-        return pages
+                print(f"⚠ Error migrating {json_file}: {e}")
+        self.store.close()
+
+        # Only remove the old files once every page made it into the store
+        if migrated == len(json_files):
+            shutil.rmtree(pages_dir)
+            print(f"✅ Migrated {migrated} pages, removed {pages_dir}/")
+        else:
+            print(f"⚠️  Migrated {migrated}/{len(json_files)} pages, kept {pages_dir}/")
+        return migrated
+
+    def reparse(self):
+        """Re-run extraction over the raw HTML archive, without the network
+
+        The page store and dedup index are rebuilt: stored pages in store
+        order, then the remaining archived URLs (duplicates, failed parses).
+        Pages whose archived HTML and extractor key match their cache entry
+        are copied over as they are; the rest are parsed on a process pool
+        (parser_workers, default one per CPU). Stored pages with no archived
+        HTML are kept. Links are re-extracted but not followed.
+        """
+        print(f"\n{'='*60}")
+        print(f"REPARSING: {self.name}")
+        print(f"{'='*60}")
+        archive = self.raw_archive
+        if archive is None or not len(archive):
+            print(f"❌ No raw HTML archive in {self.archive_dir}/")
+            print('   Enable it with "archive": {"enabled": true} and crawl once')
+            return False
+
+        start = time.perf_counter()
+        workers = self.parser_workers or os.cpu_count() or 1
+        print(f"Archive: {len(archive)} URLs, {workers} parser processes\n")
+
+        tmp = f"{self.store_dir}.reparse"
+        shutil.rmtree(tmp, ignore_errors=True)
+        store = PageStore(tmp, self.store.segment_bytes)
+        deduper = None
+        if self.deduper:
+            deduper = ContentDeduper(similarity=self.deduper.similarity, min_words=self.deduper.min_words,
+                                     near_duplicates=self.deduper.near_duplicates)
+        counts = defaultdict(int)
+
+        def record(url, page, parsed):
+            if page is None:
+                counts['failed'] += 1
+                return
+            counts['parsed' if parsed else 'kept'] += 1
+            if deduper and deduper.add(url, page):
+                counts['duplicate'] += 1
+                return
+            store.put(page)
+            if parsed:
+                self.http_cache[url] = dict(self.http_cache.get(url, {}), content_hash=archive.digest(url),
+                                            extractor=self.extractor_key)
+
+        worker_config = dict(self.config, use_browser=False, concurrency=1,
+                             parser_workers=0, parser=self.parser_backend)
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_parse_worker, initargs=(worker_config,))
+        order = self.store.urls() + [url for url in archive.urls() if url not in self.store]
+        pending = deque()  # (url, future or None, unchanged page), drained in order to keep dedup deterministic
+        try:
+            for url in order:
+                entry = self.http_cache.get(url, {})
+                old = None
+                if url not in archive:
+                    old = self._load_cached_page(url)  # stored before the archive existed
+                elif entry.get('content_hash') == archive.digest(url) and entry.get('extractor') == self.extractor_key:
+                    old = self._load_cached_page(url)
+                if old is not None:
+                    pending.append((url, None, old))
+                elif url in archive:
+                    pending.append((url, pool.submit(_reparse_in_worker, archive.location(url), url), None))
+
+                while len(pending) > 4 * workers or (pending and pending[0][1] is None):
+                    self._finish_reparse(pending.popleft(), record)
+            while pending:
+                self._finish_reparse(pending.popleft(), record)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        store.close()
+        self.store.close()
+
+        old_dir = f"{self.store_dir}.old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.replace(self.store_dir, old_dir)
+        os.replace(tmp, self.store_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        self.store = PageStore(self.store_dir, store.segment_bytes)
+        self.deduper = deduper
+        self.save_dedup_index()
+        self.save_http_cache()
+
+        elapsed = time.perf_counter() - start
+        print(f"✅ Reparsed {counts['parsed']} pages, kept {counts['kept']} unchanged "
+              f"in {elapsed:.1f}s ({counts['parsed'] / elapsed:.0f} pages/s)")
+        if counts['duplicate']:
+            print(f"   Duplicate content: {counts['duplicate']} (recorded as aliases, not stored)")
+        if counts['failed']:
+            print(f"   ⚠️  {counts['failed']} pages failed to parse")
+        return True
+
+    def _finish_reparse(self, item, record):
+        url, future, old = item
+        if future is None:
+            record(url, old, parsed=False)
+            return
+        try:
+            page, _ = future.result()
+        except Exception as e:
+            print(f"  ✗ {url}: {e}")
+            record(url, self._load_cached_page(url), parsed=False)  # keep the previous extraction
+            return
+        record(url, page, parsed=True)
     
     def smart_categorize(self, pages):
         """Improved categorization with better pattern matching"""
-        category_defs = self.config.get('categories', {})
-        
-        # Default smart categories if none provided
-        if not category_defs:
-            category_defs = self.infer_categories(pages)
+        aliases = self.aliases
+        pages = [page for page in pages if page['url'] not in aliases]
+        matcher = self.get_category_matcher(lambda: iter(pages))
         
-        categories = {cat: [] for cat in category_defs.keys()}
+        categories = {cat: [] for cat in matcher.categories}
         categories['other'] = []
         
         for page in pages:
-            url = page['url'].lower()
-            title = page['title'].lower()
-            content = page.get('content', '').lower()[:500]  # Check first 500 chars
-            
-            categorized = False
-            
-            # Match against keywords
-            for cat, keywords in category_defs.items():
-                score = 0
-                for keyword in keywords:
-                    keyword = keyword.lower()
-                    if keyword in url:
-                        score += 3
-                    if keyword in title:
-                        score += 2
-                    if keyword in content:
-                        score += 1
-                
-                if score >= 2:  # Threshold for categorization
-                    categories[cat].append(page)
-                    categorized = True
-                    break
-            
-            if not categorized:
-                categories['other'].append(page)
+            categories[matcher.categorize(page)].append(page)
         
         # Remove empty categories
         categories = {k: v for k, v in categories.items() if v}
         
         return categories
+
+    def get_category_matcher(self, pages, urls=None):
+        """Matcher with a categorize(page) method and a categories list
+
+        Configured categories come first. Otherwise pages are clustered when
+        clustering is enabled, and categories are inferred from URLs if not.
+        `pages` is a callable returning a fresh page iterator (clustering
+        reads it several times); `urls`, if given, is a cheaper source for
+        URL inference.
+        """
+        if not self.config.get('categories') and self.cluster_categories:
+            if NUMPY_AVAILABLE:
+                clusterer = PageClusterer.from_config(self.config).fit(pages)
+                if clusterer.categories:
+                    print(f"  ✓ Clustered {clusterer.pages_clustered} pages: {', '.join(clusterer.categories)}")
+                    return clusterer
+                print("  ⚠️  No titles or headings to cluster, inferring categories from URLs")
+            else:
+                print("  ⚠️  Clustering needs numpy (pip install numpy), inferring categories from URLs")
+
+        if urls is not None:
+            return CategoryMatcher(self.get_category_defs({'url': url} for url in urls))
+        return CategoryMatcher(self.get_category_defs(pages()))
+
+    def get_category_defs(self, pages):
+        """Configured categories, or ones inferred from page URLs"""
+        category_defs = self.config.get('categories', {})
+        
+        # Default smart categories if none provided
+        if not category_defs:
+            category_defs = self.infer_categories(pages)
+
+        return category_defs
+
+    def categorize_page(self, page, category_defs):
+        """Name of the first category whose keywords score >= 2, else 'other'
+
+        Reference for a single page; for many pages use CategoryMatcher,
+        which gives the same answers.
+        """
+        url = page['url'].lower()
+        title = page['title'].lower()
+        content = page.get('content', '').lower()[:500]  # Check first 500 chars
+        
+        # Match against keywords
+        for cat, keywords in category_defs.items():
+            score = 0
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword in url:
+                    score += 3
+                if keyword in title:
+                    score += 2
+                if keyword in content:
+                    score += 1
+            
+            if score >= 2:  # Threshold for categorization
+                return cat
+        
+        return 'other'
     
     def infer_categories(self, pages):
         """Infer categories from URL patterns (IMPROVED)"""
         url_segments = defaultdict(int)
+        urls = [p['url'] for p in pages]
         
-        for page in pages:
-            path = urlparse(page['url']).path
+        for url in urls:
+            path = urlparse(url).path
             segments = [s for s in path.split('/') if s and s not in ['en', 'stable', 'latest', 'docs']]
             
             for seg in segments:
@@ -552,10 +3877,10 @@ def infer_categories(self, pages):
                 categories[seg] = [seg]
         
         # Add common defaults
-        if 'tutorial' not in categories and any('tutorial' in url for url in [p['url'] for p in pages]):
+        if 'tutorial' not in categories and any('tutorial' in url for url in urls):
             categories['tutorials'] = ['tutorial', 'guide', 'getting-started']
         
-        if 'api' not in categories and any('api' in url or 'reference' in url for url in [p['url'] for p in pages]):
+        if 'api' not in categories and any('api' in url or 'reference' in url for url in urls):
             categories['api'] = ['api', 'reference', 'class']
         
         return categories
@@ -563,78 +3888,100 @@ def infer_categories(self, pages):
     def generate_quick_reference(self, pages):
         """Generate quick reference from common patterns (NEW FEATURE)"""
         quick_ref = []
-        
-        # Collect all patterns
-        all_patterns = []
-        for page in pages:
-            all_patterns.extend(page.get('patterns', []))
-        
-        # Get most common code patterns
         seen_codes = set()
-        for pattern in all_patterns:
+        for page in pages:
+            if not self._add_quick_reference(page, quick_ref, seen_codes):
+                break
+        return quick_ref
+
+    def _add_quick_reference(self, page, quick_ref, seen_codes):
+        """Add a page's patterns to quick_ref; False once it is full"""
+        for pattern in page.get('patterns', []):
+            if len(quick_ref) >= 15:
+                return False
             code = pattern['code']
             if code not in seen_codes and len(code) < 300:
                 quick_ref.append(pattern)
                 seen_codes.add(code)
-                if len(quick_ref) >= 15:
-                    break
-        
-        return quick_ref
+        return len(quick_ref) < 15
     
     def create_reference_file(self, category, pages):
-        """Create enhanced reference file"""
+        """Create enhanced reference file(s) for one category"""
         if not pages:
             return
+
+        writer = self._reference_writer(category)
+        for page in pages:
+            writer.add(self._reference_page_lines(page), title=page['title'])
+        self._close_reference_writer(category, writer)
+        writer.remove_toc()
+
+    def _reference_writer(self, category):
+        return ReferenceWriter(os.path.join(self.skill_dir, "references", f"{category}.md"),
+                               max_bytes=self.reference_max_tokens * BYTES_PER_TOKEN)
+
+    def _close_reference_writer(self, category, writer):
+        def make_header(part, parts, pages):
+            title = f"{self.name.title()} - {category.replace('_', ' ').title()}"
+            header = []
+            header.append(f"# {title} (part {part} of {parts})\n" if parts > 1 else f"# {title}\n")
+            header.append(f"**Pages:** {pages}\n")
+            header.append("---\n")
+            return header
+
+        writer.close(make_header)
         
+        files = writer.files
+        if len(files) > 1:
+            print(f"  ✓ {files[0]} … {files[-1]} ({writer.pages} pages in {len(files)} shards)")
+        else:
+            print(f"  ✓ {files[0]} ({writer.pages} pages)")
+
+    def _reference_page_lines(self, page):
+        """Markdown lines for one page of a reference file"""
         lines = []
-        lines.append(f"# {self.name.title()} - {category.replace('_', ' ').title()}\n")
-        lines.append(f"**Pages:** {len(pages)}\n")
-        lines.append("---\n")
+        lines.append(f"## {page['title']}\n")
+        lines.append(f"**URL:** {page['url']}\n")
         
-        for page in pages:
-            lines.append(f"## {page['title']}\n")
-            lines.append(f"**URL:** {page['url']}\n")
-            
-            # Table of contents from headings
-            if page.get('headings'):
-                lines.append("**Contents:**")
-                for h in page['headings'][:10]:
-                    level = int(h['level'][1]) if len(h['level']) > 1 else 1
-                    indent = "  " * max(0, level - 2)
-                    lines.append(f"{indent}- {h['text']}")
-                lines.append("")
-            
-            # Content
-            if page.get('content'):
-                content = page['content'][:2500]
-                if len(page['content']) > 2500:
-                    content += "\n\n*[Content truncated]*"
-                lines.append(content)
-                lines.append("")
-            
-            # Code examples with language
-            if page.get('code_samples'):
-                lines.append("**Examples:**\n")
-                for i, sample in enumerate(page['code_samples'][:4], 1):
-                    lang = sample.get('language', 'unknown')
-                    code = sample.get('code', sample if isinstance(sample, str) else '')
-                    lines.append(f"Example {i} ({lang}):")
-                    lines.append(f"```{lang}")
-                    lines.append(code[:600])
-                    if len(code) > 600:
-                        lines.append("...")
-                    lines.append("```\n")
-            
-            lines.append("---\n")
+        # Table of contents from headings
+        if page.get('headings'):
+            lines.append("**Contents:**")
+            for h in page['headings'][:10]:
+                level = int(h['level'][1]) if len(h['level']) > 1 else 1
+                indent = "  " * max(0, level - 2)
+                lines.append(f"{indent}- {h['text']}")
+            lines.append("")
         
-        filepath = os.path.join(self.skill_dir, "references", f"{category}.md")
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(lines))
+        # Content
+        if page.get('content'):
+            content = page['content'][:2500]
+            if len(page['content']) > 2500:
+                content += "\n\n*[Content truncated]*"
+            lines.append(content)
+            lines.append("")
         
-        print(f"  ✓ {category}.md ({len(pages)} pages)")
+        # Code examples with language
+        if page.get('code_samples'):
+            lines.append("**Examples:**\n")
+            for i, sample in enumerate(page['code_samples'][:4], 1):
+                lang = sample.get('language', 'unknown')
+                code = sample.get('code', sample if isinstance(sample, str) else '')
+                lines.append(f"Example {i} ({lang}):")
+                lines.append(f"```{lang}")
+                lines.append(code[:600])
+                if len(code) > 600:
+                    lines.append("...")
+                lines.append("```\n")
+        
+        lines.append("---\n")
+        return lines
     
-    def create_enhanced_skill_md(self, categories, quick_ref):
-        """Create SKILL.md with actual examples (IMPROVED)"""
+    def create_enhanced_skill_md(self, categories, quick_ref, reference_files=None, search=False):
+        """Create SKILL.md with actual examples (IMPROVED)
+
+        reference_files maps a category to its shard files when it was split;
+        search says whether scripts/search.py was generated.
+        """
         description = self.config.get('description', f'Comprehensive assistance with {self.name}')
         
         # Extract actual code examples from docs
@@ -700,11 +4047,25 @@ def create_enhanced_skill_md(self, categories, quick_ref):
 """
         
         for cat in sorted(categories.keys()):
-            content += f"- **{cat}.md** - {cat.replace('_', ' ').title()} documentation\n"
+            files = (reference_files or {}).get(cat, [f"{cat}.md"])
+            if len(files) > 1:
+                content += (f"- **{files[0]}** … **{files[-1]}** - {cat.replace('_', ' ').title()} documentation"
+                            f" ({len(files)} parts)\n")
+            else:
+                content += f"- **{files[0]}** - {cat.replace('_', ' ').title()} documentation\n"
         
         content += """
 Use `view` to read specific reference files when detailed information is needed.
-
+`index.md` lists every page with its line range, so a single section can be
+viewed without loading a whole category.
+"""
+        if search:
+            content += """
+To find a topic, run `python3 scripts/search.py "your query"`. It prints the
+best-matching sections as `references/<file>:<first>-<last>` line ranges.
+"""
+        
+        content += """
 ## Working with This Skill
 
 ### For Beginners
@@ -726,7 +4087,10 @@ def create_enhanced_skill_md(self, categories, quick_ref):
 - Table of contents for quick navigation
 
 ### scripts/
-Add helper scripts here for common automation tasks.
+Add helper scripts here for common automation tasks."""
+        if search:
+            content += " `search.py` searches the reference files."
+        content += """
 
 ### assets/
 Add templates, boilerplate, or example projects here.
@@ -751,66 +4115,298 @@ def create_enhanced_skill_md(self, categories, quick_ref):
         
         print(f"  ✓ SKILL.md (enhanced with {len(example_codes)} examples)")
     
-    def create_index(self, categories):
-        """Create navigation index"""
-        lines = []
-        lines.append(f"# {self.name.title()} Documentation Index\n")
-        lines.append("## Categories\n")
-        
-        for cat, pages in sorted(categories.items()):
-            lines.append(f"### {cat.replace('_', ' ').title()}")
-            lines.append(f"**File:** `{cat}.md`")
-            lines.append(f"**Pages:** {len(pages)}\n")
-        
+    def _search_index_writer(self):
+        if not self.search_index_enabled:
+            return None
+        if not SearchIndexWriter.fts5_available():
+            print("  ⚠️  This Python's SQLite has no FTS5, skipping the search index")
+            return None
+        return SearchIndexWriter(os.path.join(self.skill_dir, "references", "search.db"))
+
+    def create_search_index(self, search_index, writers):
+        """Finish references/search.db and write scripts/search.py to query it"""
+        search_index.close(writers)
+        script_path = os.path.join(self.skill_dir, "scripts", "search.py")
+        with open(script_path, 'w', encoding='utf-8') as f:
+            f.write(SEARCH_SCRIPT)
+        os.chmod(script_path, 0o755)
+        size_kb = os.path.getsize(search_index.path) / 1024
+        print(f"  ✓ search.db ({search_index.rows} sections, {size_kb:,.0f} KB) + scripts/search.py")
+
+    def create_index(self, writers):
+        """Create navigation index from {category: closed ReferenceWriter}
+
+        Lists each category's shard files, and under each shard its pages
+        with line and byte ranges, so one section can be read without
+        loading the whole category.
+        """
         filepath = os.path.join(self.skill_dir, "references", "index.md")
         with open(filepath, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(lines))
+            f.write(f"# {self.name.title()} Documentation Index\n\n")
+            f.write("## Categories\n\n")
+            f.write("Each page is listed with its lines (inclusive) and byte range "
+                    "(start-end, end exclusive) in its file.\n\n")
+
+            for cat, writer in sorted(writers.items()):
+                files = writer.files
+                f.write(f"### {cat.replace('_', ' ').title()}\n")
+                if len(files) > 1:
+                    f.write(f"**Files:** {', '.join(f'`{name}`' for name in files)}\n")
+                else:
+                    f.write(f"**File:** `{files[0]}`\n")
+                f.write(f"**Pages:** {writer.pages}\n\n")
+
+                current = None
+                for name, title, first, last, start, end in writer.iter_toc():
+                    if name != current:
+                        if current is not None:
+                            f.write("\n")
+                        f.write(f"#### {name}\n")
+                        current = name
+                    f.write(f"- {title or '(untitled)'} (lines {first}-{last}, bytes {start}-{end})\n")
+                f.write("\n")
         
         print("  ✓ index.md")
     
     def build_skill(self):
-        """Build the skill from scraped data"""
+        """Build the skill from scraped data
+
+        Streams pages from the page store once. Each page goes straight to
+        its category's ReferenceWriter; only counts, quick-reference
+        patterns and the first pages' code samples are kept in memory.
+        """
         print(f"\n{'='*60}")
         print(f"BUILDING SKILL: {self.name}")
         print(f"{'='*60}\n")
         
-        # Load data
-        print("Loading scraped data...")
-        pages = self.load_scraped_data()
-        
-        if not pages:
+        # Categories from config, clusters, or inferred from URLs alone
+        print("Categorizing pages...")
+        matcher = self.get_category_matcher(self.iter_scraped_pages, urls=self._iter_scraped_urls())
+        order = matcher.categories + ['other']
+        writers = {}
+        search_index = self._search_index_writer()
+        samples = defaultdict(list)  # first 3 pages per category, for SKILL.md examples
+        quick_ref = []
+        seen_codes = set()
+        total = 0
+
+        for page in self.iter_scraped_pages():
+            total += 1
+            cat = matcher.categorize(page)
+            if cat not in writers:
+                writers[cat] = self._reference_writer(cat)
+            position = writers[cat].add(self._reference_page_lines(page), title=page['title'])
+            if search_index:
+                search_index.add(cat, position, page)
+
+            if len(samples[cat]) < 3:
+                samples[cat].append({'code_samples': page.get('code_samples', [])[:2]})
+            if len(quick_ref) < 15:
+                self._add_quick_reference(page, quick_ref, seen_codes)
+
+        if not total:
+            if search_index:
+                search_index.discard()
             print("✗ No scraped data found!")
             return False
-        
-        print(f"  ✓ Loaded {len(pages)} pages\n")
-        
-        # Categorize
-        print("Categorizing pages...")
-        categories = self.smart_categorize(pages)
-        print(f"  ✓ Created {len(categories)} categories\n")
-        
-        # Generate quick reference
-        print("Generating quick reference...")
-        quick_ref = self.generate_quick_reference(pages)
+
+        print(f"  ✓ Categorized {total} pages into {len(writers)} categories")
         print(f"  ✓ Extracted {len(quick_ref)} patterns\n")
         
-        # Create reference files
+        # Finish reference files
         print("Creating reference files...")
-        for cat, cat_pages in categories.items():
-            self.create_reference_file(cat, cat_pages)
+        for cat in order:
+            if cat in writers:
+                self._close_reference_writer(cat, writers[cat])
         
         # Create index
-        self.create_index(categories)
+        if search_index:
+            self.create_search_index(search_index, writers)
+        self.create_index(writers)
         print()
         
         # Create enhanced SKILL.md
         print("Creating SKILL.md...")
-        self.create_enhanced_skill_md(categories, quick_ref)
+        self.create_enhanced_skill_md({cat: samples[cat] for cat in order if cat in writers}, quick_ref,
+                                      reference_files={cat: writer.files for cat, writer in writers.items()},
+                                      search=bool(search_index))
         
         print(f"\n✅ Skill built: {self.skill_dir}/")
         return True
 
 
+# Parser process state (pipeline mode)
+_parse_worker = None
+
+
+class BatchScheduler:
+    """Crawl many sites at once, then build each skill on a process pool
+
+    Sites are crawled on threads of this process, `sites` at a time, with
+    one shared FetchSlots: per-host limits hold across sites (a host's limit
+    is the lowest per_host_concurrency any of its configs sets, default
+    `per_host`) and at most `concurrency` requests are in flight overall.
+    Sites on the same host also share one HostRateLimiter, built from the
+    config with the slowest rate_limit. Sites that use the browser share
+    one pool. Each site's own concurrency still applies. As soon as a
+    crawl finishes, its build_skill() starts in a build process,
+    overlapping with the crawls still running.
+    """
+
+    def __init__(self, configs, concurrency=16, sites=4, build_workers=None, per_host=4, incremental=False):
+        self.configs = configs
+        self.sites = max(1, sites)
+        self.build_workers = build_workers or os.cpu_count() or 1
+        self.incremental = incremental
+
+        host_limits = {}
+        for config in configs:
+            if 'per_host_concurrency' in config:
+                host = urlparse(config['base_url']).netloc
+                host_limits[host] = min(host_limits.get(host, per_host), int(config['per_host_concurrency']))
+        self.fetch_slots = FetchSlots(per_host=per_host, total=concurrency, host_limits=host_limits)
+        self.rate_limiters = self._shared_rate_limiters(configs)
+        self.browser_pool = None
+
+    @staticmethod
+    def _shared_rate_limiters(configs):
+        """{host: HostRateLimiter} from the slowest rate_limit among each host's configs"""
+        slowest = {}
+        for config in configs:
+            host = urlparse(config['base_url']).netloc
+            if host not in slowest or config.get('rate_limit', 0.5) > slowest[host].get('rate_limit', 0.5):
+                slowest[host] = config
+        return {host: HostRateLimiter.from_config(config) for host, config in slowest.items()}
+
+    @staticmethod
+    def load_configs(config_dir):
+        """Valid configs from config_dir/*.json; invalid ones are reported and skipped"""
+        configs = []
+        names = set()
+        for path in sorted(Path(config_dir).glob('*.json')):
+            try:
+                config = load_config(path)
+            except SystemExit:
+                continue  # load_config() printed the reason
+            if config['name'] in names:
+                print(f"❌ {path}: skill name '{config['name']}' is used by another config, skipped")
+                continue
+            names.add(config['name'])
+            configs.append(config)
+        return configs
+
+    def _start_browser(self):
+        """One browser pool for every site that renders, sized for the largest"""
+        browser_configs = [config for config in self.configs if config.get('use_browser')]
+        if not browser_configs or not PLAYWRIGHT_AVAILABLE:
+            return
+        size = max(max(1, int(config.get('browser', {}).get('pages', 4))) for config in browser_configs)
+        try:
+            self.browser_pool = BrowserPool.from_config(browser_configs[0], size)
+            self.browser_pool.start()
+            print(f"✅ Shared browser initialized ({size} pages, {len(browser_configs)} sites)")
+        except Exception as e:
+            print(f"⚠️  Failed to initialize browser: {e}")
+            self.browser_pool = None
+
+    def _crawl(self, config):
+        """Crawl one site on a batch thread; returns its crawl result"""
+        start = time.perf_counter()
+        browser_pool = self.browser_pool if config.get('use_browser') else None
+        converter = DocToSkillConverter(config, incremental=self.incremental,
+                                        fetch_slots=self.fetch_slots, browser_pool=browser_pool,
+                                        rate_limiter=self.rate_limiters.get(urlparse(config['base_url']).netloc))
+        converter.scrape_all()
+        if converter.checkpoint_enabled:
+            converter.clear_checkpoint()
+        return {'pages': converter.pages_scraped, 'crawl': time.perf_counter() - start}
+
+    def run(self):
+        """Crawl and build every site; returns {name: {'pages', 'crawl', 'build', 'ok', 'error'}}"""
+        print(f"\n{'='*60}")
+        print(f"BATCH: {len(self.configs)} sites, {self.sites} at a time, "
+              f"{self.build_workers} build processes")
+        print(f"{'='*60}\n")
+
+        start = time.perf_counter()
+        results = {config['name']: {'pages': 0, 'crawl': None, 'build': None, 'ok': False, 'error': None}
+                   for config in self.configs}
+        self._start_browser()
+        crawl_pool = ThreadPoolExecutor(max_workers=self.sites, thread_name_prefix='batch')
+        # spawn: forking a process that is running crawl threads is unsafe
+        build_pool = ProcessPoolExecutor(max_workers=self.build_workers,
+                                         mp_context=multiprocessing.get_context('spawn'))
+        try:
+            crawls = {crawl_pool.submit(self._crawl, config): config for config in self.configs}
+            builds = {}
+            for future in as_completed(crawls):
+                config = crawls[future]
+                try:
+                    results[config['name']].update(future.result())
+                except Exception as e:
+                    results[config['name']]['error'] = f"crawl: {e}"
+                    continue
+                builds[build_pool.submit(_build_in_worker, config)] = config
+
+            for future in as_completed(builds):
+                result = results[builds[future]['name']]
+                try:
+                    result['ok'], result['build'] = future.result()
+                    if not result['ok']:
+                        result['error'] = "build: no pages"
+                except Exception as e:
+                    result['error'] = f"build: {e}"
+        finally:
+            crawl_pool.shutdown(wait=True, cancel_futures=True)
+            build_pool.shutdown(wait=True, cancel_futures=True)
+            if self.browser_pool:
+                self.browser_pool.close()
+
+        self.print_summary(results, time.perf_counter() - start)
+        return results
+
+    @staticmethod
+    def print_summary(results, elapsed):
+        crawl_total = sum(result['crawl'] or 0 for result in results.values())
+        build_total = sum(result['build'] or 0 for result in results.values())
+        print(f"\n{'='*60}")
+        print(f"BATCH SUMMARY: {len(results)} sites in {elapsed:.1f}s "
+              f"(crawls {crawl_total:.1f}s, builds {build_total:.1f}s summed)")
+        print(f"{'='*60}")
+        print(f"{'Site':<28} {'Pages':>7} {'Crawl':>9} {'Build':>9}  Status")
+        for name, result in sorted(results.items()):
+            crawl = f"{result['crawl']:.1f}s" if result['crawl'] is not None else '-'
+            build = f"{result['build']:.1f}s" if result['build'] is not None else '-'
+            status = '✅' if result['ok'] else f"❌ {result['error']}"
+            print(f"{name:<28} {result['pages']:>7} {crawl:>9} {build:>9}  {status}")
+
+
+def _build_in_worker(config):
+    """Run build_skill() for one batch site in a build process; returns (success, seconds)"""
+    start = time.perf_counter()
+    converter = DocToSkillConverter(dict(config, use_browser=False))
+    success = converter.build_skill()
+    return bool(success), time.perf_counter() - start
+
+
+def _init_parse_worker(config):
+    """Process pool initializer: build a parse-only converter"""
+    global _parse_worker
+    _parse_worker = DocToSkillConverter(config, dry_run=True)
+
+
+def _parse_in_worker(html, url):
+    """Run parse_html() in a parser process; returns (page, seconds)"""
+    start = time.perf_counter()
+    page = _parse_worker.parse_html(html, url)
+    return page, time.perf_counter() - start
+
+
+def _reparse_in_worker(location, url):
+    """Parse archived HTML in a parser process; returns (page, seconds)"""
+    return _parse_in_worker(RawArchive.read_record(*location), url)
+
+
 def validate_config(config):
     """Validate configuration structure"""
     errors = []
@@ -853,6 +4449,22 @@ def validate_config(config):
                 if key in config['url_patterns']:
                     if not isinstance(config['url_patterns'][key], list):
                         errors.append(f"'url_patterns.{key}' must be a list")
+                        continue
+                    for pattern in config['url_patterns'][key]:
+                        if isinstance(pattern, str) and pattern.startswith('re:'):
+                            try:
+                                re.compile(pattern[3:])
+                            except re.error as e:
+                                errors.append(f"Invalid regex in 'url_patterns.{key}': {pattern} ({e})")
+
+    # Validate url_normalization
+    if 'url_normalization' in config:
+        if not isinstance(config['url_normalization'], dict):
+            errors.append("'url_normalization' must be a dictionary")
+        else:
+            for key in ['strip_query', 'strip_trailing_slash']:
+                if key in config['url_normalization'] and not isinstance(config['url_normalization'][key], bool):
+                    errors.append(f"'url_normalization.{key}' must be true or false")
 
     # Validate categories
     if 'categories' in config:
@@ -885,6 +4497,157 @@ def validate_config(config):
         except (ValueError, TypeError):
             errors.append(f"'max_pages' must be an integer (got {config['max_pages']})")
 
+    # Validate parser backend
+    if 'parser' in config and config['parser'] not in PARSER_BACKENDS:
+        errors.append(f"Invalid parser: '{config['parser']}' (use one of: {', '.join(PARSER_BACKENDS)})")
+
+    # Validate concurrency settings
+    if 'parser_workers' in config:
+        try:
+            if int(config['parser_workers']) < 0:
+                errors.append(f"'parser_workers' must be 0 or more (got {config['parser_workers']})")
+        except (ValueError, TypeError):
+            errors.append(f"'parser_workers' must be an integer (got {config['parser_workers']})")
+
+    for key in ['concurrency', 'per_host_concurrency', 'parse_queue_size']:
+        if key in config:
+            try:
+                value = int(config[key])
+                if value < 1:
+                    errors.append(f"'{key}' must be at least 1 (got {value})")
+                elif value > 64:
+                    warnings.append(f"'{key}' is very high ({value}) - be respectful to documentation sites")
+            except (ValueError, TypeError):
+                errors.append(f"'{key}' must be an integer (got {config[key]})")
+
+    # Validate http transport settings
+    if 'http' in config:
+        if not isinstance(config['http'], dict):
+            errors.append("'http' must be a dictionary")
+        else:
+            for key in ['pool_size', 'retries']:
+                if key in config['http'] and not isinstance(config['http'][key], int):
+                    errors.append(f"'http.{key}' must be an integer")
+            for key in ['timeout', 'backoff_factor']:
+                if key in config['http'] and not isinstance(config['http'][key], (int, float)):
+                    errors.append(f"'http.{key}' must be a number")
+
+    # Validate dedup settings
+    if 'dedup' in config:
+        if not isinstance(config['dedup'], dict):
+            errors.append("'dedup' must be a dictionary")
+        else:
+            similarity = config['dedup'].get('similarity', 0.9)
+            if not isinstance(similarity, (int, float)) or not 0 < similarity <= 1:
+                errors.append("'dedup.similarity' must be between 0 and 1")
+            if not isinstance(config['dedup'].get('min_words', 50), int):
+                errors.append("'dedup.min_words' must be an integer")
+
+    # Validate reference shard size
+    if 'references' in config:
+        if not isinstance(config['references'], dict):
+            errors.append("'references' must be a dictionary")
+        else:
+            max_tokens = config['references'].get('max_tokens', 20000)
+            if not isinstance(max_tokens, int) or max_tokens < 0:
+                errors.append("'references.max_tokens' must be a non-negative integer (0 = one file per category)")
+
+    # Validate telemetry settings
+    if 'telemetry' in config:
+        if not isinstance(config['telemetry'], dict):
+            errors.append("'telemetry' must be a dictionary")
+        else:
+            for key in ('interval', 'window'):
+                value = config['telemetry'].get(key, 1)
+                if not isinstance(value, (int, float)) or value <= 0:
+                    errors.append(f"'telemetry.{key}' must be a positive number of seconds")
+
+    # Validate priority frontier settings
+    if 'priority' in config:
+        if not isinstance(config['priority'], dict):
+            errors.append("'priority' must be a dictionary")
+        else:
+            url_weights = config['priority'].get('url_weights', {})
+            if not isinstance(url_weights, dict) or not all(
+                    isinstance(weight, (int, float)) for weight in url_weights.values()):
+                errors.append("'priority.url_weights' must map URL patterns to numbers")
+            for key in ('category_weight', 'depth_weight', 'inlink_weight'):
+                if not isinstance(config['priority'].get(key, 0), (int, float)):
+                    errors.append(f"'priority.{key}' must be a number")
+
+    # Validate raw HTML archive settings
+    if 'archive' in config:
+        if not isinstance(config['archive'], dict):
+            errors.append("'archive' must be a dictionary")
+        else:
+            segment_mb = config['archive'].get('segment_mb', 256)
+            if not isinstance(segment_mb, (int, float)) or segment_mb <= 0:
+                errors.append("'archive.segment_mb' must be a positive number")
+            level = config['archive'].get('compression_level', 6)
+            if not isinstance(level, int) or not 0 <= level <= 9:
+                errors.append("'archive.compression_level' must be an integer from 0 to 9")
+
+    # Validate search index settings
+    if 'search_index' in config and not isinstance(config['search_index'], dict):
+        errors.append("'search_index' must be a dictionary")
+
+    # Validate clustering settings
+    if 'clustering' in config:
+        if not isinstance(config['clustering'], dict):
+            errors.append("'clustering' must be a dictionary")
+        else:
+            for key in ('clusters', 'features', 'batch_size', 'epochs'):
+                value = config['clustering'].get(key, 1)
+                if not isinstance(value, int) or value < 1:
+                    errors.append(f"'clustering.{key}' must be a positive integer")
+            if config['clustering'].get('enabled') and not NUMPY_AVAILABLE:
+                warnings.append("'clustering' needs numpy; categories will be inferred from URLs")
+
+    # Validate sitemap settings
+    if 'sitemap' in config:
+        if not isinstance(config['sitemap'], dict):
+            errors.append("'sitemap' must be a dictionary")
+        elif 'urls' in config['sitemap'] and not isinstance(config['sitemap']['urls'], list):
+            errors.append("'sitemap.urls' must be a list")
+
+    # Validate browser mode
+    if 'use_browser' in config and config['use_browser'] not in (True, False, 'auto'):
+        errors.append(f"'use_browser' must be true, false or \"auto\" (got {config['use_browser']})")
+
+    # Validate browser pool settings
+    if 'browser' in config:
+        if not isinstance(config['browser'], dict):
+            errors.append("'browser' must be a dictionary")
+        else:
+            for key in ['pages', 'timeout', 'ready_timeout', 'recycle_after', 'prefix_depth']:
+                value = config['browser'].get(key)
+                if value is not None and (not isinstance(value, int) or value < 1):
+                    errors.append(f"'browser.{key}' must be a positive integer")
+            if 'block_resources' in config['browser'] and not isinstance(config['browser']['block_resources'], list):
+                errors.append("'browser.block_resources' must be a list")
+            if config['browser'].get('wait_until', 'load') not in ('load', 'domcontentloaded', 'networkidle', 'commit'):
+                errors.append("'browser.wait_until' must be one of: load, domcontentloaded, networkidle, commit")
+
+    # Validate rate limiter settings
+    if 'rate_limiter' in config:
+        if not isinstance(config['rate_limiter'], dict):
+            errors.append("'rate_limiter' must be a dictionary")
+        else:
+            for key in ['initial_rate', 'min_rate', 'max_rate', 'burst', 'target_latency', 'increase']:
+                value = config['rate_limiter'].get(key)
+                if value is not None and (not isinstance(value, (int, float)) or value <= 0):
+                    errors.append(f"'rate_limiter.{key}' must be a positive number")
+            backoff = config['rate_limiter'].get('backoff')
+            if backoff is not None and (not isinstance(backoff, (int, float)) or not 0 < backoff < 1):
+                errors.append("'rate_limiter.backoff' must be between 0 and 1")
+
+    # Validate storage settings
+    if 'storage' in config:
+        if not isinstance(config['storage'], dict):
+            errors.append("'storage' must be a dictionary")
+        elif 'segment_mb' in config['storage'] and not isinstance(config['storage']['segment_mb'], (int, float)):
+            errors.append("'storage.segment_mb' must be a number")
+
     # Validate start_urls if present
     if 'start_urls' in config:
         if not isinstance(config['start_urls'], list):
@@ -982,6 +4745,31 @@ def check_existing_data(name):
     return False, 0
 
 
+def apply_cli_overrides(config, args):
+    """Apply the crawl options given on the command line to config"""
+    # Override use_browser from command line if specified
+    if args.use_browser:
+        config['use_browser'] = True
+    elif args.auto_browser:
+        config['use_browser'] = 'auto'
+
+    if args.sitemap:
+        config['sitemap'] = dict(config.get('sitemap', {}), enabled=True)
+
+    if args.cluster_categories:
+        config['clustering'] = dict(config.get('clustering', {}), enabled=True)
+
+    if args.prioritize:
+        config['priority'] = dict(config.get('priority', {}), enabled=True)
+
+    # Override concurrency from command line if specified
+    if args.concurrency:
+        config['concurrency'] = args.concurrency
+    if args.parser_workers is not None:
+        config['parser_workers'] = args.parser_workers
+    return config
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Convert documentation websites to Claude skills',
@@ -1000,6 +4788,12 @@ def main():
                        help='Skill description')
     parser.add_argument('--skip-scrape', action='store_true',
                        help='Skip scraping, use existing data')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Re-scrape with conditional requests, skipping pages unchanged since the last crawl')
+    parser.add_argument('--reparse', action='store_true',
+                       help='Re-extract pages from the raw HTML archive (no network), then build the skill')
+    parser.add_argument('--migrate-pages', action='store_true',
+                       help='Convert an existing pages/ directory into the page store and exit')
     parser.add_argument('--dry-run', action='store_true',
                        help='Preview what will be scraped without actually scraping')
     parser.add_argument('--enhance', action='store_true',
@@ -1014,8 +4808,41 @@ def main():
                        help='Clear checkpoint and start fresh')
     parser.add_argument('--use-browser', action='store_true',
                        help='Use browser automation for JavaScript-heavy sites (requires: pip install playwright && playwright install chromium)')
+    parser.add_argument('--sitemap', action='store_true',
+                       help='Queue URLs from robots.txt / sitemap.xml before following links')
+    parser.add_argument('--prioritize', action='store_true',
+                       help='Fetch the highest-scoring URLs first (priority.url_weights, depth, inbound links)')
+    parser.add_argument('--cluster-categories', action='store_true',
+                       help='Without configured categories, cluster pages by title and headings (requires: pip install numpy)')
+    parser.add_argument('--auto-browser', action='store_true',
+                       help='Fetch statically and only render with the browser where the main content needs JavaScript')
+    parser.add_argument('--concurrency', type=int,
+                       help='Number of pages to fetch in parallel (default: 1)')
+    parser.add_argument('--parser-workers', type=int,
+                       help='Parse pages in N separate processes (default: 0, parse while fetching)')
+    parser.add_argument('--batch', type=str, metavar='DIR',
+                       help='Scrape every config in DIR concurrently, then build each skill')
+    parser.add_argument('--batch-concurrency', type=int, default=16,
+                       help='Batch mode: requests in flight across all sites (default: 16)')
+    parser.add_argument('--batch-sites', type=int, default=4,
+                       help='Batch mode: sites crawled at the same time (default: 4)')
+    parser.add_argument('--build-workers', type=int,
+                       help='Batch mode: skills built in parallel (default: one per CPU)')
 
     args = parser.parse_args()
+
+    # Batch mode: every config in a directory, crawled side by side
+    if args.batch:
+        configs = [apply_cli_overrides(config, args) for config in BatchScheduler.load_configs(args.batch)]
+        if not configs:
+            print(f"❌ No valid configs in {args.batch}")
+            sys.exit(1)
+        scheduler = BatchScheduler(configs, concurrency=args.batch_concurrency, sites=args.batch_sites,
+                                   build_workers=args.build_workers, incremental=args.incremental)
+        results = scheduler.run()
+        if not all(result['ok'] for result in results.values()):
+            sys.exit(1)
+        return
     
     # Get configuration
     if args.config:
@@ -1037,9 +4864,7 @@ def main():
             'max_pages': 500
         }
 
-    # Override use_browser from command line if specified
-    if args.use_browser:
-        config['use_browser'] = True
+    apply_cli_overrides(config, args)
     
     # Dry run mode - preview only
     if args.dry_run:
@@ -1056,13 +4881,19 @@ def main():
         print(f"   Base URL: {config['base_url']}")
         print(f"   Max pages: {config.get('max_pages', 500)}")
         print(f"   Rate limit: {config.get('rate_limit', 0.5)}s")
+        print(f"   Concurrency: {config.get('concurrency', 1)}")
         print(f"   Categories: {len(config.get('categories', {}))}")
         return
 
+    # Convert legacy per-page JSON files
+    if args.migrate_pages:
+        DocToSkillConverter(config).migrate_pages()
+        return
+
     # Check for existing data
     exists, page_count = check_existing_data(config['name'])
 
-    if exists and not args.skip_scrape:
+    if exists and not args.skip_scrape and not args.incremental and not args.reparse:
         print(f"\n✓ Found existing data: {page_count} pages")
         try:
             response = input("Use existing data? (y/n): ").strip().lower()
@@ -1074,14 +4905,17 @@ def main():
             pass
 
     # Create converter
-    converter = DocToSkillConverter(config, resume=args.resume)
+    converter = DocToSkillConverter(config, resume=args.resume, incremental=args.incremental)
 
     # Handle fresh start (clear checkpoint)
     if args.fresh:
         converter.clear_checkpoint()
 
-    # Scrape or skip
-    if not args.skip_scrape:
+    # Scrape, re-extract from the archive, or skip
+    if args.reparse:
+        if not converter.reparse():
+            sys.exit(1)
+    elif not args.skip_scrape:
         try:
             converter.scrape_all()
             # Save final checkpoint
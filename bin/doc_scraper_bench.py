@@ -0,0 +1,1078 @@
+#!/usr/bin/env python3
+"""
+Documentation Scraper Benchmarks
+Offline benchmarks for doc_scraper.py against a local stand-in documentation site.
+
+Usage:
+    python3 doc_scraper_bench.py connections --pages 100
+    python3 doc_scraper_bench.py frontier --sizes 10000 100000 1000000
+    python3 doc_scraper_bench.py priority --pages 4000 --max-pages 400
+    python3 doc_scraper_bench.py parity --fixtures saved_html/
+    python3 doc_scraper_bench.py extract --sections 200 --nesting 6
+    python3 doc_scraper_bench.py pipeline --workers 1 4 16
+    python3 doc_scraper_bench.py --json baseline.json crawl --pages 2000
+    python3 doc_scraper_bench.py crawl --pages 2000 --compare baseline.json
+    python3 doc_scraper_bench.py categorize --sizes 1000 10000 100000
+    python3 doc_scraper_bench.py cluster --sizes 10000 100000
+    python3 doc_scraper_bench.py search --sizes 1000 10000 30000
+    python3 doc_scraper_bench.py memory --sizes 1000 10000 30000
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import random
+import resource
+import subprocess
+import multiprocessing
+import runpy
+import argparse
+import tracemalloc
+import contextlib
+import tempfile
+import threading
+import requests
+from pathlib import Path
+from collections import deque
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from doc_scraper import (DocToSkillConverter, UrlFrontier, PriorityFrontier, UrlFilter, PageStore,  # noqa: E402
+                         CategoryMatcher, PageClusterer, PARSER_BACKENDS, AHOCORASICK_AVAILABLE,
+                         NUMPY_AVAILABLE)
+
+
+class MockDocSite:
+    """Synthetic documentation site served from memory
+
+    `duplicates` is the fraction of pages also served, byte for byte, under
+    a versioned /docs/latest/ URL that the page links to. `prose` adds that
+    many seeded random words to each section, so pages differ the way real
+    ones do instead of only in their numbers.
+    """
+
+    VOCABULARY = ('request response client server config option value default token session cache index '
+                  'query result error retry timeout handler callback event stream buffer parser schema field '
+                  'record table column batch worker thread process queue message channel header payload '
+                  'resource endpoint route path module package plugin hook filter middleware version '
+                  'release build deploy install update migrate validate serialize encode decode compress '
+                  'encrypt sign verify login logout user group role permission policy quota limit metric '
+                  'trace log debug profile benchmark test fixture mock stub assert widget layout render '
+                  'style theme color font image asset bundle chunk lazy eager async await promise future').split()
+
+    def __init__(self, pages=100, fanout=10, sections=1, nesting=0, code_blocks=1, duplicates=0.0, prose=0):
+        self.page_count = pages
+        self.fanout = fanout
+        self.sections = sections
+        self.nesting = nesting
+        self.code_blocks = code_blocks
+        self.duplicates = duplicates
+        self.prose = prose
+
+    def path_for(self, i):
+        return f"/docs/page{i}.html"
+
+    def is_duplicated(self, i):
+        """Spread duplicated pages evenly: i is one if i * ratio crosses an integer"""
+        return int((i + 1) * self.duplicates) > int(i * self.duplicates)
+
+    def render_section(self, i, s):
+        """One documentation section, wrapped in `nesting` levels of <div>"""
+        section = f"""<h2 id="section-{s}">Section {s}</h2>
+<p>Section {s} of page {i} explains one more part of the synthetic documentation site.</p>
+<p>Example: call the helper with a configuration object to get started.</p>
+<pre><code class="language-python">from docs import helper
+helper.run(page={i}, section={s})</code></pre>"""
+        if self.prose:
+            words = random.Random(i * 1009 + s).choices(self.VOCABULARY, k=self.prose)
+            section += f"\n<p>{' '.join(words)}.</p>"
+        for c in range(1, self.code_blocks):
+            section += f"""
+<pre><code class="language-python">helper.configure(page={i}, section={s}, block={c})
+helper.run(page={i}, section={s})</code></pre>"""
+        for depth in range(self.nesting):
+            section = f'<div class="level-{depth}">{section}</div>'
+        return section
+
+    def linked(self, i):
+        """Pages that page i links to"""
+        return [(i + j) % self.page_count for j in range(1, self.fanout + 1)]
+
+    def render(self, i):
+        """Render page i as HTML"""
+        links = ''.join(f'<li><a href="{self.path_for(j)}">Page {j}</a></li>' for j in self.linked(i))
+        if self.is_duplicated(i):
+            links += f'<li><a href="/docs/latest/page{i}.html">Page {i} (latest)</a></li>'
+        sections = '\n'.join(self.render_section(i, s) for s in range(self.sections))
+        return f"""<!DOCTYPE html>
+<html><head><title>Page {i}</title></head>
+<body>
+<nav><ul>{links}</ul></nav>
+<div role="main">
+<h1 id="page-{i}">Page {i}</h1>
+<p>This is the introduction paragraph for page {i} of the synthetic documentation site.</p>
+{sections}
+</div>
+</body></html>"""
+
+    def lookup(self, path):
+        """Return HTML for a request path, or None for 404"""
+        if path in ('/docs/', '/docs/index.html'):
+            return self.render(0)
+        versioned = path.startswith('/docs/latest/')
+        if versioned:
+            path = '/docs/' + path[len('/docs/latest/'):]
+        if path.startswith('/docs/page') and path.endswith('.html'):
+            try:
+                i = int(path[len('/docs/page'):-len('.html')])
+            except ValueError:
+                return None
+            if 0 <= i < self.page_count and (not versioned or self.is_duplicated(i)):
+                return self.render(i)
+        return None
+
+
+class SectionedDocSite(MockDocSite):
+    """Mock site with pages spread over sections: page i lives in SECTIONS[i % 4]
+
+    Pages link to seeded random pages across the site, like a sidebar, so
+    link depth grows logarithmically instead of along a chain.
+    """
+
+    SECTIONS = ('blog', 'changelog', 'guide', 'api')
+    PATH_RE = re.compile(r'^/docs/(\w+)/page(\d+)\.html$')
+
+    def path_for(self, i):
+        return f"/docs/{self.SECTIONS[i % len(self.SECTIONS)]}/page{i}.html"
+
+    def linked(self, i):
+        return random.Random(i).sample(range(self.page_count), min(self.fanout, self.page_count))
+
+    def lookup(self, path):
+        if path in ('/docs/', '/docs/index.html'):
+            return self.render(0)
+        match = self.PATH_RE.match(path)
+        if match and int(match.group(2)) < self.page_count and self.path_for(int(match.group(2))) == path:
+            return self.render(int(match.group(2)))
+        return None
+
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.should_throttle():
+            self.send_response(429)
+            self.send_header('Retry-After', str(self.server.retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        html = self.server.site.lookup(self.path.split('?')[0])
+        if html is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = html.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockSiteServer(ThreadingHTTPServer):
+    """HTTP server that counts accepted TCP connections and requests
+
+    Optionally delays every response by `latency` seconds and answers
+    every `throttle_every`-th request with 429 Too Many Requests.
+    """
+    daemon_threads = True
+
+    def __init__(self, site, latency=0.0, throttle_every=0, retry_after=0):
+        super().__init__(('127.0.0.1', 0), MockSiteHandler)
+        self.site = site
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.connections = 0
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def should_throttle(self):
+        with self._lock:
+            self.requests += 1
+            if self.throttle_every and self.requests % self.throttle_every == 0:
+                self.throttled += 1
+                return True
+        return False
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+    @property
+    def base_url(self):
+        return self.url('/docs/')
+
+    def reset(self):
+        with self._lock:
+            self.connections = 0
+
+
+def start_server(site, **options):
+    """Serve a mock site on a background thread"""
+    server = MockSiteServer(site, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_config(base_url, **overrides):
+    """Scraper config for the mock site"""
+    config = {
+        'name': 'bench',
+        'base_url': base_url,
+        'selectors': {
+            'main_content': 'div[role="main"]',
+            'title': 'title',
+            'code_blocks': 'pre code'
+        },
+        'rate_limit': 0,
+        'max_pages': 100000
+    }
+    config.update(overrides)
+    return config
+
+
+def bench_connections(args):
+    """Count TCP connections opened while fetching N pages"""
+    site = MockDocSite(pages=args.pages)
+    server = start_server(site)
+    urls = [server.url(site.path_for(i)) for i in range(args.pages)]
+    results = {}
+
+    # Baseline: module-level requests.get, one connection per request
+    server.reset()
+    start = time.perf_counter()
+    for url in urls:
+        requests.get(url, timeout=30).raise_for_status()
+    results['requests.get'] = {
+        'connections': server.connections,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+
+    # Converter transport (pooled session)
+    converter = DocToSkillConverter(make_config(server.base_url), dry_run=True)
+    server.reset()
+    start = time.perf_counter()
+    for url in urls:
+        converter._fetch_with_requests(url)
+    results['session'] = {
+        'connections': server.connections,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+    converter.session.close()
+    server.shutdown()
+
+    print(f"\nConnections opened per {args.pages} pages:")
+    for name, result in results.items():
+        print(f"  {name:<14} {result['connections']:>5} connections  {result['seconds']:.3f}s")
+    return results
+
+
+def bench_frontier(args):
+    """Time frontier membership checks: deque scan vs UrlFrontier"""
+    results = {}
+    print(f"\nFrontier membership ({args.lookups} lookups of unseen links):")
+    for size in args.sizes:
+        urls = [f"https://docs.example.com/docs/section{i % 97}/page{i}.html" for i in range(size)]
+        misses = [f"https://docs.example.com/docs/new/page{i}.html" for i in range(args.lookups)]
+        result = {}
+
+        for name, factory in (('deque', deque), ('UrlFrontier', UrlFrontier), ('PriorityFrontier', PriorityFrontier)):
+            start = time.perf_counter()
+            frontier = factory(urls)
+            build = time.perf_counter() - start
+
+            # Sidebar-style pages check every link before queueing it
+            start = time.perf_counter()
+            for url in misses:
+                if url not in frontier:
+                    pass
+            lookup = time.perf_counter() - start
+
+            start = time.perf_counter()
+            while frontier:
+                frontier.popleft()
+            drain = time.perf_counter() - start
+
+            result[name] = {
+                'build_seconds': round(build, 4),
+                'lookup_us': round(lookup / args.lookups * 1e6, 3),
+                'drain_seconds': round(drain, 4)
+            }
+            print(f"  {size:>9,} URLs  {name:<16} lookup {result[name]['lookup_us']:>12.3f} µs"
+                  f"  build {build:.3f}s  drain {drain:.3f}s")
+
+        results[str(size)] = result
+    return results
+
+
+def legacy_is_valid_url(config, url):
+    """is_valid_url before the compiled filter: substring scans per call"""
+    if not url.startswith(config['base_url']):
+        return False
+    includes = config.get('url_patterns', {}).get('include', [])
+    if includes and not any(pattern in url for pattern in includes):
+        return False
+    excludes = config.get('url_patterns', {}).get('exclude', [])
+    if any(pattern in url for pattern in excludes):
+        return False
+    return True
+
+
+def bench_urlfilter(args):
+    """Time is_valid_url with many exclude patterns: substring scans vs UrlFilter"""
+    base_url = 'https://docs.example.com/docs/'
+    urls = [f"{base_url}section{i % 97}/topic{i % 13}/page{i}.html" for i in range(args.urls)]
+    backend = 'pyahocorasick' if AHOCORASICK_AVAILABLE else 'pure Python'
+    results = {}
+    print(f"\nURL filter ({args.urls:,} URLs, Aho-Corasick: {backend}):")
+    for count in args.excludes:
+        excludes = [f"/excluded{i}/" for i in range(count)]
+        config = {'base_url': base_url, 'url_patterns': {'include': ['/docs/'], 'exclude': excludes}}
+        url_filter = UrlFilter.from_config(config)
+
+        start = time.perf_counter()
+        legacy = [legacy_is_valid_url(config, url) for url in urls]
+        legacy_us = (time.perf_counter() - start) / len(urls) * 1e6
+
+        start = time.perf_counter()
+        compiled = [url_filter.allows(url) for url in urls]
+        compiled_us = (time.perf_counter() - start) / len(urls) * 1e6
+
+        if legacy != compiled:
+            print(f"  ❌ {count} excludes: compiled filter disagrees with substring scans")
+            args.failed = True
+
+        results[str(count)] = {'substring_us': round(legacy_us, 3), 'compiled_us': round(compiled_us, 3)}
+        print(f"  {count:>5} excludes  substring scans {legacy_us:>8.2f} µs/URL   compiled {compiled_us:>6.2f} µs/URL")
+    return results
+
+
+def load_fixtures(args):
+    """(url, html) pairs from --fixtures, or synthetic pages if not given"""
+    if not args.fixtures:
+        site = MockDocSite(pages=args.pages)
+        return [(args.base_url + f"page{i}.html", site.render(i).encode('utf-8')) for i in range(args.pages)]
+
+    fixtures = []
+    for path in sorted(Path(args.fixtures).glob('*.htm*')):
+        fixtures.append((args.base_url + path.name, path.read_bytes()))
+    if not fixtures:
+        print(f"❌ No .html/.htm fixtures in {args.fixtures}")
+        sys.exit(1)
+    return fixtures
+
+
+def bench_parity(args):
+    """Check that every available parser backend extracts the same page dicts"""
+    fixtures = load_fixtures(args)
+    converters = {}
+    for backend in PARSER_BACKENDS:
+        converter = DocToSkillConverter(make_config(args.base_url, parser=backend), dry_run=True)
+        if converter.parser_backend == backend:
+            converters[backend] = converter
+
+    reference = converters.pop('html.parser')
+    results = {}
+    print(f"\nParser parity over {len(fixtures)} fixtures (reference: html.parser):")
+    for backend, converter in converters.items():
+        mismatches = []
+        for url, html in fixtures:
+            expected = reference.parse_html(html, url)
+            actual = converter.parse_html(html, url)
+            if actual != expected:
+                keys = [k for k in expected if expected[k] != actual.get(k)]
+                mismatches.append({'url': url, 'keys': keys})
+
+        results[backend] = {'fixtures': len(fixtures), 'mismatches': mismatches}
+        status = '✅' if not mismatches else '❌'
+        print(f"  {status} {backend:<12} {len(fixtures) - len(mismatches)}/{len(fixtures)} identical")
+        for mismatch in mismatches[:10]:
+            print(f"     {mismatch['url']}: {', '.join(mismatch['keys'])}")
+
+    if any(r['mismatches'] for r in results.values()):
+        args.failed = True
+    return results
+
+
+def legacy_extract_content(converter, soup, url):
+    """Multi-pass extract_content() as it was before the single-pass walk
+
+    Kept as the reference for output and CPU comparisons.
+    """
+    page = {'url': url, 'title': '', 'content': '', 'headings': [],
+            'code_samples': [], 'patterns': [], 'links': []}
+    selectors = converter.config.get('selectors', {})
+
+    title_elem = soup.select_one(selectors.get('title', 'title'))
+    if title_elem:
+        page['title'] = converter.clean_text(title_elem.get_text())
+
+    main = soup.select_one(selectors.get('main_content', 'div[role="main"]'))
+    if not main:
+        return page
+
+    for h in main.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
+        text = converter.clean_text(h.get_text())
+        if text:
+            page['headings'].append({'level': h.name, 'text': text, 'id': h.get('id', '')})
+
+    for code_elem in main.select(selectors.get('code_blocks', 'pre code')):
+        code = code_elem.get_text()
+        if len(code.strip()) > 10:
+            page['code_samples'].append({'code': code.strip(),
+                                         'language': converter.detect_language(code_elem, code)})
+
+    patterns = []
+    for elem in main.find_all(['p', 'div']):
+        text = elem.get_text().lower()
+        if any(word in text for word in ['example:', 'pattern:', 'usage:', 'typical use']):
+            next_code = elem.find_next(['pre', 'code'])
+            if next_code:
+                patterns.append({'description': converter.clean_text(elem.get_text()),
+                                 'code': next_code.get_text().strip()})
+    page['patterns'] = patterns[:5]
+
+    paragraphs = []
+    for p in main.find_all('p'):
+        text = converter.clean_text(p.get_text())
+        if text and len(text) > 20:
+            paragraphs.append(text)
+    page['content'] = '\n\n'.join(paragraphs)
+
+    for link in soup.find_all('a', href=True):
+        href = urljoin(url, link['href']).split('#')[0]
+        if converter.is_valid_url(href) and href not in page['links']:
+            page['links'].append(href)
+
+    return page
+
+
+def bench_extract(args):
+    """CPU per page for extract_content vs the legacy multi-pass version"""
+    if args.fixtures:
+        fixtures = load_fixtures(args)
+    else:
+        site = MockDocSite(pages=args.pages, fanout=args.fanout, sections=args.sections, nesting=args.nesting)
+        fixtures = [(args.base_url + f"page{i}.html", site.render(i).encode('utf-8')) for i in range(args.pages)]
+
+    converter = DocToSkillConverter(make_config(args.base_url), dry_run=True)
+    soups = [(url, BeautifulSoup(html, 'html.parser')) for url, html in fixtures]
+    size_kb = sum(len(html) for _, html in fixtures) / len(fixtures) / 1024
+
+    results = {'pages': len(fixtures), 'avg_page_kb': round(size_kb, 1)}
+    mismatches = 0
+    for name, extract in (('legacy', lambda soup, url: legacy_extract_content(converter, soup, url)),
+                          ('single_pass', converter.extract_content)):
+        start = time.process_time()
+        pages = [extract(soup, url) for url, soup in soups]
+        elapsed = time.process_time() - start
+        results[name] = {'cpu_ms_per_page': round(elapsed / len(soups) * 1000, 3)}
+        if name == 'legacy':
+            expected = pages
+        else:
+            mismatches = sum(1 for a, b in zip(expected, pages) if a != b)
+
+    results['identical'] = mismatches == 0
+    results['speedup'] = round(results['legacy']['cpu_ms_per_page'] / results['single_pass']['cpu_ms_per_page'], 2)
+
+    print(f"\nextract_content over {len(fixtures)} pages (~{size_kb:.0f} KB each, parse time excluded):")
+    print(f"  legacy       {results['legacy']['cpu_ms_per_page']:>9.3f} ms/page")
+    print(f"  single pass  {results['single_pass']['cpu_ms_per_page']:>9.3f} ms/page  ({results['speedup']}x)")
+    print(f"  {'✅ identical output' if not mismatches else f'❌ {mismatches} pages differ'}")
+    if mismatches:
+        args.failed = True
+    return results
+
+
+def run_crawl(config):
+    """Run scrape_all quietly in ./output; returns (converter, seconds)"""
+    shutil.rmtree('output', ignore_errors=True)
+    converter = DocToSkillConverter(config)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        converter.scrape_all()
+    return converter, time.perf_counter() - start
+
+
+PRIORITY_WEIGHTS = {'/api/': 10, '/blog/': -10, '/changelog/': -10}
+
+
+def bench_priority(args):
+    """Share of /api/ pages fetched under max_pages: BFS vs the priority frontier"""
+    site = SectionedDocSite(pages=args.pages, fanout=args.fanout)
+    server = start_server(site)
+    results = {'pages': args.pages, 'max_pages': args.max_pages}
+
+    print(f"\nFirst {args.max_pages} of {args.pages} pages, weights {PRIORITY_WEIGHTS}:")
+    for name, priority in (('bfs', {}), ('priority', {'enabled': True, 'url_weights': PRIORITY_WEIGHTS})):
+        config = make_config(server.base_url, max_pages=args.max_pages, priority=priority)
+        converter, elapsed = run_crawl(config)
+        api = sum('/api/' in page['url'] for page in converter.pages)
+        results[name] = {
+            'api_share': round(api / len(converter.pages), 3),
+            'seconds': round(elapsed, 2)
+        }
+        print(f"  {name:<9} {api:>5} /api/ pages of {len(converter.pages)} "
+              f"({results[name]['api_share']:.0%})  {elapsed:.2f}s")
+    if results['priority']['api_share'] <= results['bfs']['api_share']:
+        print("  ❌ priority frontier did not fetch more /api/ pages than BFS")
+        args.failed = True
+
+    # Checkpoint round trip: a resumed crawl must continue in the same order
+    print("\nResume after a checkpoint:")
+    checkpoint = {'enabled': True, 'interval': args.max_pages // 2}
+    for label, interval in (('snapshot', args.max_pages // 2), ('journal only', 10 ** 9)):
+        config = make_config(server.base_url, max_pages=args.max_pages,
+                             priority={'enabled': True, 'url_weights': PRIORITY_WEIGHTS},
+                             checkpoint=dict(checkpoint, interval=interval))
+        converter, _ = run_crawl(config)
+        converter._close_journal()
+        with contextlib.redirect_stdout(io.StringIO()):
+            resumed = DocToSkillConverter(config, resume=True)
+        same_set = set(resumed.pending_urls) == set(converter.pending_urls)
+        same_order = list(resumed.pending_urls)[:100] == list(converter.pending_urls)[:100]
+        results[f"resume_{label.replace(' ', '_')}"] = {'same_urls': same_set, 'same_top_100': same_order}
+        print(f"  {label:<13} pending URLs {'match' if same_set else 'DIFFER'}, "
+              f"next 100 in {'the same' if same_order else 'a different'} order")
+        if not same_set or (label == 'snapshot' and not same_order):
+            print(f"  ❌ resumed frontier differs ({label})")
+            args.failed = True
+    server.shutdown()
+    return results
+
+
+def bench_pipeline(args):
+    """Crawl throughput with parsing inline vs on N parser processes"""
+    site = MockDocSite(pages=args.pages, fanout=10, sections=args.sections, nesting=args.nesting)
+    server = start_server(site)
+    results = {'pages': args.pages, 'cpus': os.cpu_count()}
+
+    print(f"\nCrawl of {args.pages} large pages, {args.concurrency} fetchers, {os.cpu_count()} CPUs:")
+    for workers in [0] + args.workers:
+        config = make_config(server.base_url, concurrency=args.concurrency, parser_workers=workers)
+        converter, elapsed = run_crawl(config)
+        rate = converter.pages_scraped / elapsed
+        label = 'inline' if workers == 0 else f"{workers} workers"
+        results[label] = {'pages_per_sec': round(rate, 1), 'seconds': round(elapsed, 2)}
+        print(f"  {label:<12} {rate:>8.1f} pages/sec  ({elapsed:.2f}s)")
+
+    server.shutdown()
+    return results
+
+
+def git_commit():
+    """Short hash of the checked-out commit, or None outside a git tree"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).resolve().parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _crawl_phase(phase, config, queue):
+    """Child process: run scrape_all or build_skill quietly and report its cost"""
+    converter = DocToSkillConverter(config)
+    before = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if phase == 'scrape':
+            converter.scrape_all()
+        else:
+            converter.build_skill()
+    elapsed = time.perf_counter() - start
+    after = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+
+    # CPU of this process's threads plus any parser processes
+    cpu = sum(a.ru_utime + a.ru_stime - b.ru_utime - b.ru_stime for a, b in zip(after, before))
+    peak = max(after[0].ru_maxrss, after[1].ru_maxrss)
+    peak_mb = peak / 2**20 if sys.platform == 'darwin' else peak / 1024  # bytes on macOS, KB elsewhere
+    pages = converter.pages_scraped if phase == 'scrape' else len(converter.store)
+    result = {
+        'pages': pages,
+        'seconds': round(elapsed, 2),
+        'pages_per_second': round(pages / elapsed, 1) if elapsed else 0,
+        'cpu_seconds': round(cpu, 2),
+        'peak_rss_mb': round(peak_mb, 1)
+    }
+    if phase == 'scrape':
+        result['duplicates'] = converter.pages_duplicate
+    queue.put(result)
+
+
+def run_phase(phase, config):
+    """Run one phase in a fresh process, so CPU and peak RSS are its own"""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_crawl_phase, args=(phase, config, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+CRAWL_METRICS = ('seconds', 'pages_per_second', 'cpu_seconds', 'peak_rss_mb')
+HIGHER_IS_BETTER = ('pages_per_second',)
+
+
+def compare_crawl(baseline, results, tolerance, min_seconds=1.0):
+    """Print metric changes against a baseline; returns the number of regressions
+
+    Timing metrics of phases shorter than `min_seconds` are shown but never
+    counted: at that length scheduler noise exceeds any tolerance.
+    """
+    print(f"\nCompared with baseline (commit {baseline.get('commit') or 'unknown'}), tolerance {tolerance:.0%}:")
+    if baseline.get('site') != results['site']:
+        print("  ⚠️  Site settings differ from the baseline, numbers may not be comparable")
+    regressions = 0
+    for phase in ('scrape', 'build'):
+        for metric in CRAWL_METRICS:
+            old = baseline.get(phase, {}).get(metric)
+            new = results[phase][metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            noisy = metric != 'peak_rss_mb' and max(baseline[phase]['seconds'], results[phase]['seconds']) < min_seconds
+            regressed = worse > tolerance and not noisy
+            mark = '❌' if regressed else '  '
+            regressions += regressed
+            print(f"  {mark} {phase:<7} {metric:<17} {old:>9} -> {new:>9}  ({change:+.1%})")
+    return regressions
+
+
+def bench_crawl(args):
+    """End to end: scrape_all then build_skill against a synthetic site"""
+    site = MockDocSite(pages=args.pages, fanout=args.fanout, sections=args.sections,
+                       code_blocks=args.code_blocks, duplicates=args.duplicates, prose=args.prose)
+    server = start_server(site, latency=args.latency, throttle_every=args.throttle_every,
+                          retry_after=args.retry_after)
+    config = make_config(server.base_url, concurrency=args.concurrency, parser_workers=args.parser_workers,
+                         rate_limit=args.rate_limit)
+    results = {
+        'commit': git_commit(),
+        'cpus': os.cpu_count(),
+        'site': {key: getattr(args, key) for key in ('pages', 'fanout', 'sections', 'code_blocks', 'prose', 'duplicates',
+                                                   'latency', 'throttle_every', 'concurrency',
+                                                   'parser_workers', 'rate_limit')}
+    }
+
+    print(f"\nCrawl + build of {args.pages} pages ({args.duplicates:.0%} duplicated, "
+          f"{args.latency * 1000:.0f} ms latency, 429 every {args.throttle_every or '-'} requests, "
+          f"{args.concurrency} fetchers):")
+    shutil.rmtree('output', ignore_errors=True)
+    for phase in ('scrape', 'build'):
+        results[phase] = run_phase(phase, config)
+        r = results[phase]
+        print(f"  {phase:<7} {r['pages']:>6} pages  {r['seconds']:>7.2f}s  {r['pages_per_second']:>7.1f} pages/s"
+              f"  CPU {r['cpu_seconds']:>6.2f}s  peak RSS {r['peak_rss_mb']:>6.1f} MB")
+    results['server'] = {'requests': server.requests, 'throttled': server.throttled,
+                         'connections': server.connections}
+    server.shutdown()
+
+    if not results['build']['pages']:
+        print("  ❌ no pages reached the page store")
+        args.failed = True
+    print(f"  {results['scrape']['duplicates']} duplicate pages, {server.requests} requests "
+          f"({server.throttled} answered 429)")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['crawl']
+        if compare_crawl(baseline, results, args.tolerance, args.min_seconds):
+            args.failed = True
+    return results
+
+
+def synthetic_page(i, base_url='https://docs.example.com/docs/'):
+    """Page dict shaped like extract_content() output (~4 KB)"""
+    section = ['api', 'guide', 'tutorial', 'reference', 'blog'][i % 5]
+    return {
+        'url': f"{base_url}{section}/page{i}.html",
+        'title': f"{section.title()} page {i}",
+        'content': '\n\n'.join(f"Paragraph {p} of page {i} in the {section} section, describing "
+                                f"how the documented feature behaves in detail." for p in range(25)),
+        'headings': [{'level': f"h{2 + h % 3}", 'text': f"Heading {h}", 'id': f"h{h}"} for h in range(8)],
+        'code_samples': [{'code': f"from docs import {section}\n{section}.run({i}, {c})", 'language': 'python'}
+                         for c in range(4)],
+        'patterns': [{'description': f"Example: page {i}", 'code': f"{section}.run({i})"}],
+        'links': [f"{base_url}{section}/page{(i + j) % 1000}.html" for j in range(20)]
+    }
+
+
+def categorization_fixture(categories, keywords_per_category, seed=0):
+    """Category defs plus a page factory that mentions their keywords"""
+    rng = random.Random(seed)
+    # Fixed-width keywords, so no keyword is a substring of another
+    vocabulary = [f"topic{k:05d}x" for k in range(categories * keywords_per_category)]
+    category_defs = {f"cat{c}": vocabulary[c * keywords_per_category:(c + 1) * keywords_per_category]
+                     for c in range(categories)}
+    filler = ['install', 'config', 'render', 'state', 'events', 'routing', 'testing', 'deploy']
+
+    def page(i):
+        words = rng.sample(filler, 4) + [rng.choice(vocabulary) for _ in range(2)]
+        rng.shuffle(words)
+        return {
+            'url': f"https://docs.example.com/docs/{rng.choice(filler)}/{rng.choice(vocabulary)}-{i}.html",
+            'title': f"{rng.choice(vocabulary).title()} and {rng.choice(filler)}",
+            'content': ' '.join(words * 15)
+        }
+    return category_defs, page
+
+
+def bench_categorize(args):
+    """Time categorization: per-keyword loops vs CategoryMatcher"""
+    category_defs, make_page = categorization_fixture(args.categories, args.keywords)
+    converter = DocToSkillConverter(make_config('https://docs.example.com/docs/'), dry_run=True)
+    backend = 'pyahocorasick' if AHOCORASICK_AVAILABLE else 'pure Python'
+    results = {}
+    print(f"\nCategorization ({args.categories} categories x {args.keywords} keywords, Aho-Corasick: {backend}):")
+    for size in args.sizes:
+        pages = [make_page(i) for i in range(size)]
+        result = {}
+
+        start = time.perf_counter()
+        matcher = CategoryMatcher(category_defs)
+        assigned = [matcher.categorize(page) for page in pages]
+        result['matcher_seconds'] = round(time.perf_counter() - start, 3)
+        line = f"  {size:>7,} pages  CategoryMatcher {result['matcher_seconds']:>7.2f}s"
+
+        if not args.skip_legacy:
+            start = time.perf_counter()
+            legacy = [converter.categorize_page(page, category_defs) for page in pages]
+            result['loop_seconds'] = round(time.perf_counter() - start, 3)
+            line += f"   keyword loops {result['loop_seconds']:>7.2f}s"
+            if legacy != assigned:
+                mismatches = sum(a != b for a, b in zip(legacy, assigned))
+                print(f"  ❌ {mismatches} pages categorized differently")
+                args.failed = True
+
+        results[str(size)] = result
+        print(line)
+    return results
+
+
+def clustering_fixture(topics, seed=0):
+    """Page factory for a site with flat URLs; returns (topic, page) pairs"""
+    rng = random.Random(seed)
+    vocabularies = [[f"term{t:03d}{chr(97 + j)}" for j in range(8)] for t in range(topics)]
+    common = ['guide', 'overview', 'introduction', 'reference', 'example', 'advanced']
+
+    def page(i):
+        topic = rng.randrange(topics)
+        words = vocabularies[topic]
+        return topic, {
+            'url': f"https://docs.example.com/docs/page-{i}.html",
+            'title': f"{rng.choice(words).title()} {rng.choice(common)} - Example Docs",
+            'headings': [{'level': 'h2', 'text': ' '.join(rng.sample(words, 2) + [rng.choice(common)])}
+                         for _ in range(6)],
+            'content': ''
+        }
+    return page
+
+
+def cluster_purity(topics, assigned):
+    """Share of pages whose cluster's majority topic is their own"""
+    counts = {}
+    for topic, cat in zip(topics, assigned):
+        counts.setdefault(cat, {}).setdefault(topic, 0)
+        counts[cat][topic] += 1
+    return sum(max(c.values()) for c in counts.values()) / len(assigned)
+
+
+def bench_cluster(args):
+    """Clustering time, quality and peak memory on flat-URL sites"""
+    if not NUMPY_AVAILABLE:
+        print("\nClustering needs numpy (pip install numpy)")
+        return {}
+
+    make_page = clustering_fixture(args.topics)
+    converter = DocToSkillConverter(make_config('https://docs.example.com/docs/'), dry_run=True)
+    results = {}
+    print(f"\nClustering ({args.topics} topics into {args.clusters} clusters, flat URLs):")
+    for size in args.sizes:
+        topics, pages = zip(*(make_page(i) for i in range(size)))
+        result = {}
+
+        start = time.perf_counter()
+        clusterer = PageClusterer(clusters=args.clusters).fit(lambda: iter(pages))
+        assigned = [clusterer.categorize(page) for page in pages]
+        result['seconds'] = round(time.perf_counter() - start, 2)
+        result['purity'] = round(cluster_purity(topics, assigned), 3)
+
+        # What infer_categories does with the same URLs
+        matcher = CategoryMatcher(converter.infer_categories(pages))
+        other = sum(matcher.categorize(page) == 'other' for page in pages)
+        result['url_inference_other'] = round(other / size, 3)
+
+        if not args.skip_memory:
+            tracemalloc.start()
+            PageClusterer(clusters=args.clusters).fit(lambda: iter(pages))
+            result['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+            tracemalloc.stop()
+
+        line = (f"  {size:>7,} pages  {result['seconds']:>6.2f}s  purity {result['purity']:.3f}"
+                f"   ('other' with URL inference: {result['url_inference_other']:.0%})")
+        if 'peak_mb' in result:
+            line += f"  peak {result['peak_mb']:.1f} MB"
+        print(line)
+
+        if result['purity'] < args.min_purity:
+            print(f"  ❌ purity below {args.min_purity}")
+            args.failed = True
+        if args.max_peak_mb and result.get('peak_mb', 0) > args.max_peak_mb:
+            print(f"  ❌ clustering peak exceeds {args.max_peak_mb} MB")
+            args.failed = True
+        results[str(size)] = result
+    return results
+
+
+def bench_search(args):
+    """build_skill time with the search index, its size, and query latency"""
+    rng = random.Random(0)
+    results = {}
+    print("\nSearch index (build_skill with vs without, then queries through scripts/search.py):")
+    for size in args.sizes:
+        shutil.rmtree('output', ignore_errors=True)
+        converter = DocToSkillConverter(make_config('https://docs.example.com/docs/'))
+        for i in range(size):
+            converter.store.put(synthetic_page(i))
+        converter.store.close()
+
+        result = {}
+        for enabled in (False, True):
+            converter.search_index_enabled = enabled
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                converter.build_skill()
+            result['build_with_index' if enabled else 'build_seconds'] = round(time.perf_counter() - start, 2)
+
+        index = os.path.join(converter.skill_dir, 'references', 'search.db')
+        result['index_mb'] = round(os.path.getsize(index) / 2**20, 2)
+        search = runpy.run_path(os.path.join(converter.skill_dir, 'scripts', 'search.py'))['search']
+        sections = ['api', 'guide', 'tutorial', 'reference', 'blog']
+        timings = []
+        for _ in range(args.queries):
+            section, page = rng.choice(sections), rng.randrange(size)
+            query = f"{section} page {page}"
+            start = time.perf_counter()
+            hits = search(query, k=5, index=index)
+            timings.append((time.perf_counter() - start) * 1000)
+            if not hits:
+                print(f"  ❌ no results for {query!r}")
+                args.failed = True
+            elif page % 5 == sections.index(section) and hits[0]['title'] != f"{section.title()} page {page}":
+                print(f"  ❌ {query!r} ranks {hits[0]['title']!r} first")
+                args.failed = True
+        timings.sort()
+        result['query_p50_ms'] = round(timings[len(timings) // 2], 2)
+        result['query_p95_ms'] = round(timings[int(len(timings) * 0.95)], 2)
+        results[str(size)] = result
+
+        print(f"  {size:>7,} pages  build {result['build_seconds']:>6.2f}s -> {result['build_with_index']:>6.2f}s"
+              f"   index {result['index_mb']:>6.2f} MB   query p50 {result['query_p50_ms']:.1f} ms"
+              f"  p95 {result['query_p95_ms']:.1f} ms")
+        if args.max_query_ms and result['query_p95_ms'] > args.max_query_ms:
+            print(f"  ❌ p95 query time exceeds {args.max_query_ms} ms")
+            args.failed = True
+    return results
+
+
+def bench_memory(args):
+    """Peak Python memory of build_skill as the page count grows"""
+    results = {}
+    print("\nPeak traced memory while building a skill:")
+    for size in args.sizes:
+        shutil.rmtree('output', ignore_errors=True)
+        config = make_config('https://docs.example.com/docs/')
+        converter = DocToSkillConverter(config)
+        for i in range(size):
+            converter.store.put(synthetic_page(i))
+        converter.store.close()
+
+        result = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Streaming build
+            tracemalloc.start()
+            start = time.perf_counter()
+            converter.build_skill()
+            elapsed = time.perf_counter() - start
+            result['build_skill'] = {'peak_mb': round(tracemalloc.get_traced_memory()[1] / 2**20, 1),
+                                     'seconds': round(elapsed, 2)}
+            tracemalloc.stop()
+
+            if not args.skip_legacy:
+                # What the build used to do first: every page in one list
+                tracemalloc.start()
+                converter.smart_categorize(converter.load_scraped_data())
+                result['load_all'] = {'peak_mb': round(tracemalloc.get_traced_memory()[1] / 2**20, 1)}
+                tracemalloc.stop()
+
+        results[str(size)] = result
+        line = f"  {size:>7,} pages  build_skill {result['build_skill']['peak_mb']:>7.1f} MB"
+        if 'load_all' in result:
+            line += f"   load all pages {result['load_all']['peak_mb']:>8.1f} MB"
+        print(line)
+
+        if args.max_peak_mb and result['build_skill']['peak_mb'] > args.max_peak_mb:
+            print(f"  ❌ build_skill peak exceeds {args.max_peak_mb} MB")
+            args.failed = True
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark doc_scraper.py against a local mock site')
+    parser.add_argument('--json', type=str, help='Write results to this JSON file')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    connections = subparsers.add_parser('connections', help='Count connections opened per N pages')
+    connections.add_argument('--pages', type=int, default=100)
+    connections.set_defaults(func=bench_connections)
+
+    frontier = subparsers.add_parser('frontier', help='Frontier membership micro-benchmark')
+    frontier.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    frontier.add_argument('--lookups', type=int, default=200)
+    frontier.set_defaults(func=bench_frontier)
+
+    urlfilter = subparsers.add_parser('urlfilter', help='is_valid_url cost with many exclude patterns')
+    urlfilter.add_argument('--excludes', type=int, nargs='+', default=[10, 100, 500])
+    urlfilter.add_argument('--urls', type=int, default=20000)
+    urlfilter.set_defaults(func=bench_urlfilter)
+
+    parity = subparsers.add_parser('parity', help='Compare page dicts across parser backends')
+    parity.add_argument('--fixtures', type=str, help='Directory of saved .html pages (default: synthetic pages)')
+    parity.add_argument('--base-url', type=str, default='https://docs.example.com/docs/',
+                        help='URL the fixtures were saved from')
+    parity.add_argument('--pages', type=int, default=50, help='Synthetic pages when no fixtures are given')
+    parity.set_defaults(func=bench_parity)
+
+    extract = subparsers.add_parser('extract', help='CPU per page for content extraction on large pages')
+    extract.add_argument('--fixtures', type=str, help='Directory of saved .html pages (default: synthetic pages)')
+    extract.add_argument('--base-url', type=str, default='https://docs.example.com/docs/')
+    extract.add_argument('--pages', type=int, default=20)
+    extract.add_argument('--fanout', type=int, default=200, help='Sidebar links per page')
+    extract.add_argument('--sections', type=int, default=200, help='Sections per page')
+    extract.add_argument('--nesting', type=int, default=6, help='Nested <div> levels around each section')
+    extract.set_defaults(func=bench_extract)
+
+    pipeline = subparsers.add_parser('pipeline', help='Pages/sec with 1, 4 and 16 parser processes')
+    pipeline.add_argument('--pages', type=int, default=300)
+    pipeline.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    pipeline.add_argument('--concurrency', type=int, default=8, help='Fetch threads')
+    pipeline.add_argument('--sections', type=int, default=60, help='Sections per page')
+    pipeline.add_argument('--nesting', type=int, default=3)
+    pipeline.set_defaults(func=bench_pipeline)
+
+    priority = subparsers.add_parser('priority', help='Pages fetched under max_pages: BFS vs priority frontier')
+    priority.add_argument('--pages', type=int, default=4000)
+    priority.add_argument('--max-pages', type=int, default=400)
+    priority.add_argument('--fanout', type=int, default=10)
+    priority.set_defaults(func=bench_priority)
+
+    crawl = subparsers.add_parser('crawl', help='End-to-end scrape_all + build_skill: throughput, CPU, peak RSS')
+    crawl.add_argument('--pages', type=int, default=2000)
+    crawl.add_argument('--fanout', type=int, default=10, help='Links per page')
+    crawl.add_argument('--sections', type=int, default=3, help='Sections per page')
+    crawl.add_argument('--code-blocks', type=int, default=2, help='Code blocks per section')
+    crawl.add_argument('--prose', type=int, default=80, help='Random words per section')
+    crawl.add_argument('--duplicates', type=float, default=0.1,
+                       help='Fraction of pages also served under a versioned URL')
+    crawl.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    crawl.add_argument('--throttle-every', type=int, default=0, help='Answer every Nth request with 429')
+    crawl.add_argument('--retry-after', type=int, default=0, help='Retry-After seconds on 429 responses')
+    crawl.add_argument('--concurrency', type=int, default=8)
+    crawl.add_argument('--parser-workers', type=int, default=0)
+    crawl.add_argument('--rate-limit', type=float, default=0, help='Scraper rate_limit (0 disables the limiter)')
+    crawl.add_argument('--compare', type=str, help='Baseline JSON written earlier with --json')
+    crawl.add_argument('--tolerance', type=float, default=0.15, help='Allowed regression per metric (default 15%%)')
+    crawl.add_argument('--min-seconds', type=float, default=1.0,
+                       help='Phases shorter than this are too noisy to fail on timing')
+    crawl.set_defaults(func=bench_crawl)
+
+    categorize = subparsers.add_parser('categorize', help='Categorization time at 1k/10k/100k pages')
+    categorize.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    categorize.add_argument('--categories', type=int, default=300)
+    categorize.add_argument('--keywords', type=int, default=3, help='Keywords per category')
+    categorize.add_argument('--skip-legacy', action='store_true', help='Skip the per-keyword loop comparison')
+    categorize.set_defaults(func=bench_categorize)
+
+    cluster = subparsers.add_parser('cluster', help='Category clustering time, purity and memory at 10k/100k pages')
+    cluster.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    cluster.add_argument('--topics', type=int, default=12)
+    cluster.add_argument('--clusters', type=int, default=12)
+    cluster.add_argument('--min-purity', type=float, default=0.9, help='Fail below this cluster purity')
+    cluster.add_argument('--max-peak-mb', type=float, help='Fail if clustering peaks above this')
+    cluster.add_argument('--skip-memory', action='store_true', help='Skip the traced-memory run')
+    cluster.set_defaults(func=bench_cluster)
+
+    search = subparsers.add_parser('search', help='Search index build cost, size and query latency')
+    search.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 30000])
+    search.add_argument('--queries', type=int, default=200)
+    search.add_argument('--max-query-ms', type=float, help='Fail if p95 query time is above this')
+    search.set_defaults(func=bench_search)
+
+    memory = subparsers.add_parser('memory', help='Peak memory of build_skill at growing page counts')
+    memory.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 30000])
+    memory.add_argument('--max-peak-mb', type=float, help='Fail if build_skill peaks above this')
+    memory.add_argument('--skip-legacy', action='store_true', help='Skip the load-everything comparison')
+    memory.set_defaults(func=bench_memory)
+
+    args = parser.parse_args()
+    args.failed = False
+    # Input paths are relative to the caller's directory, not the workdir below
+    for name in ('compare', 'fixtures'):
+        if getattr(args, name, None):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    # Converters write to ./output, keep that out of the caller's tree
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            results = args.func(args)
+        finally:
+            os.chdir(cwd)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({args.command: results}, f, indent=2)
+        print(f"\n💾 Results saved to {args.json}")
+
+    if args.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import contextlib
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'bin'))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory, since the converter writes to ./output"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def make_config(**overrides):
+    """Minimal scraper config for tests that never touch the network"""
+    config = {
+        'name': 'test',
+        'base_url': 'https://docs.example.com/docs/',
+        'selectors': {'main_content': 'article', 'title': 'h1', 'code_blocks': 'pre code'},
+        'rate_limit': 0
+    }
+    config.update(overrides)
+    return config
+
+
+def make_page(i, section='guide', paragraphs=10, base_url='https://docs.example.com/docs/'):
+    """Page dict shaped like extract_content() output"""
+    return {
+        'url': f"{base_url}{section}/page{i}.html",
+        'title': f"{section.title()} page {i}",
+        'content': '\n\n'.join(f"Paragraph {p} of page {i} in the {section} section." for p in range(paragraphs)),
+        'headings': [{'level': 'h2', 'text': f"Heading {h}", 'id': f"h{h}"} for h in range(3)],
+        'code_samples': [{'code': f"{section}.run({i})", 'language': 'python'}],
+        'patterns': [],
+        'links': []
+    }
+
+
+class DocsSiteHandler(BaseHTTPRequestHandler):
+    """Serves /docs/page<i>.html, each linking to the next `fanout` pages"""
+
+    pages = 60
+    fanout = 3
+
+    def do_GET(self):
+        match = re.fullmatch(r'/docs/(?:page(\d+)\.html)?', self.path)
+        i = int(match.group(1) or 0) if match else self.pages
+        if i >= self.pages:
+            self.send_error(404)
+            return
+        links = ''.join(f'<a href="/docs/page{(i + j) % self.pages}.html">next</a>' for j in range(1, self.fanout + 1))
+        body = f"<html><head><title>Page {i}</title></head><body><nav>{links}</nav>{self.article(i)}</body></html>"
+        body = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def article(self, i):
+        section = ['api', 'guide', 'blog'][i % 3]
+        paragraphs = ''.join(f"<p>Paragraph {p} of the {section} page number {i}, with enough words to keep.</p>"
+                             for p in range(5))
+        return (f"<article><h1>{section.title()} page {i}</h1>{paragraphs}"
+                f"<pre><code>{section}.call({i}, 'argument')</code></pre></article>")
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def serve(handler_class):
+    """Run handler_class on a local port; yields the /docs/ base URL"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/docs/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def docs_site():
+    """Base URL of a local 60-page documentation site"""
+    with serve(DocsSiteHandler) as base_url:
+        yield base_url
@@ -0,0 +1,71 @@
+import json
+import sys
+
+import doc_scraper
+from conftest import make_config
+from doc_scraper import BatchScheduler, DocToSkillConverter
+
+
+def site(name, base_url='https://docs.example.com/docs/', **overrides):
+    return make_config(name=name, base_url=base_url, **overrides)
+
+
+def test_sites_on_a_host_share_the_slowest_rate_limiter():
+    batch = BatchScheduler([site('a', rate_limit=0.25), site('b', rate_limit=1.0, rate_limiter={'max_rate': 1}),
+                            site('c', base_url='https://other.example.com/', rate_limit=0.5)])
+    limiter = batch.rate_limiters['docs.example.com']
+    assert limiter.initial_rate == 1.0
+    assert limiter.max_rate == 1.0
+    assert batch.rate_limiters['other.example.com'].initial_rate == 2.0
+
+
+def test_host_without_rate_limits_has_no_limiter():
+    batch = BatchScheduler([site('a', rate_limit=0), site('b', rate_limit=0)])
+    assert batch.rate_limiters == {'docs.example.com': None}
+
+
+def test_converters_use_the_shared_limiter(workdir):
+    batch = BatchScheduler([site('a', rate_limit=0.5), site('b', rate_limit=0.5)])
+    limiter = batch.rate_limiters['docs.example.com']
+    converters = [DocToSkillConverter(config, fetch_slots=batch.fetch_slots, rate_limiter=limiter)
+                  for config in batch.configs]
+    assert all(converter.rate_limiter is limiter for converter in converters)
+    # The first site's robots.txt lookup serves the shared limiter
+    assert limiter._crawl_delay == converters[0]._crawl_delay
+    for converter in converters:
+        converter.store.close()
+
+
+def test_robots_stays_ignored_when_the_shared_config_says_so(workdir):
+    config = site('a', rate_limit=0.5, rate_limiter={'respect_robots': False})
+    limiter = BatchScheduler([config]).rate_limiters['docs.example.com']
+    DocToSkillConverter(config, rate_limiter=limiter).store.close()
+    assert limiter._crawl_delay is None
+
+
+def test_per_host_concurrency_is_the_lowest_any_site_sets():
+    batch = BatchScheduler([site('a', per_host_concurrency=6), site('b', per_host_concurrency=2), site('c')],
+                           per_host=4)
+    assert batch.fetch_slots.host_limits == {'docs.example.com': 2}
+
+
+def test_batch_configs_take_command_line_overrides(tmp_path, monkeypatch):
+    for name in ('a', 'b'):
+        (tmp_path / f'{name}.json').write_text(json.dumps(site(name, sitemap={'max_urls': 10})))
+    seen = []
+
+    class Scheduler(BatchScheduler):
+        def run(self):
+            seen.extend(self.configs)
+            return {}
+
+    monkeypatch.setattr(doc_scraper, 'BatchScheduler', Scheduler)
+    monkeypatch.setattr(sys, 'argv', ['doc_scraper.py', '--batch', str(tmp_path), '--sitemap', '--prioritize',
+                                      '--auto-browser', '--concurrency', '3', '--parser-workers', '2'])
+    doc_scraper.main()
+    assert [config['name'] for config in seen] == ['a', 'b']
+    for config in seen:
+        assert config['sitemap'] == {'max_urls': 10, 'enabled': True}
+        assert config['priority'] == {'enabled': True}
+        assert config['use_browser'] == 'auto'
+        assert (config['concurrency'], config['parser_workers']) == (3, 2)
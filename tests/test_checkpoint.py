@@ -0,0 +1,74 @@
+import contextlib
+import io
+import json
+import os
+
+import pytest
+
+from conftest import make_config
+from doc_scraper import DocToSkillConverter
+
+
+def crawl(config, resume=False):
+    """Run scrape_all() quietly; returns the stored URLs in store order"""
+    converter = DocToSkillConverter(config, resume=resume)
+    with contextlib.redirect_stdout(io.StringIO()):
+        converter.scrape_all()
+    converter.store.close()
+    return converter, converter.store.urls()
+
+
+def site_config(base_url, max_pages, interval=5, **overrides):
+    return make_config(base_url=base_url, max_pages=max_pages, concurrency=1,
+                       selectors={'main_content': 'article', 'title': 'h1', 'code_blocks': 'pre code'},
+                       checkpoint={'enabled': True, 'interval': interval}, **overrides)
+
+
+@pytest.mark.parametrize('overrides', [{}, {'priority': {'enabled': True, 'url_weights': {'re:page[12]': 5}}}],
+                         ids=['bfs', 'priority'])
+@pytest.mark.parametrize('interval', [5, 1000], ids=['snapshot', 'journal-only'])
+def test_resumed_crawl_matches_an_uninterrupted_one(docs_site, workdir, monkeypatch, interval, overrides):
+    (workdir / 'full').mkdir()
+    monkeypatch.chdir(workdir / 'full')
+    _, expected = crawl(site_config(docs_site, 40, interval, **overrides))
+
+    (workdir / 'resumed').mkdir()
+    monkeypatch.chdir(workdir / 'resumed')
+    first, _ = crawl(site_config(docs_site, 17, interval, **overrides))
+    assert os.path.exists(first.journal_file)
+    assert os.path.exists(first.checkpoint_file) == (interval == 5)
+
+    resumed, urls = crawl(site_config(docs_site, 40, interval, **overrides), resume=True)
+    assert urls == expected
+    assert len(resumed.visited_urls) == 40
+
+
+def test_torn_journal_tail_is_ignored(docs_site, workdir):
+    config = site_config(docs_site, 6, interval=1000)
+    first, _ = crawl(config)
+    with open(first.journal_file, 'a', encoding='utf-8') as f:
+        f.write('{"n": 999, "e": "d", "u": "http')
+
+    resumed = DocToSkillConverter(dict(config, max_pages=40), resume=True)
+    assert resumed.visited_urls == first.visited_urls
+    assert resumed._journal_seq == first._journal_seq
+    resumed.store.close()
+
+
+def test_journal_events_older_than_the_snapshot_are_skipped(docs_site, workdir):
+    config = site_config(docs_site, 12, interval=5)
+    first, _ = crawl(config)
+    with open(first.checkpoint_file) as f:
+        snapshot = json.load(f)
+    with open(first.journal_file, encoding='utf-8') as f:
+        events = [json.loads(line) for line in f]
+    assert events and all(event['n'] > snapshot['journal_seq'] for event in events)
+
+    # A journal that was not truncated after the snapshot replays to the same state
+    with open(first.journal_file, 'w', encoding='utf-8') as f:
+        stale = {'n': snapshot['journal_seq'], 'e': 'd', 'u': docs_site + 'page59.html'}
+        f.write(json.dumps(stale) + '\n' + ''.join(json.dumps(event) + '\n' for event in events))
+    resumed = DocToSkillConverter(config, resume=True)
+    assert resumed.visited_urls == first.visited_urls
+    assert list(resumed.pending_urls) == list(first.pending_urls)
+    resumed.store.close()
@@ -0,0 +1,93 @@
+import random
+
+from conftest import make_config
+from doc_scraper import ContentDeduper, DocToSkillConverter
+
+WORDS = ('request response client server config option value default token session cache index '
+         'handler route schema field method param return error retry timeout limit buffer').split()
+
+
+def page(url, seed, words=200):
+    rng = random.Random(seed)
+    return {'url': url, 'title': url, 'content': ' '.join(rng.choice(WORDS) for _ in range(words)),
+            'code_samples': [], 'headings': [], 'patterns': [], 'links': []}
+
+
+def edited(original, url, changes):
+    """Copy of a page with `changes` of its words replaced"""
+    words = original['content'].split()
+    for i in range(changes):
+        words[i * 7] = 'changed'
+    return dict(original, url=url, content=' '.join(words))
+
+
+def test_exact_duplicate_becomes_alias():
+    deduper = ContentDeduper()
+    assert deduper.add('a', page('a', 1)) is None
+    # Same words, different whitespace and case
+    duplicate = page('b', 1)
+    duplicate['content'] = duplicate['content'].upper().replace(' ', '\n ')
+    assert deduper.add('b', duplicate) == 'a'
+    assert deduper.aliases == {'b': 'a'}
+
+
+def test_near_duplicates_are_kept_by_default():
+    deduper = ContentDeduper()
+    original = page('a', 1)
+    deduper.add('a', original)
+    assert deduper.add('b', edited(original, 'b', 2)) is None
+    assert deduper.aliases == {}
+
+
+def test_near_duplicates_opt_in():
+    deduper = ContentDeduper(near_duplicates=True, similarity=0.8)
+    original = page('a', 1)
+    deduper.add('a', original)
+    assert deduper.add('b', edited(original, 'b', 2)) == 'a'
+    assert deduper.add('c', page('c', 2)) is None
+
+
+def test_short_pages_are_never_duplicates():
+    deduper = ContentDeduper(min_words=50)
+    deduper.add('a', page('a', 1, words=20))
+    assert deduper.add('b', page('b', 1, words=20)) is None
+
+
+def test_changed_canonical_releases_its_aliases():
+    deduper = ContentDeduper()
+    deduper.add('a', page('a', 1))
+    deduper.add('b', page('b', 1))
+    deduper.add('c', page('c', 1))
+    deduper.add('a', page('a', 1))  # same content again: aliases stay
+    assert deduper.take_released() == []
+    deduper.add('a', page('a', 2))
+    assert deduper.aliases == {}
+    assert sorted(deduper.take_released()) == ['b', 'c']
+    assert deduper.take_released() == []
+
+
+def test_round_trip_keeps_aliases_releasable():
+    deduper = ContentDeduper()
+    deduper.add('a', page('a', 1))
+    deduper.add('b', page('b', 1))
+    restored = ContentDeduper()
+    restored.load(deduper.to_dict())
+    assert restored.aliases == {'b': 'a'}
+    assert restored.add('c', page('c', 1)) == 'a'
+    restored.add('a', page('a', 3))
+    assert sorted(restored.take_released()) == ['b', 'c']
+
+
+def test_alias_is_fetched_again_when_its_canonical_changes(workdir):
+    converter = DocToSkillConverter(make_config())
+    base = converter.base_url
+    converter.visited_urls.update([base + 'a', base + 'b'])
+    assert converter.save_page(page(base + 'a', 1)) is None
+    assert converter.save_page(page(base + 'b', 1)) == base + 'a'
+    assert base + 'b' not in converter.pending_urls
+
+    assert converter.save_page(page(base + 'a', 2)) is None
+    assert base + 'b' in converter.pending_urls
+    assert base + 'b' not in converter.visited_urls
+    assert converter.aliases == {}
+    converter.store.close()
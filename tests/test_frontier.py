@@ -0,0 +1,86 @@
+from doc_scraper import PriorityFrontier, UrlFrontier
+
+BASE = 'https://docs.example.com/docs/'
+
+
+def drain(frontier):
+    return [frontier.popleft() for _ in range(len(frontier))]
+
+
+def test_url_frontier_is_fifo_without_duplicates():
+    frontier = UrlFrontier([BASE + 'a', BASE + 'b'])
+    assert frontier.append(BASE + 'c')
+    assert not frontier.append(BASE + 'a')
+    assert list(frontier) == [BASE + 'a', BASE + 'b', BASE + 'c']
+    assert frontier.popleft() == BASE + 'a'
+    assert BASE + 'a' not in frontier
+    # Popped URLs may be queued again; the crawler's visited set prevents that
+    assert frontier.append(BASE + 'a')
+    assert drain(frontier) == [BASE + 'b', BASE + 'c', BASE + 'a']
+
+
+def test_url_weights_and_categories_order_the_queue():
+    frontier = PriorityFrontier(url_weights={'/api/': 10, 're:/blog/': -10},
+                                categories={'hooks': ['usestate']})
+    for path in ('blog/post', 'guide/intro', 'api/client', 'guide/usestate'):
+        frontier.append(BASE + path)
+    assert drain(frontier) == [BASE + p for p in ('api/client', 'guide/usestate', 'guide/intro', 'blog/post')]
+
+
+def test_equal_scores_keep_discovery_order():
+    frontier = PriorityFrontier(BASE + f"page{i}" for i in range(50))
+    assert drain(frontier) == [BASE + f"page{i}" for i in range(50)]
+
+
+def test_depth_lowers_and_inlinks_raise_the_score():
+    frontier = PriorityFrontier([BASE])
+    assert frontier.popleft() == BASE
+    frontier.append(BASE + 'a', parent=BASE)
+    frontier.append(BASE + 'a/deep', parent=BASE + 'a')
+    frontier.append(BASE + 'b', parent=BASE)
+    assert frontier.depth(BASE + 'a/deep') == 2
+    # Depth 1 and one inlink: -1 + log2(2)
+    assert frontier.score(BASE + 'a') == frontier.score(BASE + 'b') == 0.0
+
+    # Already queued: counts an inlink and moves b ahead of a
+    assert not frontier.append(BASE + 'b', parent=BASE + 'a')
+    assert frontier.score(BASE + 'b') > frontier.score(BASE + 'a')
+    assert list(frontier) == [BASE + 'b', BASE + 'a', BASE + 'a/deep']
+    assert drain(frontier) == [BASE + 'b', BASE + 'a', BASE + 'a/deep']
+
+
+def test_shorter_path_found_later_raises_the_score():
+    frontier = PriorityFrontier([BASE], depth_weight=1.0, inlink_weight=0)
+    frontier.popleft()
+    frontier.append(BASE + 'a', parent=BASE)
+    frontier.append(BASE + 'b', parent=BASE)
+    frontier.append(BASE + 'c', parent=BASE + 'b')
+    assert frontier.depth(BASE + 'c') == 2
+    frontier.append(BASE + 'c', parent=BASE)
+    assert frontier.depth(BASE + 'c') == 1
+
+
+def test_stale_heap_entries_are_compacted():
+    frontier = PriorityFrontier([BASE])
+    frontier.popleft()
+    frontier.append(BASE + 'hub', parent=BASE)
+    for i in range(3000):
+        frontier.append(BASE + 'hub', parent=BASE + f"page{i}")
+    assert len(frontier) == 1
+    assert len(frontier._heap) <= 2 * len(frontier) + 1025
+    assert frontier.popleft() == BASE + 'hub'
+
+
+def test_state_round_trip_restores_the_order():
+    frontier = PriorityFrontier([BASE], url_weights={'/api/': 3})
+    frontier.popleft()
+    for i in range(20):
+        frontier.append(BASE + ('api/' if i % 4 == 0 else 'guide/') + str(i), parent=BASE)
+    for i in range(0, 20, 3):
+        frontier.append(BASE + ('api/' if i % 4 == 0 else 'guide/') + str(i), parent=BASE + 'other')
+    queued = list(frontier)
+
+    config = {'priority': {'enabled': True, 'url_weights': {'/api/': 3}}}
+    restored = PriorityFrontier.from_config(config, queued, state=frontier.state(queued))
+    assert list(restored) == queued
+    assert drain(restored) == drain(frontier)
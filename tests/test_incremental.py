@@ -0,0 +1,53 @@
+import contextlib
+import io
+
+from conftest import DocsSiteHandler, make_config, serve
+from doc_scraper import DocToSkillConverter
+
+
+def crawl(base_url, max_pages, incremental=False):
+    """Run scrape_all() quietly; returns the converter"""
+    converter = DocToSkillConverter(make_config(base_url=base_url, max_pages=max_pages, concurrency=1),
+                                    incremental=incremental)
+    with contextlib.redirect_stdout(io.StringIO()):
+        converter.scrape_all()
+    converter.store.close()
+    return converter
+
+
+def test_304_to_an_unconditional_request_is_refetched(workdir):
+    class FirstRequestNotModified(DocsSiteHandler):
+        """Answers the first request for each page with 304, like a misbehaving proxy"""
+        seen = set()
+
+        def do_GET(self):
+            if self.path.startswith('/docs/') and self.path not in self.seen:
+                self.seen.add(self.path)
+                self.send_response(304)
+                self.end_headers()
+                return
+            super().do_GET()
+
+    with serve(FirstRequestNotModified) as base_url:
+        converter = crawl(base_url, 10)
+    assert converter.pages_scraped == 10
+    assert len(converter.store.urls()) == 10
+
+
+def test_duplicates_are_skipped_on_incremental_runs(workdir):
+    class RepeatedContent(DocsSiteHandler):
+        """Pages i and i + 10 have the same article"""
+
+        def article(self, i):
+            return super().article(i % 10)
+
+    with serve(RepeatedContent) as base_url:
+        first = crawl(base_url, 30)
+        assert first.pages_duplicate == 20
+        assert set(first.http_cache) == set(first.visited_urls)
+
+        second = crawl(base_url, 30, incremental=True)
+    assert second.pages_unchanged == 30
+    assert second.pages_duplicate == 0
+    assert len(second.pages) == 10
+    assert len(second.store.urls()) == 10
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from conftest import make_config
+from doc_scraper import CategoryMatcher, DocToSkillConverter, SubstringMatcher
+
+
+@pytest.fixture(params=['in-checks', 'automaton'])
+def matcher_class(request, monkeypatch):
+    """SubstringMatcher forced onto the plain `in` path or the pure-Python automaton"""
+    monkeypatch.setattr('doc_scraper.AHOCORASICK_AVAILABLE', False)
+    monkeypatch.setattr(SubstringMatcher, 'SMALL_SET', 10**6 if request.param == 'in-checks' else 0)
+    return SubstringMatcher
+
+
+def test_find_all_reports_overlapping_patterns(matcher_class):
+    matcher = matcher_class(['he', 'she', 'his', 'hers', '', 'she'])
+    assert matcher.find_all('ushers') == {0, 1, 3, 4, 5}
+    assert matcher.find_all('this') == {2, 4}
+    assert matcher.find_all('xyz') == {4}
+
+
+def test_search_agrees_with_substring_checks(matcher_class):
+    rng = random.Random(0)
+    patterns = [''.join(rng.choice('abc') for _ in range(rng.randint(1, 4))) for _ in range(40)]
+    matcher = matcher_class(patterns)
+    for _ in range(200):
+        text = ''.join(rng.choice('abcd') for _ in range(rng.randint(0, 12)))
+        expected = {i for i, pattern in enumerate(patterns) if pattern in text}
+        assert matcher.find_all(text) == expected
+        assert matcher.search(text) == bool(expected)
+
+
+def test_empty_pattern_matches_everything(matcher_class):
+    # Same as '' in text
+    assert matcher_class(['']).search('anything')
+    assert matcher_class(['']).search('')
+    assert matcher_class(['x', '']).find_all('abc') == {1}
+
+
+def test_empty_pattern_list_never_matches(matcher_class):
+    assert not matcher_class([]).search('anything')
+    assert matcher_class([]).find_all('anything') == set()
+
+
+@pytest.mark.parametrize('loop_keywords', [10**6, 0], ids=['keyword-loop', 'one-matcher'])
+def test_category_matcher_agrees_with_categorize_page(loop_keywords, monkeypatch):
+    monkeypatch.setattr('doc_scraper.AHOCORASICK_AVAILABLE', False)
+    monkeypatch.setattr(CategoryMatcher, 'LOOP_KEYWORDS', loop_keywords)
+    converter = DocToSkillConverter(make_config(), dry_run=True)
+    category_defs = {'api': ['api', 'Reference'], 'guide': ['guide', 'tutorial'], 'hooks': ['use', 'hook'],
+                     'rest': ['']}
+    matcher = CategoryMatcher(category_defs)
+    assert (matcher._loop is not None) == bool(loop_keywords)
+    rng = random.Random(0)
+    words = ['api', 'reference', 'guide', 'tutorial', 'usestate', 'hook', 'intro', 'misc']
+    for i in range(300):
+        page = {'url': f"https://docs.example.com/{rng.choice(words)}/{i}",
+                'title': ' '.join(rng.sample(words, 2)).title(),
+                'content': ' '.join(rng.choice(words) for _ in range(rng.randint(0, 40)))}
+        assert matcher.categorize(page) == converter.categorize_page(page, category_defs)
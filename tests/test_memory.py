@@ -0,0 +1,44 @@
+"""build_skill streams pages: its peak memory must not grow with the page count"""
+
+import contextlib
+import io
+import shutil
+import tracemalloc
+
+from conftest import make_config, make_page
+from doc_scraper import DocToSkillConverter
+
+SECTIONS = ['api', 'guide', 'tutorial', 'reference', 'blog']
+MAX_PEAK_MB = 8
+
+
+def peak_mb(run):
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def stored_converter(pages):
+    shutil.rmtree('output', ignore_errors=True)
+    converter = DocToSkillConverter(make_config())
+    for i in range(pages):
+        converter.store.put(make_page(i, SECTIONS[i % len(SECTIONS)], paragraphs=25))
+    converter.store.close()
+    return converter
+
+
+def test_build_skill_peak_memory_is_bounded(workdir):
+    with contextlib.redirect_stdout(io.StringIO()):
+        converter = stored_converter(2000)
+        small = peak_mb(converter.build_skill)
+        load_all = peak_mb(converter.load_scraped_data)
+        large = peak_mb(stored_converter(8000).build_skill)
+
+    assert large < MAX_PEAK_MB
+    # 4x the pages, about the same peak
+    assert large < small * 1.25 + 0.5
+    # Holding even the smaller crawl's pages takes several times more
+    assert load_all > 3 * large
@@ -0,0 +1,71 @@
+import os
+
+from doc_scraper import PageStore
+
+
+def page(i, text='content'):
+    return {'url': f"https://docs.example.com/docs/page{i}", 'title': f"Page {i}", 'content': f"{text} {i} ✓"}
+
+
+def test_put_get_and_iterate_in_insertion_order(tmp_path):
+    store = PageStore(tmp_path / 'store')
+    for i in range(5):
+        store.put(page(i))
+    assert store.get(page(3)['url']) == page(3)
+    assert store.get('https://docs.example.com/missing') is None
+    assert page(2)['url'] in store
+    assert len(store) == 5
+    assert [p['url'] for p in store] == [page(i)['url'] for i in range(5)]
+    store.close()
+
+
+def test_last_write_wins_and_survives_reopening(tmp_path):
+    store = PageStore(tmp_path / 'store')
+    store.put(page(1))
+    store.put(page(2))
+    store.put(page(1, 'updated'))
+    store.close()
+
+    reopened = PageStore(tmp_path / 'store')
+    assert len(reopened) == 2
+    assert reopened.get(page(1)['url']) == page(1, 'updated')
+    # A rewritten page keeps its first position
+    assert reopened.urls() == [page(1)['url'], page(2)['url']]
+
+
+def test_segments_roll_over(tmp_path):
+    store = PageStore(tmp_path / 'store', segment_bytes=200)
+    for i in range(6):
+        store.put(page(i))
+    store.close()
+    segments = [name for name in os.listdir(tmp_path / 'store') if name.startswith('pages-')]
+    assert len(segments) > 1
+    assert [p['title'] for p in PageStore(tmp_path / 'store')] == [f"Page {i}" for i in range(6)]
+
+
+def test_records_lost_in_a_crash_are_skipped(tmp_path):
+    store = PageStore(tmp_path / 'store')
+    store.put(page(1))
+    store.put(page(2))
+    store.close()
+    # Index line written, record truncated; then a torn index line
+    segment = tmp_path / 'store' / 'pages-00000.jsonl'
+    os.truncate(segment, os.path.getsize(segment) - 5)
+    with open(tmp_path / 'store' / 'index.jsonl', 'a') as f:
+        f.write('["abc", 0, ')
+    assert PageStore(tmp_path / 'store').urls() == [page(1)['url']]
+
+
+def test_compact_drops_superseded_records(tmp_path):
+    store = PageStore(tmp_path / 'store')
+    for version in range(4):
+        for i in range(3):
+            store.put(page(i, f"version {version}"))
+    assert not store.compact(min_stale_ratio=0.9)
+    size = os.path.getsize(tmp_path / 'store' / 'pages-00000.jsonl')
+    assert store.compact()
+    assert os.path.getsize(tmp_path / 'store' / 'pages-00000.jsonl') < size / 3
+    assert [p['content'] for p in store] == [f"version 3 {i} ✓" for i in range(3)]
+    store.put(page(9))
+    store.close()
+    assert len(PageStore(tmp_path / 'store')) == 4
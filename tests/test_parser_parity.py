@@ -0,0 +1,48 @@
+"""Every parser backend must extract the same page dict from saved pages"""
+
+from pathlib import Path
+
+import pytest
+
+from conftest import make_config
+from doc_scraper import DocToSkillConverter, PARSER_BACKENDS
+
+FIXTURES = sorted((Path(__file__).parent / 'fixtures').glob('*.html'))
+BASE_URL = 'https://docs.example.com/docs/'
+# Unclosed <p>/<li> tags: html.parser nests them, the HTML5 parsers close them
+HTML5_ONLY = {'legacy.html'}
+
+
+def converter(backend):
+    config = make_config(parser=backend,
+                         selectors={'main_content': 'div[role="main"]', 'title': 'title',
+                                    'code_blocks': 'pre code'})
+    converter = DocToSkillConverter(config, dry_run=True)
+    if converter.parser_backend != backend:
+        pytest.skip(f"{backend} not installed")
+    return converter
+
+
+def parse(backend, path):
+    return converter(backend).parse_html(path.read_bytes(), BASE_URL + path.name)
+
+
+@pytest.mark.parametrize('path', FIXTURES, ids=lambda path: path.name)
+def test_fixture_extracts_content(path):
+    page = parse('html.parser', path)
+    assert page['title']
+    assert page['content']
+    assert page['headings']
+    assert page['code_samples']
+    assert page['links']
+
+
+@pytest.mark.parametrize('backend', [b for b in PARSER_BACKENDS if b != 'html.parser'])
+@pytest.mark.parametrize('path', [p for p in FIXTURES if p.name not in HTML5_ONLY], ids=lambda path: path.name)
+def test_backend_matches_html_parser(backend, path):
+    assert parse(backend, path) == parse('html.parser', path)
+
+
+@pytest.mark.parametrize('path', [p for p in FIXTURES if p.name in HTML5_ONLY], ids=lambda path: path.name)
+def test_html5_backends_agree_on_malformed_markup(path):
+    assert parse('selectolax', path) == parse('lxml', path)
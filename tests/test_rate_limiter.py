@@ -0,0 +1,74 @@
+import time
+
+from doc_scraper import HostRateLimiter
+
+ORIGIN = 'https://docs.example.com'
+
+
+def test_rate_limit_is_the_default_ceiling():
+    limiter = HostRateLimiter.from_config({'rate_limit': 0.5})
+    for _ in range(50):
+        limiter.record(ORIGIN, status=200, latency=0.01)
+    assert limiter.stats()[ORIGIN]['rate'] == 2.0
+
+
+def test_max_rate_opts_into_ramp_up():
+    limiter = HostRateLimiter.from_config({'rate_limit': 0.5, 'rate_limiter': {'max_rate': 20}})
+    for _ in range(50):
+        limiter.record(ORIGIN, status=200, latency=0.01)
+    assert limiter.stats()[ORIGIN]['rate'] == 20.0
+
+
+def test_backoff_then_recovery_up_to_the_ceiling():
+    limiter = HostRateLimiter.from_config({'rate_limit': 0.5})
+    limiter.record(ORIGIN, status=429)
+    limiter.record(ORIGIN, status=200, latency=0.01, retried_statuses=[503])
+    assert limiter.stats()[ORIGIN] == {'rate': 0.5, 'crawl_delay': None, 'backoffs': 2, 'requests': 0}
+    for _ in range(10):
+        limiter.record(ORIGIN, status=200, latency=0.01)
+    assert limiter.stats()[ORIGIN]['rate'] == 2.0
+
+
+def test_backoff_stops_at_min_rate():
+    limiter = HostRateLimiter(initial_rate=1.0, min_rate=0.2)
+    for _ in range(10):
+        limiter.record(ORIGIN, status=None)
+    assert limiter.stats()[ORIGIN]['rate'] == 0.2
+
+
+def test_not_adaptive_keeps_a_fixed_rate():
+    limiter = HostRateLimiter.from_config({'rate_limit': 0.5, 'rate_limiter': {'adaptive': False}})
+    limiter.record(ORIGIN, status=429)
+    limiter.record(ORIGIN, status=200, latency=0.01)
+    assert limiter.stats()[ORIGIN]['rate'] == 2.0
+
+
+def test_crawl_delay_caps_the_rate():
+    limiter = HostRateLimiter.from_config({'rate_limit': 0.1}, crawl_delay=lambda origin: 0.5)
+    for _ in range(10):
+        limiter.record(ORIGIN, status=200, latency=0.01)
+    assert limiter.stats()[ORIGIN] == {'rate': 2.0, 'crawl_delay': 0.5, 'backoffs': 0, 'requests': 0}
+
+
+def test_zero_rate_limit_disables_limiting():
+    assert HostRateLimiter.from_config({'rate_limit': 0}) is None
+
+
+def test_acquire_spaces_requests_per_host():
+    limiter = HostRateLimiter(initial_rate=50.0)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire(ORIGIN)
+    limiter.acquire('https://other.example.com')
+    # The first request uses the burst token, the other five wait 20 ms each
+    assert 0.09 <= time.monotonic() - start < 0.5
+    assert limiter.stats()[ORIGIN]['requests'] == 6
+
+
+def test_retry_after_pauses_the_host():
+    limiter = HostRateLimiter(initial_rate=100.0, adaptive=False)
+    limiter.acquire(ORIGIN)
+    limiter.record(ORIGIN, status=429, retry_after=0.2)
+    start = time.monotonic()
+    limiter.acquire(ORIGIN)
+    assert time.monotonic() - start >= 0.19
@@ -0,0 +1,69 @@
+import gzip
+import os
+
+from conftest import make_config
+from doc_scraper import DocToSkillConverter, RawArchive
+
+
+def test_archive_is_off_by_default(workdir):
+    converter = DocToSkillConverter(make_config())
+    assert converter.raw_archive is None
+    assert not os.path.exists(converter.archive_dir)
+    converter.store.close()
+
+
+def test_archive_opt_in(workdir):
+    converter = DocToSkillConverter(make_config(archive={'enabled': True}))
+    assert converter.raw_archive is not None
+    converter.store.close()
+
+
+def test_round_trip_and_reload(tmp_path):
+    archive = RawArchive(tmp_path / 'raw')
+    html = b'<html><body>caf\xc3\xa9</body></html>'
+    digest = archive.put('https://a/1', html)
+    archive.put('https://a/2', '<p>rendered ✓</p>')
+    archive.close()
+
+    reopened = RawArchive(tmp_path / 'raw')
+    assert reopened.urls() == ['https://a/1', 'https://a/2']
+    assert reopened.digest('https://a/1') == digest
+    assert reopened.get('https://a/1') == html
+    # Browser-rendered HTML comes back as str
+    assert reopened.get('https://a/2') == '<p>rendered ✓</p>'
+    assert reopened.get('https://a/3') is None
+
+
+def test_identical_bodies_are_stored_once(tmp_path):
+    archive = RawArchive(tmp_path / 'raw')
+    archive.put('https://a/1', b'<html>same</html>')
+    size = os.path.getsize(tmp_path / 'raw' / 'raw-00000.warc.gz')
+    archive.put('https://a/2', b'<html>same</html>')
+    archive.put('https://a/1', b'<html>same</html>')
+    archive.close()
+    assert os.path.getsize(tmp_path / 'raw' / 'raw-00000.warc.gz') == size
+    assert len(RawArchive(tmp_path / 'raw')) == 2
+    with open(tmp_path / 'raw' / 'index.jsonl') as f:
+        assert len(f.readlines()) == 2
+
+
+def test_segments_are_standard_warc(tmp_path):
+    archive = RawArchive(tmp_path / 'raw', segment_bytes=1)
+    archive.put('https://a/1', b'<html>one</html>')
+    archive.put('https://a/2', b'<html>two</html>')
+    archive.close()
+    assert sorted(os.listdir(tmp_path / 'raw')) == ['index.jsonl', 'raw-00000.warc.gz', 'raw-00001.warc.gz']
+    with gzip.open(tmp_path / 'raw' / 'raw-00001.warc.gz') as f:
+        record = f.read()
+    assert record.startswith(b'WARC/1.1\r\nWARC-Type: resource\r\n')
+    assert b'WARC-Target-URI: https://a/2\r\n' in record
+    assert record.endswith(b'\r\n\r\n<html>two</html>\r\n\r\n')
+
+
+def test_torn_index_line_is_ignored(tmp_path):
+    archive = RawArchive(tmp_path / 'raw')
+    archive.put('https://a/1', b'<html>one</html>')
+    archive.close()
+    with open(tmp_path / 'raw' / 'index.jsonl', 'a') as f:
+        f.write('["https://a/2", "abc')
+    assert RawArchive(tmp_path / 'raw').urls() == ['https://a/1']
@@ -0,0 +1,65 @@
+import os
+
+from doc_scraper import ReferenceWriter
+
+
+def header(part, parts, pages):
+    title = f"# Api (part {part} of {parts})\n" if parts > 1 else "# Api\n"
+    return [title, f"**Pages:** {pages}\n", "---\n"]
+
+
+def page_lines(i, words=40):
+    return [f"## Page {i}\n", f"**URL:** https://docs.example.com/api/{i}\n", ' '.join(['word'] * words), '']
+
+
+def write(path, pages, max_bytes, flush_bytes=256 * 1024):
+    writer = ReferenceWriter(path, max_bytes=max_bytes, flush_bytes=flush_bytes)
+    positions = [writer.add(page_lines(i), title=f"Page {i}") for i in range(pages)]
+    writer.close(header)
+    return writer, positions
+
+
+def test_single_shard_keeps_the_category_name(tmp_path):
+    writer, _ = write(tmp_path / 'api.md', 5, max_bytes=0)
+    assert writer.files == ['api.md']
+    assert sorted(os.listdir(tmp_path)) == ['api.md', 'api.toc.part']
+
+
+def test_first_shard_keeps_the_category_name(tmp_path):
+    writer, _ = write(tmp_path / 'api.md', 20, max_bytes=1000)
+    assert writer.files[:3] == ['api.md', 'api-2.md', 'api-3.md']
+    writer.remove_toc()
+    assert sorted(os.listdir(tmp_path)) == sorted(writer.files)
+    for shard in writer.shards:
+        assert shard['bytes'] <= 1000
+
+
+def test_locate_points_at_each_page(tmp_path):
+    # A small flush size spreads the pages over many appends
+    writer, positions = write(tmp_path / 'api.md', 30, max_bytes=1500, flush_bytes=300)
+    for i, position in enumerate(positions):
+        name, first, last, start, end = writer.locate(position)
+        raw = (tmp_path / name).read_bytes()
+        section = raw[start:end].decode('utf-8')
+        assert section.startswith(f"## Page {i}\n")
+        assert section.endswith('\n')
+        lines = raw.decode('utf-8').splitlines(keepends=True)
+        assert ''.join(lines[first - 1:last]) == section
+
+
+def test_toc_lists_every_page_once(tmp_path):
+    writer, positions = write(tmp_path / 'api.md', 12, max_bytes=1000)
+    toc = list(writer.iter_toc())
+    assert [entry[1] for entry in toc] == [f"Page {i}" for i in range(12)]
+    assert [entry[0] for entry in toc] == [writer.locate(position)[0] for position in positions]
+    assert not (tmp_path / 'api.toc.part').exists()
+
+
+def test_rebuild_removes_stale_shards(tmp_path):
+    (tmp_path / 'api-1.md').write_text('old first shard')
+    write(tmp_path / 'api.md', 20, max_bytes=1000)[0].remove_toc()
+    writer, _ = write(tmp_path / 'api.md', 3, max_bytes=1000)
+    writer.remove_toc()
+    assert writer.files == ['api.md']
+    assert os.listdir(tmp_path) == ['api.md']
+    assert '(part' not in (tmp_path / 'api.md').read_text()
@@ -0,0 +1,50 @@
+import runpy
+from pathlib import Path
+
+import pytest
+
+from conftest import make_config, make_page
+from doc_scraper import DocToSkillConverter, SearchIndexWriter
+
+pytestmark = pytest.mark.skipif(not SearchIndexWriter.fts5_available(), reason="SQLite built without FTS5")
+
+
+@pytest.fixture
+def skill(workdir):
+    """Skill built from 20 guide and 20 api pages, and its search()"""
+    converter = DocToSkillConverter(make_config())
+    for i in range(20):
+        converter.store.put(make_page(i, 'guide'))
+        converter.store.put(make_page(i, 'api'))
+    converter.store.close()
+    converter.build_skill()
+    skill_dir = Path(converter.skill_dir)
+    search = runpy.run_path(str(skill_dir / 'scripts' / 'search.py'))['search']
+    return skill_dir, lambda query, **kwargs: search(query, index=str(skill_dir / 'references' / 'search.db'),
+                                                     **kwargs)
+
+
+def test_best_match_ranks_first(skill):
+    # Every page's content mentions "page" and "6", only one has them in the title
+    _, search = skill
+    hits = search("guide page 6", k=5)
+    assert hits[0]['title'] == "Guide page 6"
+    assert hits[0]['rank'] < hits[1]['rank'] < 0
+
+
+def test_ranks_are_ordered(skill):
+    _, search = skill
+    ranks = [hit['rank'] for hit in search("api page 13", k=10)]
+    assert ranks == sorted(ranks)
+    assert len(set(ranks)) > 1
+
+
+def test_hit_points_at_its_section(skill):
+    skill_dir, search = skill
+    hit = search("api page 13", k=1)[0]
+    raw = (skill_dir / 'references' / hit['file']).read_bytes()
+    section = raw[hit['start_byte']:hit['end_byte']].decode('utf-8')
+    assert section.startswith("## Api page 13\n")
+    assert hit['url'] in section
+    lines = raw.decode('utf-8').splitlines(keepends=True)
+    assert ''.join(lines[hit['first_line'] - 1:hit['last_line']]) == section
@@ -0,0 +1,68 @@
+import pytest
+
+from doc_scraper import UrlFilter, UrlPatternSet
+
+BASE = 'https://docs.example.com/docs/'
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('HTTPS://Docs.Example.COM/docs/Intro', 'https://docs.example.com/docs/Intro'),
+    ('https://docs.example.com:443/docs/a', 'https://docs.example.com/docs/a'),
+    ('http://docs.example.com:80/docs/a', 'http://docs.example.com/docs/a'),
+    ('https://docs.example.com:8443/docs/a', 'https://docs.example.com:8443/docs/a'),
+    ('https://docs.example.com/docs/a#section', 'https://docs.example.com/docs/a'),
+    ('https://docs.example.com', 'https://docs.example.com/'),
+    ('https://user@Docs.Example.com/docs/a', 'https://user@docs.example.com/docs/a'),
+    ('https://[::1]:8080/docs/a', 'https://[::1]:8080/docs/a'),
+    ('https://docs.example.com/docs/a?q=1', 'https://docs.example.com/docs/a?q=1'),
+    ('https://docs.example.com:bad/docs/a#x', 'https://docs.example.com:bad/docs/a'),
+])
+def test_normalize(url, expected):
+    assert UrlFilter(BASE).normalize(url) == expected
+
+
+def test_optional_query_and_trailing_slash_stripping():
+    url_filter = UrlFilter(BASE, strip_query=True, strip_trailing_slash=True)
+    assert url_filter.normalize('https://docs.example.com/docs/a/?page=2') == 'https://docs.example.com/docs/a'
+    assert url_filter.normalize('https://docs.example.com/') == 'https://docs.example.com/'
+    # The base URL stays a directory prefix
+    assert url_filter.base_url == BASE
+    assert url_filter.allows('https://docs.example.com/docs')
+
+
+def test_allows_only_urls_under_the_base():
+    url_filter = UrlFilter(BASE)
+    assert url_filter.allows(BASE + 'guide/intro')
+    assert url_filter.allows(BASE)
+    assert not url_filter.allows('https://docs.example.com/blog/post')
+    assert not url_filter.allows('https://other.example.com/docs/a')
+
+
+def test_include_and_exclude_patterns():
+    url_filter = UrlFilter.from_config({
+        'base_url': BASE,
+        'url_patterns': {'include': ['/guide/', 're:/api/v\\d+/'],
+                         'exclude': ['/guide/old/', 'glob:*.pdf']}
+    })
+    assert url_filter.allows(BASE + 'guide/intro')
+    assert url_filter.allows(BASE + 'api/v2/client')
+    assert not url_filter.allows(BASE + 'api/latest/client')
+    assert not url_filter.allows(BASE + 'guide/old/intro')
+    assert not url_filter.allows(BASE + 'guide/manual.pdf')
+
+
+def test_empty_include_pattern_allows_every_url():
+    # '' is in every URL, as it was before patterns were compiled
+    url_filter = UrlFilter.from_config({'base_url': BASE, 'url_patterns': {'include': ['']}})
+    assert url_filter.allows(BASE + 'x')
+
+
+def test_pattern_kinds():
+    patterns = UrlPatternSet(['/blog/', 're:[?&]lang=', 'glob:*/print/*'])
+    assert patterns.matches(BASE + 'blog/post')
+    assert patterns.matches(BASE + 'a?x=1&lang=fr')
+    assert patterns.matches(BASE + 'print/a')
+    # glob: must match the whole URL, re: anywhere
+    assert not UrlPatternSet(['glob:/print/*']).matches(BASE + 'print/a')
+    assert not patterns.matches(BASE + 'guide/intro')
+    assert not UrlPatternSet([]).matches(BASE)